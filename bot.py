@@ -15,15 +15,18 @@
 - CHATGPT_TOKEN: токен OpenAI API
 """
 
+import asyncio
+import importlib
 import logging
 import os
 from dotenv import load_dotenv
-from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, ConversationHandler, MessageHandler, filters
-from handlers import basic, random_fact, chatgpt_interface, personality_chat, quiz, translator_chat, voice_chat
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+from handlers import basic, random_fact, chatgpt_interface, personality_chat, quiz, translator_chat, voice_chat, routing
 from warnings import filterwarnings
 from telegram.warnings import PTBUserWarning
 
-from services import voice_recognition
+from services import health, lifecycle, openai_client, persistence, rate_limiter, stt, telegram_http, tts
 
 filterwarnings(action="ignore", message=r".*CallbackQueryHandler", category=PTBUserWarning)
 
@@ -39,147 +42,127 @@ if not TELEGRAM_TOKEN:
     raise ValueError("Введите TELEGRAM_TOKEN токен в файле .env")
 else:
     logger.debug("TELEGRAM_TOKEN loaded successfully")
+if not os.getenv("CHATGPT_TOKEN"):
+    raise ValueError("Введите CHATGPT_TOKEN токен в файле .env")
+
+# Модули с декларациями ROUTES/CONVERSATION в порядке регистрации
+ROUTED_MODULES = (basic, random_fact, chatgpt_interface, personality_chat, quiz, translator_chat, voice_chat)
+
+# Тяжелые подсистемы, которые импортируются в фоне после старта, а не при загрузке модуля
+WARM_UP_MODULES = ("openai",)
+
+_warm_up_task = None
+
+_health_monitor = None
+
+
+def warm_up_subsystems() -> None:
+    """
+    Загружает тяжелые подсистемы в отдельном потоке.
+
+    Импорт openai и аудио-библиотек занимает заметное время, поэтому он не
+    выполняется при загрузке bot.py и не задерживает обработку первого обновления.
+    """
+    try:
+        for module_name in WARM_UP_MODULES:
+            importlib.import_module(module_name)
+        stt.get_speech_backend().warm_up()
+        tts.get_tts_backend().warm_up()
+        logger.info("Фоновая загрузка подсистем завершена")
+    except Exception as e:
+        logger.error(f"Ошибка фоновой загрузки подсистем: {e}", exc_info=True)
+
+
+async def post_init(application) -> None:
+    """
+    Запускает фоновый прогрев подсистем после инициализации приложения и
+    HTTP-проверки состояния (если задан HEALTH_PORT).
+
+    Args:
+        application (Application): Экземпляр приложения telegram.ext
+    """
+    global _warm_up_task, _health_monitor
+    _warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up_subsystems))
+    _health_monitor = await health.start_application_monitor(application)
+
+
+async def post_shutdown(application) -> None:
+    """
+    Пишет в лог итоговую статистику вызовов OpenAI, хранилища контента и
+    семантического кэша, закрывает клиент OpenAI, останавливает проверки
+    состояния и удаляет временные аудиофайлы при остановке бота.
+
+    Вызывается после того, как BotApplication завершило принятую работу, а
+    telegram.ext сохранило persistence и закрыло HTTP-клиенты Bot API. До
+    этого момента /readyz отвечает 503 ("остановка").
+
+    Args:
+        application (Application): Экземпляр приложения telegram.ext
+    """
+    from services.content_store import get_content_store
+    from services.semantic_cache import get_semantic_cache
+
+    openai_client.log_usage_report()
+    get_content_store().log_report()
+    cache = get_semantic_cache()
+    if cache is not None:
+        cache.log_report()
+    await openai_client.close_client()
+    if _health_monitor is not None:
+        await _health_monitor.stop()
+    lifecycle.remove_audio_dir()
+
+
+def build_application(updater: bool = True):
+    """
+    Собирает приложение telegram.ext со всеми обработчиками бота.
+
+    Args:
+        updater (bool): Создавать ли Updater для long polling. Воркеры
+            многопроцессного режима получают обновления от фронта и
+            собираются без него
+
+    Returns:
+        Application: Приложение с зарегистрированными обработчиками
+    """
+    builder = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(post_init).post_shutdown(post_shutdown)
+    builder = builder.application_class(lifecycle.BotApplication).persistence(persistence.get_persistence())
+    builder = telegram_http.apply_http_settings(builder)
+    limiter = rate_limiter.get_rate_limiter()
+    if limiter is not None:
+        builder = builder.rate_limiter(limiter)
+    if not updater:
+        builder = builder.updater(None)
+    application = builder.build()
+
+    for handler in routing.build_handlers(ROUTED_MODULES):
+        application.add_handler(handler)
+    return application
+
 
 def main():
     """
     Основная функция запуска бота.
 
-    Инициализирует Telegram бота, регистрирует все обработчики команд и
-    conversation handlers для различных режимов работы бота.
+    Инициализирует Telegram бота и регистрирует обработчики команд и
+    conversation handlers, собранные из деклараций модулей handlers.
+    При BOT_WORKERS > 1 обновления распределяются по процессам-воркерам
+    (services.sharding).
 
     Raises:
         ValueError: Если отсутствует TELEGRAM_TOKEN в переменных окружения
         Exception: При любых других ошибках инициализации или запуска бота
     """
     try:
-        application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
-
-        command_handlers = {
-            'start': basic.start,
-            'random': random_fact.random_fact,
-            'gpt': chatgpt_interface.gpt_command,
-            'personality': personality_chat.talk_command,
-            'quiz': quiz.quiz_command,
-            'translate':translator_chat.translate_command,
-            'voice':voice_chat.start_voice_dialog
-        }
-        for command, handler_func in command_handlers.items():
-            application.add_handler(CommandHandler(command, handler_func))
-
-        application.add_handler(CallbackQueryHandler(random_fact.random_fact_callback, pattern="^random_"))
-
-        gpt_conversation = ConversationHandler(
-            entry_points=[
-                CommandHandler("gpt", chatgpt_interface.gpt_command),
-                CallbackQueryHandler(chatgpt_interface.gpt_command, pattern="^gpt_interface$")],
-            states={
-                chatgpt_interface.WAITING_FOR_MESSAGE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, chatgpt_interface.handle_gpt_message),
-                    CallbackQueryHandler(chatgpt_interface.finish_gpt, pattern="^(gpt_finish$|main_menu$)"),
-                    CallbackQueryHandler(chatgpt_interface.continue_gpt, pattern="^gpt_continue")
-                ],
-            },
-            fallbacks=[
-                CommandHandler("start", basic.start),
-                CallbackQueryHandler(chatgpt_interface.finish_gpt, pattern="^(gpt_finish$|main_menu$)")
-            ]
-        )
-
-        personality_conversation = ConversationHandler(
-            entry_points=[
-                CommandHandler("talk", personality_chat.talk_command),
-                CallbackQueryHandler(personality_chat.talk_start, pattern="^talk_interface$")
-            ],
-            states={
-                personality_chat.SELECTION_PERSONALITY: [
-                    CallbackQueryHandler(personality_chat.handle_personality_callback,
-                                         pattern="^(continue_chat|finish_talk|change_personality)$"),
-                    CallbackQueryHandler(personality_chat.personality_selected, pattern="^personality_.*")
-                ],
-                personality_chat.CHATING_WITH_PERSONALITY: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, personality_chat.handle_personality_message),
-                    CallbackQueryHandler(personality_chat.handle_personality_callback,
-                                         pattern="^(continue_chat|finish_talk|change_personality)$")
-                ],
-            },
-            fallbacks=[
-                CommandHandler("start", basic.start),
-                CallbackQueryHandler(basic.menu_callback, pattern="^(gpt_finish$|main_menu$)")
-            ]
-        )
-
-        quiz_conversation = ConversationHandler(
-            entry_points=[
-                CommandHandler("quiz", quiz.quiz_command),
-                CallbackQueryHandler(quiz.quiz_start, pattern="^quiz_interface$")
-            ],
-            states={
-                quiz.SELECTING_TOPIC: [
-                    CallbackQueryHandler(quiz.topic_selected, pattern="^quiz_topic_")
-                ],
-                quiz.ANSWERING_QUESTION: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, quiz.handle_quiz_answer),
-                    CallbackQueryHandler(quiz.handle_quiz_callback,
-                                         pattern="^quiz_continue_"),
-                    CallbackQueryHandler(quiz.handle_quiz_callback,
-                                         pattern="^quiz_change_topic$"),
-                    CallbackQueryHandler(quiz.handle_quiz_callback,
-                                         pattern="^quiz_finish$")
-                ],
-            },
-            fallbacks=[
-                CommandHandler("start", basic.start),
-                CallbackQueryHandler(quiz.handle_quiz_callback, pattern="^quiz_finish$")
-            ]
-        )
-
-        translator_conversation = ConversationHandler(
-            entry_points=[
-                CommandHandler("translate", translator_chat.translate_command),
-                CallbackQueryHandler(translator_chat.translate_start, pattern="^translate_interface$")
-            ],
-            states={
-                translator_chat.SELECTION_LANGUAGE: [
-                    CallbackQueryHandler(translator_chat.handle_languages_callback,
-                                         pattern="^(continue_translate|finish_translate|change_languages)$"),
-                    CallbackQueryHandler(translator_chat.languages_selected, pattern="^languages_.*")
-                ],
-                translator_chat.CHATING_WITH_TRANSLATOR: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, translator_chat.handle_languages_message),
-                    CallbackQueryHandler(translator_chat.handle_languages_callback,
-                                         pattern="^(continue_translate|finish_translate|change_languages)$")
-                ],
-            },
-            fallbacks=[
-                CommandHandler("start", basic.start),
-                CallbackQueryHandler(basic.menu_callback, pattern="^(finish_translate|main_menu$)")
-            ]
-        )
-
-        voice_conversation = ConversationHandler(
-            entry_points=[
-                CommandHandler("voice", voice_chat.start_voice_dialog),
-                CallbackQueryHandler(voice_chat.start_voice_dialog, pattern="^start_voice_dialog$")
-            ],
-            states={
-                voice_chat.VOICE_DIALOG: [
-                    MessageHandler(filters.VOICE, voice_recognition.handle_voice),
-                ]
-            },
-            fallbacks=[
-                CommandHandler("start", basic.start),
-                CallbackQueryHandler(voice_chat.voice_cancel, pattern="^(main_menu|voice_stop)$")
-            ]
-        )
-
-        application.add_handler(gpt_conversation)
-        application.add_handler(personality_conversation)
-        application.add_handler(quiz_conversation)
-        application.add_handler(translator_conversation)
-        application.add_handler(voice_conversation)
-        application.add_handler(CallbackQueryHandler(basic.menu_callback, pattern="^coming_soon$"))
-
-        application.run_polling()
+        workers = int(os.getenv("BOT_WORKERS", "1"))
+        if workers > 1:
+            from services import sharding
+
+            sharding.run(workers)
+            return
+
+        # Явный список типов: ответы на опросы квиза (poll_answer) приходят только если они разрешены
+        build_application().run_polling(allowed_updates=Update.ALL_TYPES)
 
     except Exception as e:
         logger.error(f"Ошибка при запуске бота: {e}", exc_info=True)
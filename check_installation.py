@@ -72,7 +72,7 @@ def check_python_dependencies():
         ('openai', 'OpenAI'),
         ('speech_recognition', 'SpeechRecognition'),
         ('gtts', 'gTTS'),
-        ('pydub', 'pydub'),
+        ('numpy', 'numpy'),
         ('dotenv', 'python-dotenv'),
     ]
 
@@ -226,52 +226,47 @@ def check_project_imports():
     return all_ok
 
 def test_audio_processing():
-    """Тест обработки аудио"""
+    """Тест обработки аудио: кодирование и декодирование через ffmpeg, как в боте"""
     log_header("ТЕСТ ОБРАБОТКИ АУДИО")
 
-    try:
-        from pydub import AudioSegment
-        from pydub.generators import Sine
-
-        # Создаем тестовый аудиосигнал
-        tone = Sine(440).to_audio_segment(duration=1000)  # 1 секунда
-        log_check("Создание аудио", True)
-
-        # Тестируем экспорт в разные форматы
-        formats_to_test = ['wav', 'mp3', 'ogg']
-        for fmt in formats_to_test:
-            try:
-                test_file = f"test_audio_temp.{fmt}"
-                tone.export(test_file, format=fmt)
-
-                # Проверяем, что файл создался
-                if os.path.exists(test_file):
-                    # Пробуем загрузить обратно
-                    if fmt == 'wav':
-                        AudioSegment.from_wav(test_file)
-                    elif fmt == 'mp3':
-                        AudioSegment.from_mp3(test_file)
-                    elif fmt == 'ogg':
-                        AudioSegment.from_ogg(test_file)
-
-                    log_check(f"Формат {fmt.upper()}", True)
-
-                    # Удаляем тестовый файл
-                    os.remove(test_file)
-                else:
-                    log_check(f"Формат {fmt.upper()}", False, "файл не создался")
-
-            except Exception as e:
-                log_check(f"Формат {fmt.upper()}", False, f"ошибка: {e}")
-
-        return True
+    # Тестовый тон 440 Гц на 1 секунду в форматах, которые получает и отправляет бот
+    formats_to_test = {
+        'wav': [],
+        'mp3': ['-c:a', 'libmp3lame'],
+        'ogg': ['-c:a', 'libopus'],
+    }
+    all_ok = True
+    for fmt, codec_args in formats_to_test.items():
+        test_file = f"test_audio_temp.{fmt}"
+        try:
+            subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+                            '-f', 'lavfi', '-i', 'sine=frequency=440:duration=1',
+                            '-ac', '1', *codec_args, test_file],
+                           check=True, capture_output=True, timeout=30)
+
+            # Декодирование в PCM 16 кГц, как services.stt.decode_to_pcm
+            decoded = subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', test_file,
+                                      '-f', 's16le', '-ac', '1', '-ar', '16000', '-'],
+                                     check=True, capture_output=True, timeout=30)
+            if decoded.stdout:
+                log_check(f"Формат {fmt.upper()}", True)
+            else:
+                log_check(f"Формат {fmt.upper()}", False, "пустой результат декодирования")
+                all_ok = False
+        except FileNotFoundError:
+            log_check("Тест аудио", False, "ffmpeg не найден")
+            return False
+        except subprocess.CalledProcessError as e:
+            log_check(f"Формат {fmt.upper()}", False, f"ошибка ffmpeg: {e.stderr.decode(errors='replace').strip()}")
+            all_ok = False
+        except Exception as e:
+            log_check(f"Формат {fmt.upper()}", False, f"ошибка: {e}")
+            all_ok = False
+        finally:
+            if os.path.exists(test_file):
+                os.remove(test_file)
 
-    except ImportError as e:
-        log_check("Тест аудио", False, f"ошибка импорта: {e}")
-        return False
-    except Exception as e:
-        log_check("Тест аудио", False, f"неожиданная ошибка: {e}")
-        return False
+    return all_ok
 
 def log_summary(results):
     """Вывод итогового резюме"""
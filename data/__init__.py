@@ -3,6 +3,8 @@
 - languages.py - языки для переводчика
 - personalities.py - личности для чата
 - quiz_topics.py - темы для квизов
+- callbacks.py - компактное кодирование callback_data кнопок
+- menus.py - реестр статических клавиатур и подписей, собираемых при старте
 """
 
 from .languages import LNG_TRANSLATE, get_translate_keyboard, get_languages_data
@@ -0,0 +1,169 @@
+"""
+Компактное кодирование callback_data кнопок.
+
+Вместо строк вида "quiz_topic_programming" кнопки несут короткий бинарный
+payload в base64url без выравнивания:
+- байт версии схемы (кнопки старых версий отклоняются)
+- байт пространства имен (функция бота)
+- байт действия
+- varint ID аргумента (индекс личности, языка или темы)
+- varint nonce сессии (резерв формата: меню строятся один раз и общие для
+  всех пользователей, поэтому кнопки сейчас всегда несут 0)
+
+Типичная кнопка занимает 7-8 символов, поэтому в лимит Telegram в 64 байта
+помещается и более богатое состояние (ID вопроса, nonce сессии).
+Обработчики получают разобранный CallbackPayload, а маршрутизация выполняется
+поиском в словаре по паре (namespace, action).
+"""
+
+import base64
+import binascii
+from functools import lru_cache
+from typing import NamedTuple
+
+from data.languages import LNG_TRANSLATE
+from data.personalities import PERSONALITIES
+from data.quiz_topics import QUIZ_TOPICS
+
+CALLBACK_VERSION = 1
+
+# Лимит Telegram на длину callback_data в байтах
+MAX_CALLBACK_DATA_LENGTH = 64
+
+# Пространства имен
+NS_MENU, NS_RANDOM, NS_GPT, NS_TALK, NS_QUIZ, NS_TRANSLATE, NS_VOICE = range(1, 8)
+
+# Действия главного меню
+MENU_MAIN, MENU_COMING_SOON = range(2)
+
+# Действия рандомных фактов
+RANDOM_OPEN, RANDOM_MORE, RANDOM_FINISH = range(3)
+
+# Действия ChatGPT
+GPT_OPEN, GPT_CONTINUE, GPT_FINISH = range(3)
+
+# Действия диалога с личностью
+TALK_OPEN, TALK_SELECT, TALK_CONTINUE, TALK_CHANGE, TALK_FINISH = range(5)
+
+# Действия квиза
+QUIZ_OPEN, QUIZ_TOPIC, QUIZ_CONTINUE, QUIZ_CHANGE_TOPIC, QUIZ_FINISH = range(5)
+
+# Действия переводчика
+TRANSLATE_OPEN, TRANSLATE_SELECT, TRANSLATE_CONTINUE, TRANSLATE_CHANGE, TRANSLATE_FINISH = range(5)
+
+# Действия голосового чата
+VOICE_OPEN, VOICE_STOP = range(2)
+
+# Ключи, на которые ссылается ID аргумента в каждом пространстве имен
+ARG_KEYS = {
+    NS_TALK: tuple(PERSONALITIES),
+    NS_TRANSLATE: tuple(LNG_TRANSLATE),
+    NS_QUIZ: tuple(QUIZ_TOPICS),
+}
+
+
+class CallbackPayload(NamedTuple):
+    """Разобранное содержимое callback_data."""
+
+    namespace: int
+    action: int
+    arg: int = 0
+    nonce: int = 0
+
+    @property
+    def route(self):
+        """Ключ маршрутизации (namespace, action)."""
+        return self.namespace, self.action
+
+    @property
+    def key(self):
+        """Ключ личности, языка или темы по ID аргумента или None."""
+        keys = ARG_KEYS.get(self.namespace, ())
+        return keys[self.arg] if self.arg < len(keys) else None
+
+
+def arg_id(namespace: int, key: str) -> int:
+    """
+    Возвращает ID аргумента для ключа личности, языка или темы.
+
+    Args:
+        namespace (int): Пространство имен
+        key (str): Ключ из PERSONALITIES, LNG_TRANSLATE или QUIZ_TOPICS
+
+    Returns:
+        int: Индекс ключа
+    """
+    return ARG_KEYS[namespace].index(key)
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(raw: bytes, position: int):
+    value = 0
+    shift = 0
+    while True:
+        byte = raw[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode_callback(namespace: int, action: int, arg: int = 0, nonce: int = 0) -> str:
+    """
+    Кодирует payload кнопки в строку callback_data.
+
+    Args:
+        namespace (int): Пространство имен
+        action (int): Действие
+        arg (int): ID аргумента
+        nonce (int): Nonce сессии (0 - без привязки к сессии)
+
+    Returns:
+        str: callback_data в base64url
+
+    Raises:
+        ValueError: Если результат превышает лимит Telegram в 64 байта
+    """
+    raw = bytearray((CALLBACK_VERSION, namespace, action))
+    _write_varint(raw, arg)
+    _write_varint(raw, nonce)
+    data = base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode("ascii")
+    if len(data) > MAX_CALLBACK_DATA_LENGTH:
+        raise ValueError(f"callback_data длиннее {MAX_CALLBACK_DATA_LENGTH} байт: {len(data)}")
+    return data
+
+
+@lru_cache(maxsize=1024)
+def decode_callback(data: str):
+    """
+    Разбирает callback_data в CallbackPayload.
+
+    Кнопки другой версии схемы и строки старого формата не разбираются,
+    поэтому устаревшие кнопки отсекаются без обращения к обработчикам.
+
+    Args:
+        data (str): callback_data нажатой кнопки
+
+    Returns:
+        CallbackPayload: Разобранный payload или None для устаревших и некорректных данных
+    """
+    if not data or len(data) > MAX_CALLBACK_DATA_LENGTH:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+        if len(raw) < 5 or raw[0] != CALLBACK_VERSION:
+            return None
+        arg, position = _read_varint(raw, 3)
+        nonce, position = _read_varint(raw, position)
+    except (binascii.Error, ValueError, IndexError):
+        return None
+    if position != len(raw):
+        return None
+    return CallbackPayload(raw[1], raw[2], arg, nonce)
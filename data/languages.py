@@ -8,7 +8,6 @@
 
 import logging
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 LNG_TRANSLATE = {
     "spain" : {
@@ -35,21 +34,15 @@ LNG_TRANSLATE = {
 
 def get_translate_keyboard():
     """
-    Создает клавиатуру для выбора языка перевода.
+    Возвращает клавиатуру для выбора языка перевода.
+
+    Клавиатура собирается один раз при старте в реестре data.menus.
 
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками выбора языков и возврата в главное меню
     """
-    keyboard = []
-    for key, languages in LNG_TRANSLATE.items():
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{languages['emoji']} {languages['name']}",
-                callback_data = f"languages_{key}"
-            )
-        ])
-    keyboard.append([InlineKeyboardButton("Вернутся в главное меню", callback_data="finish_translate")])
-    return InlineKeyboardMarkup(keyboard)
+    from data.menus import TRANSLATE_KEYBOARD
+    return TRANSLATE_KEYBOARD
 
 def get_languages_data(languages_key):
     """
@@ -0,0 +1,194 @@
+"""
+Реестр статических меню бота.
+
+Все неизменяемые клавиатуры и подписи собираются один раз при импорте модуля
+(то есть при старте бота) и переиспользуются всеми обработчиками:
+- главное меню
+- меню рандомных фактов, ChatGPT, голосового чата
+- выбор личности, языка перевода и темы квиза
+- клавиатуры продолжения квиза для каждой темы
+
+Клавиатуры являются общими экземплярами StaticKeyboard: объект неизменяем,
+а словарь для Bot API строится один раз и не пересобирается при каждой отправке.
+"""
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from data.callbacks import (
+    encode_callback,
+    NS_RANDOM, RANDOM_OPEN, RANDOM_MORE, RANDOM_FINISH,
+    NS_GPT, GPT_OPEN, GPT_CONTINUE, GPT_FINISH,
+    NS_TALK, TALK_OPEN, TALK_SELECT, TALK_CHANGE, TALK_FINISH,
+    NS_QUIZ, QUIZ_OPEN, QUIZ_TOPIC, QUIZ_CONTINUE, QUIZ_CHANGE_TOPIC, QUIZ_FINISH,
+    NS_TRANSLATE, TRANSLATE_OPEN, TRANSLATE_SELECT, TRANSLATE_CONTINUE, TRANSLATE_CHANGE, TRANSLATE_FINISH,
+    NS_VOICE, VOICE_OPEN, VOICE_STOP,
+)
+from data.languages import LNG_TRANSLATE
+from data.personalities import PERSONALITIES
+from data.quiz_topics import QUIZ_TOPICS
+
+
+class StaticKeyboard(InlineKeyboardMarkup):
+    """
+    Неизменяемая inline клавиатура с заранее сериализованным представлением.
+
+    InlineKeyboardMarkup хранит кнопки в кортежах и запрещает изменение атрибутов,
+    поэтому один экземпляр можно безопасно отправлять во все чаты.
+    """
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, inline_keyboard):
+        super().__init__(inline_keyboard)
+        self._payload = super().to_dict()
+
+    def to_dict(self, recursive: bool = True):
+        """
+        Возвращает готовый словарь для Bot API без повторной сборки.
+
+        Args:
+            recursive (bool): Рекурсивная сериализация вложенных объектов
+
+        Returns:
+            dict: Представление клавиатуры для Bot API
+        """
+        if recursive:
+            return self._payload
+        return super().to_dict(recursive=False)
+
+
+def _button(text, namespace, action, arg=0):
+    return [InlineKeyboardButton(text, callback_data=encode_callback(namespace, action, arg))]
+
+
+# Главное меню
+MAIN_MENU_TEXT = (
+    "🎉 <b>Добро пожаловать в ChatGPT бота!</b>\n\n"
+    "🚀 <b>Доступные функции:</b>\n"
+    "• Рандомный факт - получи интересный факт\n"
+    "• ChatGPT - общение с ИИ\n"
+    "• Диалог с личностью - говори с известными людьми\n"
+    "• Квиз - проверь свои знания\n"
+    "• Переводчик\n\n"
+    "• Голосовой чат\n\n"
+    "Выберите функцию из меню ниже:"
+)
+
+MAIN_MENU_KEYBOARD = StaticKeyboard([
+    _button("🎲 Рандомный факт", NS_RANDOM, RANDOM_OPEN),
+    _button("🤖 ChatGPT", NS_GPT, GPT_OPEN),
+    _button("👥 Диалог с личностью", NS_TALK, TALK_OPEN),
+    _button("🧠 Поиграем в Квиз ?", NS_QUIZ, QUIZ_OPEN),
+    _button("🥸 Переводчик на разные языки", NS_TRANSLATE, TRANSLATE_OPEN),
+    _button("🚀 Запустить голосовой чат", NS_VOICE, VOICE_OPEN),
+])
+
+# Рандомные факты
+RANDOM_FACT_KEYBOARD = StaticKeyboard([
+    _button("🎲 Хочу ещё факт", NS_RANDOM, RANDOM_MORE),
+    _button("🏠 Закончить", NS_RANDOM, RANDOM_FINISH),
+])
+
+# ChatGPT
+GPT_CAPTION = (
+    "🤖 <b>ChatGPT Интерфейс</b>\n\n"
+    "Напишите любой вопрос или сообщение, и я передам его ChatGPT!\n\n"
+    "💡 <b>Примеры вопросов:</b>\n"
+    "• Объясни квантовую физику простыми словами\n"
+    "• Напиши короткий рассказ про кота\n"
+    "• Как приготовить пасту карбонара?\n"
+    "• Переведи фразу на английский\n\n"
+)
+
+GPT_KEYBOARD = StaticKeyboard([
+    _button("💬 Новый диалог с OpenAI", NS_GPT, GPT_CONTINUE),
+    _button("🏠 Вернуться в меню", NS_GPT, GPT_FINISH),
+])
+
+# Диалог с личностью
+TALK_CAPTION = (
+    "Диалог с известной личностью\n\n"
+    "Выберете с кем хотите общаться\n\n"
+    "Выберите личность:"
+)
+
+PERSONALITY_KEYBOARD = StaticKeyboard(
+    [_button(f"{personality['emoji']} {personality['name']}", NS_TALK, TALK_SELECT, arg)
+     for arg, personality in enumerate(PERSONALITIES.values())]
+    + [_button("Вернутся в главное меню", NS_TALK, TALK_FINISH)]
+)
+
+PERSONALITY_CHAT_KEYBOARD = StaticKeyboard([
+    _button("🔄 Сменить личность", NS_TALK, TALK_CHANGE),
+    _button("🏠 Вернуться в меню", NS_TALK, TALK_FINISH),
+])
+
+# Переводчик
+TRANSLATE_CAPTION = (
+    "🌍 <b>Переводчик</b>\n\n"
+    "Выберите язык для перевода:\n\n"
+    "Я могу переводить с русского на выбранный язык и обратно!"
+)
+
+TRANSLATE_KEYBOARD = StaticKeyboard(
+    [_button(f"{language['emoji']} {language['name']}", NS_TRANSLATE, TRANSLATE_SELECT, arg)
+     for arg, language in enumerate(LNG_TRANSLATE.values())]
+    + [_button("Вернутся в главное меню", NS_TRANSLATE, TRANSLATE_FINISH)]
+)
+
+TRANSLATOR_SELECTED_KEYBOARD = StaticKeyboard([
+    _button("📝 Продолжить перевод", NS_TRANSLATE, TRANSLATE_CONTINUE),
+    _button("🔄 Сменить язык", NS_TRANSLATE, TRANSLATE_CHANGE),
+    _button("🏠 Вернуться в меню", NS_TRANSLATE, TRANSLATE_FINISH),
+])
+
+TRANSLATOR_CHAT_KEYBOARD = StaticKeyboard([
+    _button("🔄 Сменить язык", NS_TRANSLATE, TRANSLATE_CHANGE),
+    _button("🏠 Вернуться в меню", NS_TRANSLATE, TRANSLATE_FINISH),
+])
+
+# Квиз
+QUIZ_CAPTION = (
+    "🧠 <b>Квиз - проверь свои знания!</b>\n\n"
+    "Выберите тему для квиза:\n\n"
+    "💻 <b>Программирование</b> - вопросы о коде и технологиях\n"
+    "🏛️ <b>История</b> - исторические факты и события\n"
+    "🔬 <b>Наука</b> - физика, химия, биология\n"
+    "🌍 <b>География</b> - страны, столицы, природа\n"
+    "🎬 <b>Кино</b> - фильмы, актеры, режиссеры\n\n"
+    "Каждый вопрос имеет 4 варианта ответа!"
+)
+
+QUIZ_TOPICS_KEYBOARD = StaticKeyboard(
+    [_button(topic["name"], NS_QUIZ, QUIZ_TOPIC, arg) for arg, topic in enumerate(QUIZ_TOPICS.values())]
+    + [_button("🏠 Главное меню", NS_QUIZ, QUIZ_FINISH)]
+)
+
+
+def _quiz_continue_keyboard(arg):
+    return StaticKeyboard([
+        _button("🎯 Ещё вопрос", NS_QUIZ, QUIZ_CONTINUE, arg),
+        _button("🔄 Сменить тему", NS_QUIZ, QUIZ_CHANGE_TOPIC),
+        _button("🏁 Закончить квиз", NS_QUIZ, QUIZ_FINISH),
+    ])
+
+
+# Ключ "" используется, когда тема в сессии уже не известна
+QUIZ_CONTINUE_KEYBOARDS = {key: _quiz_continue_keyboard(arg) for arg, key in enumerate(QUIZ_TOPICS)}
+QUIZ_CONTINUE_KEYBOARDS[""] = _quiz_continue_keyboard(len(QUIZ_TOPICS))
+
+# Голосовой чат
+VOICE_CAPTION = (
+    "🎤 <b>Голосовой чат с ChatGPT</b>\n\n"
+    "📱 Отправьте голосовое сообщение, и я отвечу голосом!\n\n"
+    "💡 <b>Как это работает:</b>\n"
+    "1. Отправьте голосовое сообщение\n"
+    "2. Я распознаю вашу речь\n"
+    "3. Отправлю текст в ChatGPT\n"
+    "4. Получу ответ и озвучу его\n\n"
+    "🗣️ Говорите четко и не слишком быстро для лучшего распознавания."
+)
+
+VOICE_KEYBOARD = StaticKeyboard([
+    _button("🏠 Вернуться в меню", NS_VOICE, VOICE_STOP),
+])
@@ -8,7 +8,6 @@
 
 import logging
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 PERSONALITIES = {
     "schwarzenegger": {
@@ -72,22 +71,15 @@ PERSONALITIES = {
 
 def get_personality_keyboard():
     """
-    Создает клавиатуру для выбора личности для чата.
+    Возвращает клавиатуру для выбора личности для чата.
+
+    Клавиатура собирается один раз при старте в реестре data.menus.
 
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками выбора личностей и возврата в главное меню
     """
-    keyboard = []
-    for key, personality in PERSONALITIES.items():
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{personality['emoji']} {personality['name']}",
-                callback_data = f"personality_{key}"
-            )
-        ])
-    keyboard.append([InlineKeyboardButton("Вернутся в главное меню", callback_data="finish_talk")])
-    logging.info("Собираем данные для вывода личностей !")
-    return InlineKeyboardMarkup(keyboard)
+    from data.menus import PERSONALITY_KEYBOARD
+    return PERSONALITY_KEYBOARD
 
 def get_personality_data(personality_key):
     """
@@ -6,12 +6,6 @@
 промпт для создания вопросов соответствующей тематики.
 """
 
-import logging
-
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-
-logger = logging.getLogger(__name__)
-
 QUIZ_TOPICS = {
     "programming": {
         "name": "💻 Программирование",
@@ -88,17 +82,15 @@ D) [вариант 4]
 
 def get_quiz_topics_keyboard():
     """
-    Создает клавиатуру с доступными темами квизов.
+    Возвращает клавиатуру с доступными темами квизов.
+
+    Клавиатура собирается один раз при старте в реестре data.menus.
 
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками тем квизов и возврата в главное меню
     """
-    keyboard = []
-    for topic_key, topic_data in QUIZ_TOPICS.items():
-        keyboard.append([InlineKeyboardButton(topic_data["name"], callback_data=f"quiz_topic_{topic_key}")])
-
-    keyboard.append([InlineKeyboardButton("🏠 Главное меню", callback_data="quiz_finish")])
-    return InlineKeyboardMarkup(keyboard)
+    from data.menus import QUIZ_TOPICS_KEYBOARD
+    return QUIZ_TOPICS_KEYBOARD
 
 
 def get_quiz_topic_data(topic_key):
@@ -116,7 +108,9 @@ def get_quiz_topic_data(topic_key):
 
 def get_quiz_continue_keyboard(topic_key):
     """
-    Создает клавиатуру для продолжения квиза после ответа на вопрос.
+    Возвращает клавиатуру для продолжения квиза после ответа на вопрос.
+
+    Клавиатуры для всех тем собираются заранее в реестре data.menus.
 
     Args:
         topic_key (str): Ключ текущей темы квиза
@@ -124,10 +118,5 @@ def get_quiz_continue_keyboard(topic_key):
     Returns:
         InlineKeyboardMarkup: Клавиатура с опциями продолжения квиза
     """
-    logger.info(f"Топик {topic_key}")
-    keyboard = [
-        [InlineKeyboardButton("🎯 Ещё вопрос", callback_data=f"quiz_continue_{topic_key}")],
-        [InlineKeyboardButton("🔄 Сменить тему", callback_data="quiz_change_topic")],
-        [InlineKeyboardButton("🏁 Закончить квиз", callback_data="quiz_finish")]
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    from data.menus import QUIZ_CONTINUE_KEYBOARDS
+    return QUIZ_CONTINUE_KEYBOARDS.get(topic_key, QUIZ_CONTINUE_KEYBOARDS[""])
@@ -9,6 +9,7 @@
 - random_fact.py - генерация случайных фактов
 - translator_chat.py - переводчик на различные языки
 - voice_chat.py - голосовой чат
+- routing.py - сборка handler-ов из деклараций ROUTES/CONVERSATION модулей
 
 Все обработчики используют telegram.ext framework для работы с Telegram Bot API.
 """
@@ -10,9 +10,11 @@
 """
 
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
 import asyncio
+from data.callbacks import NS_MENU, MENU_COMING_SOON
+from data.menus import MAIN_MENU_TEXT, MAIN_MENU_KEYBOARD
 
 logger = logging.getLogger(__name__)
 
@@ -35,26 +37,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE, reply_markup
     """
     logger.info("Команда /start вызвана или fallback")
 
-    welcome_text = (
-        "🎉 <b>Добро пожаловать в ChatGPT бота!</b>\n\n"
-        "🚀 <b>Доступные функции:</b>\n"
-        "• Рандомный факт - получи интересный факт\n"
-        "• ChatGPT - общение с ИИ\n"
-        "• Диалог с личностью - говори с известными людьми\n"
-        "• Квиз - проверь свои знания\n"
-        "• Переводчик\n\n"
-        "• Голосовой чат\n\n"
-        "Выберите функцию из меню ниже:"
-    )
-    keyboard = [
-        [InlineKeyboardButton("🎲 Рандомный факт", callback_data="random_fact")],
-        [InlineKeyboardButton("🤖 ChatGPT", callback_data="gpt_interface")],
-        [InlineKeyboardButton("👥 Диалог с личностью", callback_data="talk_interface")],
-        [InlineKeyboardButton("🧠 Поиграем в Квиз ?", callback_data="quiz_interface")],
-        [InlineKeyboardButton("🥸 Переводчик на разные языки", callback_data="translate_interface")],
-        [InlineKeyboardButton("🚀 Запустить голосовой чат", callback_data="start_voice_dialog")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    welcome_text = MAIN_MENU_TEXT
+    reply_markup = MAIN_MENU_KEYBOARD
     try:
         if update.message:
             await update.message.reply_text(welcome_text, parse_mode='HTML', reply_markup=reply_markup)
@@ -85,12 +69,13 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context (ContextTypes.DEFAULT_TYPE): Контекст выполнения callback
     """
     query = update.callback_query
-    logger.info(f"Получен Callback в basic: {query.data}")
+    payload = context.callback_payload
+    logger.info(f"Получен Callback в basic: {payload}")
     logger.info(f"Текущее состояние: {context.user_data.get('state')}")
 
     await query.answer()
 
-    if query.data in ["coming_soon"]:
+    if payload and payload.route == (NS_MENU, MENU_COMING_SOON):
         await query.edit_message_text(
             "🚧 <b>Функция в разработке!</b>\n\n"
             "Эта функция будет добавлена на следующих уроках.\n"
@@ -100,3 +85,9 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         await asyncio.sleep(3)
         await start(update,context)
+
+
+ROUTES = {
+    "commands": {"start": start},
+    "callbacks": {(NS_MENU, MENU_COMING_SOON): menu_callback},
+}
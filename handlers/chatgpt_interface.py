@@ -14,32 +14,22 @@
 
 import asyncio
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram import Update, InputMediaPhoto
 from telegram.ext import ContextTypes
+from data.callbacks import NS_MENU, MENU_MAIN, NS_GPT, GPT_OPEN, GPT_CONTINUE, GPT_FINISH
+from data.menus import GPT_CAPTION, GPT_KEYBOARD
 from handlers import basic
 from services.openai_client import get_chatgpt_response
+from services.reply_pipeline import ReplyTurn
 import os
 
 logger = logging.getLogger(__name__)
 
 WAITING_FOR_MESSAGE = 1
 
-keyboard = [
-    [InlineKeyboardButton("💬 Новый диалог с OpenAI", callback_data="gpt_continue")],
-    [InlineKeyboardButton("🏠 Вернуться в меню", callback_data="gpt_finish")]
-]
+reply_markup = GPT_KEYBOARD
 
-reply_markup = InlineKeyboardMarkup(keyboard)
-
-CAPTION = (
-    "🤖 <b>ChatGPT Интерфейс</b>\n\n"
-    "Напишите любой вопрос или сообщение, и я передам его ChatGPT!\n\n"
-    "💡 <b>Примеры вопросов:</b>\n"
-    "• Объясни квантовую физику простыми словами\n"
-    "• Напиши короткий рассказ про кота\n"
-    "• Как приготовить пасту карбонара?\n"
-    "• Переведи фразу на английский\n\n"
-)
+CAPTION = GPT_CAPTION
 
 async def gpt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -142,22 +132,21 @@ async def handle_gpt_message(update: Update, context: ContextTypes.DEFAULT_TYPE)
     Returns:
         int: WAITING_FOR_MESSAGE для продолжения ожидания сообщений
     """
+    turn = ReplyTurn(update, context, "gpt")
     try:
-        await delete_previous_menu(update, context)
         user_message = update.message.text
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-
         context.user_data['gpt_history'].append({"role": "user", "content": user_message})
         logger.info(f"Сообщение пользователя {user_message}")
 
-        processing_msg = await update.message.reply_text("🤔 Обрабатываю ваш запрос... ⏳")
+        await turn.start()
         logger.info(f"История диалога: {context.user_data['gpt_history']}")
         response_text = await get_chatgpt_response(context.user_data['gpt_history'])
         logger.info(f"Получен ответ от ChatGPT: {response_text}")
         context.user_data['gpt_history'].append({"role": "assistant", "content": response_text})
-        await update.message.delete()
-        await processing_msg.delete()
-        response_msg = await update.message.reply_text(
+
+        # Заглушка становится ответом, предыдущее меню и сообщение пользователя удаляются одним вызовом
+        turn.delete_later(context.user_data.get('gpt_message_id'), update.message.message_id)
+        response_msg = await turn.finish(
             f"🤖 <b>ChatGPT отвечает:</b>\n\n{response_text}",
             parse_mode='HTML',
             reply_markup=reply_markup
@@ -168,29 +157,11 @@ async def handle_gpt_message(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     except Exception as e:
         logger.error(f"Ошибка при обработке сообщения: {e}", exc_info=True)
-        await update.message.reply_text(
+        await turn.fail(
             "😔 Извините, произошла ошибка при обработке вашего сообщения. Попробуйте еще раз."
         )
         return WAITING_FOR_MESSAGE
 
-async def delete_previous_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """
-    Удаляет предыдущее меню ChatGPT интерфейса.
-
-    Находит и удаляет сохраненное сообщение с меню, чтобы избежать
-    накопления сообщений в чате.
-
-    Args:
-        update (Update): Объект обновления от Telegram
-        context (ContextTypes.DEFAULT_TYPE): Контекст с сохраненным ID сообщения
-    """
-    message_id = context.user_data.get('gpt_message_id')
-    if message_id:
-        try:
-            await context.bot.delete_message(chat_id=update.effective_chat.id, message_id=message_id)
-        except Exception as e:
-            logger.warning(f"❗ Не удалось удалить меню: {e}")
-
 async def finish_gpt(update: Update, context: ContextTypes.DEFAULT_TYPE, query=None) -> int:
     """
     Завершает работу с ChatGPT интерфейсом.
@@ -211,3 +182,22 @@ async def finish_gpt(update: Update, context: ContextTypes.DEFAULT_TYPE, query=N
     await asyncio.sleep(3)
     await basic.start(update, context)
     return -1
+
+
+CONVERSATION = {
+    "name": "gpt",
+    "entry_commands": {"gpt": gpt_command},
+    "entry_callbacks": {(NS_GPT, GPT_OPEN): gpt_command},
+    "states": {
+        WAITING_FOR_MESSAGE: {
+            "text": handle_gpt_message,
+            "callbacks": {
+                (NS_GPT, GPT_FINISH): finish_gpt,
+                (NS_MENU, MENU_MAIN): finish_gpt,
+                (NS_GPT, GPT_CONTINUE): continue_gpt,
+            },
+        },
+    },
+    "fallback_commands": {"start": basic.start},
+    "fallback_callbacks": {(NS_GPT, GPT_FINISH): finish_gpt, (NS_MENU, MENU_MAIN): finish_gpt},
+}
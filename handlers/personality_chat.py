@@ -16,13 +16,19 @@
 import logging
 from statistics import quantiles
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 import os
 
+from data.callbacks import (
+    NS_MENU, MENU_MAIN, NS_GPT, GPT_FINISH,
+    NS_TALK, TALK_OPEN, TALK_SELECT, TALK_CONTINUE, TALK_CHANGE, TALK_FINISH,
+)
+from data.menus import TALK_CAPTION, PERSONALITY_CHAT_KEYBOARD
 from data.personalities import get_personality_data, get_personality_keyboard
 from handlers import basic
 from services.openai_client import get_personality_response
+from services.reply_pipeline import ReplyTurn
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +41,12 @@ async def talk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Args:
         update (Update): Объект обновления от Telegram
         context (ContextTypes.DEFAULT_TYPE): Контекст выполнения
+
+    Returns:
+        int: SELECTION_PERSONALITY для перехода в состояние выбора личности
     """
     logging.info(f"Обработка команды /talk")
-    await talk_start(update, context)
+    return await talk_start(update, context)
 
 async def talk_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -56,11 +65,7 @@ async def talk_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logging.info(f"Обработка кнопки talk_interface")
     try:
         image_path = "data/images/personality.png"
-        message_text = (
-            "Диалог с известной личностью\n\n"
-            "Выберете с кем хотите общаться\n\n"
-            "Выберите личность:"
-        )
+        message_text = TALK_CAPTION
 
         keyboard = get_personality_keyboard()
 
@@ -137,7 +142,7 @@ async def personality_selected(update: Update, context: ContextTypes.DEFAULT_TYP
 
     try:
         logging.info(f"Извлекаем ключ личности из callback_data")
-        personality_key = query.data.replace("personality_", "")
+        personality_key = context.callback_payload.key
         personality = get_personality_data(personality_key)
         logging.info(f"Проверка переменной {personality}")
         if not personality:
@@ -148,18 +153,10 @@ async def personality_selected(update: Update, context: ContextTypes.DEFAULT_TYP
         context.user_data['current_personality'] = personality_key
         context.user_data['personality_data'] = personality
 
-        # Создаем меню для диалога
-        keyboard = [
-            # [InlineKeyboardButton("✉️ Продолжить диалог", callback_data="continue_chat")],
-            [InlineKeyboardButton("🔄 Сменить личность", callback_data="change_personality")],
-            [InlineKeyboardButton("🏠 Вернуться в меню", callback_data="finish_talk")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
             f"🎭 Выбрана личность: {personality['emoji']} {personality['name']}\n\n"
             f"Теперь напишите любое сообщение, и я отвечу от лица этой личности!",
-            reply_markup=reply_markup
+            reply_markup=PERSONALITY_CHAT_KEYBOARD
         )
 
         return CHATING_WITH_PERSONALITY
@@ -184,6 +181,7 @@ async def handle_personality_message(update: Update, context: ContextTypes.DEFAU
         int: CHATING_WITH_PERSONALITY для продолжения диалога
     """
     logger.info(f"Получено сообщение в Personality: {update.message.text}")
+    turn = ReplyTurn(update, context, "personality")
     try:
         user_message = update.message.text
         personality_key = context.user_data.get('current_personality')
@@ -195,28 +193,19 @@ async def handle_personality_message(update: Update, context: ContextTypes.DEFAU
             )
             return CHATING_WITH_PERSONALITY
 
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        processing_msg = await update.message.reply_text("🤔 Обрабатываю ваш запрос... ⏳")
+        await turn.start()
         response = await get_personality_response(user_message, personality_data['prompt'])
 
-        keyboard = [
-            # [InlineKeyboardButton("✉️ Продолжить диалог", callback_data="continue_chat")],
-            [InlineKeyboardButton("🔄 Сменить личность", callback_data="change_personality")],
-            [InlineKeyboardButton("🏠 Вернуться в меню", callback_data="finish_talk")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await processing_msg.delete()
-        await update.message.reply_text(
+        await turn.finish(
             f"{personality_data['emoji']} <b>{personality_data['name']} отвечает:</b>\n\n{response}",
             parse_mode='HTML',
-            reply_markup=reply_markup
+            reply_markup=PERSONALITY_CHAT_KEYBOARD
         )
         return CHATING_WITH_PERSONALITY
 
     except Exception as e:
         logger.error(f"Ошибка в handle_personality_message: {e}", exc_info=True)
-        await update.message.reply_text("😔 Произошла ошибка при получении ответа. Попробуйте снова.")
+        await turn.fail("😔 Произошла ошибка при получении ответа. Попробуйте снова.")
         return CHATING_WITH_PERSONALITY
 
 async def handle_personality_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -236,24 +225,49 @@ async def handle_personality_callback(update: Update, context: ContextTypes.DEFA
         int: Соответствующее состояние в зависимости от выбранного действия
     """
     query = update.callback_query
-    logger.info(f"Получен callback в Personality: {query.data}")
+    action = context.callback_payload.action
+    logger.info(f"Получен callback в Personality: {action}")
     await query.answer()
 
-    if query.data == "continue_chat":
+    if action == TALK_CONTINUE:
         personality_data = context.user_data.get("personality_data")
         if personality_data:
             pass  # Заглушка на перезапуск диалога.
             logger.info("Здесь продолжение диалога с той же личностью")
         return CHATING_WITH_PERSONALITY
 
-    elif query.data == "change_personality":
+    elif action == TALK_CHANGE:
         logger.info("Смена личности")
         return await talk_start(update, context)
 
-    elif query.data == "finish_talk":
+    elif action == TALK_FINISH:
         logger.info("Завершение диалога с личностью")
         context.user_data.clear()
         await basic.start(update, context)
         return ConversationHandler.END
 
     return CHATING_WITH_PERSONALITY
+
+
+_PERSONALITY_CALLBACKS = {
+    (NS_TALK, TALK_CONTINUE): handle_personality_callback,
+    (NS_TALK, TALK_FINISH): handle_personality_callback,
+    (NS_TALK, TALK_CHANGE): handle_personality_callback,
+}
+
+CONVERSATION = {
+    "name": "personality",
+    "entry_commands": {"talk": talk_command, "personality": talk_command},
+    "entry_callbacks": {(NS_TALK, TALK_OPEN): talk_start},
+    "states": {
+        SELECTION_PERSONALITY: {
+            "callbacks": {**_PERSONALITY_CALLBACKS, (NS_TALK, TALK_SELECT): personality_selected},
+        },
+        CHATING_WITH_PERSONALITY: {
+            "text": handle_personality_message,
+            "callbacks": _PERSONALITY_CALLBACKS,
+        },
+    },
+    "fallback_commands": {"start": basic.start},
+    "fallback_callbacks": {(NS_GPT, GPT_FINISH): basic.menu_callback, (NS_MENU, MENU_MAIN): basic.menu_callback},
+}
@@ -6,8 +6,11 @@
 - Выбор темы квиза из предустановленного списка
 - Генерацию вопросов через ChatGPT для каждой темы
 - Проверку ответов пользователя
-- Ведение статистики правильных/неправильных ответов
+- Ведение статистики правильных/неправильных ответов (в сессии и долговременно)
 - Возможность смены темы или продолжения квиза
+- Таблицы лидеров по темам (команда /leaderboard)
+- Режим QUIZ_MODE=poll: вопросы отправляются опросами-викторинами Telegram,
+  ответы приходят обновлениями PollAnswer вне conversation handler
 
 Состояния conversation handler:
 - SELECTING_TOPIC: выбор темы для квиза
@@ -15,18 +18,39 @@
 """
 
 import asyncio
+import html
 import logging
 import os
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Poll, Update
+from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
 from handlers import basic
+from services import sharding
+from services.content_store import KIND_QUIZ, get_content_store
 from services.openai_client import get_personality_response
-from data.quiz_topics import get_quiz_topics_keyboard, get_quiz_topic_data, get_quiz_continue_keyboard
+from services.quiz_stats import ALL_TOPICS, get_quiz_stats
+from data.callbacks import NS_QUIZ, QUIZ_OPEN, QUIZ_TOPIC, QUIZ_CONTINUE, QUIZ_CHANGE_TOPIC, QUIZ_FINISH
+from data.menus import QUIZ_CAPTION
+from data.quiz_topics import QUIZ_TOPICS, get_quiz_topics_keyboard, get_quiz_topic_data, get_quiz_continue_keyboard
 
 logger = logging.getLogger(__name__)
 
 SELECTING_TOPIC, ANSWERING_QUESTION = range(2)
 
+# Режим вопросов: text - варианты текстом и ответ буквой, poll - опрос-викторина Telegram
+QUIZ_MODE_TEXT = "text"
+QUIZ_MODE_POLL = "poll"
+QUIZ_MODE = os.getenv("QUIZ_MODE", QUIZ_MODE_TEXT).lower()
+
+# Ограничения Bot API для опросов
+POLL_QUESTION_LIMIT = 300
+POLL_OPTION_LIMIT = 100
+
+# Максимум опросов, ожидающих ответа (poll_id -> данные вопроса в bot_data)
+MAX_PENDING_POLLS = 10000
+
+OPTION_KEYS = ("option_a", "option_b", "option_c", "option_d")
+
 
 async def quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -35,9 +59,12 @@ async def quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Args:
         update (Update): Объект обновления от Telegram
         context (ContextTypes.DEFAULT_TYPE): Контекст выполнения
+
+    Returns:
+        int: SELECTING_TOPIC для перехода в состояние выбора темы
     """
     logger.info('Обрабатываю нажатие на /quiz')
-    await quiz_start(update, context)
+    return await quiz_start(update, context)
 
 
 async def quiz_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -57,16 +84,7 @@ async def quiz_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         image_path = "data/images/quiz.png"
         logger.info(f'В квизе используется картинка: {image_path}')
-        message_text = (
-            "🧠 <b>Квиз - проверь свои знания!</b>\n\n"
-            "Выберите тему для квиза:\n\n"
-            "💻 <b>Программирование</b> - вопросы о коде и технологиях\n"
-            "🏛️ <b>История</b> - исторические факты и события\n"
-            "🔬 <b>Наука</b> - физика, химия, биология\n"
-            "🌍 <b>География</b> - страны, столицы, природа\n"
-            "🎬 <b>Кино</b> - фильмы, актеры, режиссеры\n\n"
-            "Каждый вопрос имеет 4 варианта ответа!"
-        )
+        message_text = QUIZ_CAPTION
 
         keyboard = get_quiz_topics_keyboard()
 
@@ -147,7 +165,7 @@ async def topic_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         # Извлекаем тему из callback_data
-        topic_key = query.data.replace("quiz_topic_", "")
+        topic_key = context.callback_payload.key
         topic_data = get_quiz_topic_data(topic_key)
 
         if not topic_data:
@@ -173,42 +191,121 @@ async def topic_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return SELECTING_TOPIC
 
 
+def _poll_options(parsed_question):
+    """
+    Готовит варианты ответа и номер правильного для опроса-викторины.
+
+    Args:
+        parsed_question (dict): Результат parse_question_response
+
+    Returns:
+        tuple: (options, correct_option_id) или None, если вопрос не укладывается
+            в ограничения опроса Telegram или правильный ответ не распознан
+    """
+    letters = [letter for letter, key in zip("ABCD", OPTION_KEYS) if key in parsed_question]
+    options = [parsed_question[key] for key in OPTION_KEYS if key in parsed_question]
+    if parsed_question['correct_answer'] not in letters:
+        return None
+    if len(parsed_question['question']) > POLL_QUESTION_LIMIT or any(len(option) > POLL_OPTION_LIMIT for option in options):
+        return None
+    return options, letters.index(parsed_question['correct_answer'])
+
+
+async def _edit_or_reply(query, text, **kwargs):
+    # Сообщение с опросом нельзя превратить в текст: отвечаем новым сообщением
+    if query.message and query.message.poll:
+        return await query.message.reply_text(text, **kwargs)
+    return await query.edit_message_text(text, **kwargs)
+
+
 async def generate_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Генерирует новый вопрос для текущей темы квиза.
 
-    Использует ChatGPT для создания вопроса с 4 вариантами ответа
+    Берет непросмотренный пользователем вопрос темы из хранилища контента, а
+    если такие вопросы закончились - создает вопрос с 4 вариантами ответа через ChatGPT
     на основе промпта выбранной темы.
 
+    В режиме QUIZ_MODE=poll вопрос отправляется опросом-викториной Telegram
+    и засчитывается в handle_poll_answer: вместо заглушки, текста вопроса,
+    удаления ответа пользователя и ответа бота (5 вызовов Bot API на вопрос
+    вместе с ответом на callback) нужны индикатор набора и sendPoll (3 вызова).
+    Вопросы, которые не укладываются в ограничения опроса, отправляются текстом.
+
     Args:
         update (Update): Объект обновления от Telegram
         context (ContextTypes.DEFAULT_TYPE): Контекст с данными темы
     """
+    query = update.callback_query
     try:
         topic_data = context.user_data.get('topic_data')
         if not topic_data:
-            await update.callback_query.edit_message_text("❌ Ошибка: тема не найдена")
+            await _edit_or_reply(query, "❌ Ошибка: тема не найдена")
             return
 
-        # Показываем индикатор загрузки
-        await update.callback_query.edit_message_text("🤔 Генерирую вопрос... ⏳")
+        # Ответ на callback уже отправлен вызывающим обработчиком
+        api_calls = 1
+        poll_mode = QUIZ_MODE == QUIZ_MODE_POLL
 
-        # Генерируем вопрос через ChatGPT
-        question_response = await get_personality_response("Создай новый вопрос", topic_data['prompt'])
+        # Показываем индикатор загрузки
+        if poll_mode:
+            await context.bot.send_chat_action(update.effective_chat.id, ChatAction.TYPING)
+        else:
+            await query.edit_message_text("🤔 Генерирую вопрос... ⏳")
+        api_calls += 1
+
+        # Берем непросмотренный вопрос из хранилища, когда такие закончились - генерируем через ChatGPT
+        store = get_content_store()
+        user_id = update.effective_user.id
+        quiz_topic = context.user_data.get('quiz_topic', '')
+        question_response = store.draw_unseen(user_id, KIND_QUIZ, quiz_topic)
+        from_store = question_response is not None
+        if from_store:
+            logger.info("Вопрос выдан из хранилища контента")
+        else:
+            question_response = await get_personality_response("Создай новый вопрос", topic_data['prompt'], feature="quiz")
 
         # Парсим ответ
         parsed_question = parse_question_response(question_response)
 
+        # Удачно сгенерированный вопрос пополняет хранилище
+        if parsed_question and not from_store:
+            store.add(KIND_QUIZ, quiz_topic, question_response.strip(), seen_by=user_id)
+
         if not parsed_question:
-            await update.callback_query.edit_message_text(
+            await _edit_or_reply(
+                query,
                 "❌ Ошибка генерации вопроса. Попробуйте еще раз.",
                 reply_markup=get_quiz_continue_keyboard(context.user_data['quiz_topic'])
             )
             return
 
+        context.user_data['total_questions'] += 1
+
+        poll = _poll_options(parsed_question) if poll_mode else None
+        if poll:
+            options, correct_option_id = poll
+            message = await context.bot.send_poll(
+                chat_id=update.effective_chat.id,
+                question=parsed_question['question'],
+                options=options,
+                type=Poll.QUIZ,
+                correct_option_id=correct_option_id,
+                is_anonymous=False,
+                reply_markup=get_quiz_continue_keyboard(quiz_topic)
+            )
+            polls = context.bot_data.setdefault('quiz_polls', {})
+            if len(polls) >= MAX_PENDING_POLLS:
+                # Опросы без ответа не копятся бесконечно: вытесняется самый старый
+                del polls[next(iter(polls))]
+            polls[message.poll.id] = (user_id, quiz_topic, correct_option_id, api_calls + 1)
+            # В многопроцессном режиме ответ на опрос должен прийти в этот воркер
+            sharding.register_poll(message.poll.id)
+            return
+
         # Сохраняем правильный ответ
         context.user_data['correct_answer'] = parsed_question['correct_answer']
-        context.user_data['total_questions'] += 1
+        context.user_data['quiz_api_calls'] = api_calls + 1
 
         # Формируем сообщение с вопросом
         question_text = (
@@ -221,14 +318,16 @@ async def generate_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"<i>Напишите букву правильного ответа (A, B, C или D)</i>"
         )
 
-        await update.callback_query.edit_message_text(
+        await _edit_or_reply(
+            query,
             question_text,
             parse_mode='HTML'
         )
 
     except Exception as e:
         logger.error(f"Ошибка в generate_question: {e}", exc_info=True)
-        await update.callback_query.edit_message_text(
+        await _edit_or_reply(
+            query,
             "❌ Произошла ошибка при генерации вопроса.",
             reply_markup=get_quiz_continue_keyboard(context.user_data.get('quiz_topic', ''))
         )
@@ -284,8 +383,9 @@ async def handle_quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """
     Обработчик ответа пользователя на вопрос квиза.
 
-    Проверяет правильность ответа, обновляет статистику и предлагает
-    продолжить квиз или сменить тему.
+    Проверяет правильность ответа, обновляет статистику сессии и
+    долговременные счетчики и предлагает продолжить квиз или сменить тему.
+    На каждый вопрос засчитывается только первый ответ.
 
     Args:
         update (Update): Объект обновления от Telegram с ответом пользователя
@@ -296,7 +396,6 @@ async def handle_quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """
     try:
         user_answer = update.message.text.strip().upper()
-        correct_answer = context.user_data.get('correct_answer')
 
         if user_answer not in ['A', 'B', 'C', 'D']:
             await update.message.reply_text(
@@ -304,11 +403,23 @@ async def handle_quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
             )
             return ANSWERING_QUESTION
 
+        correct_answer = context.user_data.pop('correct_answer', None)
+        if correct_answer is None:
+            await update.message.reply_text(
+                "📊 Выберите вариант в опросе выше." if QUIZ_MODE == QUIZ_MODE_POLL
+                else "ℹ️ На этот вопрос вы уже ответили.",
+                reply_markup=get_quiz_continue_keyboard(context.user_data['quiz_topic'])
+            )
+            return ANSWERING_QUESTION
+
         # Проверяем ответ
         is_correct = user_answer == correct_answer
         if is_correct:
             context.user_data['correct_answers'] += 1
 
+        user = update.effective_user
+        get_quiz_stats().record_answer(user.id, user.full_name, context.user_data['quiz_topic'], is_correct)
+
         # Формируем ответ
         correct_count = context.user_data.get('correct_answers', 0)
         total_count = context.user_data.get('total_questions', 0)
@@ -329,6 +440,8 @@ async def handle_quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
             parse_mode='HTML',
             reply_markup=get_quiz_continue_keyboard(context.user_data['quiz_topic'])
         )
+        api_calls = context.user_data.pop('quiz_api_calls', 0) + 2
+        logger.info(f"📊 quiz ({QUIZ_MODE_TEXT}): вызовов Bot API на вопрос: {api_calls}")
 
         return ANSWERING_QUESTION
 
@@ -355,18 +468,19 @@ async def handle_quiz_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         int: Соответствующее состояние в зависимости от выбранного действия
     """
     query = update.callback_query
+    action = context.callback_payload.action
     await query.answer()
 
-    if query.data.startswith("quiz_continue_"):
+    if action == QUIZ_CONTINUE:
         # Генерируем новый вопрос
         await generate_question(update, context)
         return ANSWERING_QUESTION
 
-    elif query.data == "quiz_change_topic":
+    elif action == QUIZ_CHANGE_TOPIC:
         # Смена темы
         return await quiz_start(update, context)
 
-    elif query.data == "quiz_finish":
+    elif action == QUIZ_FINISH:
         # Завершение квиза
         correct_count = context.user_data.get('correct_answers', 0)
         total_count = context.user_data.get('total_questions', 0)
@@ -390,7 +504,13 @@ async def handle_quiz_callback(update: Update, context: ContextTypes.DEFAULT_TYP
             else:
                 final_text += "📚 Стоит подучиться!"
 
-        await query.edit_message_text(final_text, parse_mode='HTML')
+        topic_correct, topic_total = get_quiz_stats().user_stats(
+            update.effective_user.id, context.user_data.get('quiz_topic', ALL_TOPICS)
+        )
+        if topic_total:
+            final_text += f"\n\n🗂 За все время в этой теме: {topic_correct}/{topic_total}"
+
+        await _edit_or_reply(query, final_text, parse_mode='HTML')
 
         context.user_data.clear()
         await asyncio.sleep(3)
@@ -398,3 +518,95 @@ async def handle_quiz_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         return -1
 
     return ANSWERING_QUESTION
+
+
+async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Обработчик ответа на опрос-викторину квиза (режим QUIZ_MODE=poll).
+
+    Telegram сам показывает пользователю правильный ответ, поэтому бот
+    только обновляет статистику сессии и долговременные счетчики, не
+    отправляя сообщений. Засчитывается ответ пользователя, которому
+    отправлен вопрос.
+
+    Args:
+        update (Update): Объект обновления с PollAnswer
+        context (ContextTypes.DEFAULT_TYPE): Контекст пользователя, ответившего на опрос
+    """
+    answer = update.poll_answer
+    polls = context.bot_data.get('quiz_polls', {})
+    pending = polls.get(answer.poll_id)
+    if pending is None or not answer.option_ids or answer.user.id != pending[0]:
+        return
+
+    del polls[answer.poll_id]
+    user_id, quiz_topic, correct_option_id, api_calls = pending
+    is_correct = answer.option_ids[0] == correct_option_id
+    if is_correct and 'correct_answers' in context.user_data:
+        context.user_data['correct_answers'] += 1
+
+    get_quiz_stats().record_answer(user_id, answer.user.full_name, quiz_topic, is_correct)
+    logger.info(f"📊 quiz ({QUIZ_MODE_POLL}): вызовов Bot API на вопрос: {api_calls}")
+
+
+async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Обработчик команды /leaderboard - таблица лидеров квиза.
+
+    Без аргумента показывает общий зачет по всем темам, с ключом темы
+    (например, /leaderboard history) - зачет по теме. Таблица берется из
+    поддерживаемого в памяти top-K, без пересчета по базе.
+
+    Args:
+        update (Update): Объект обновления от Telegram
+        context (ContextTypes.DEFAULT_TYPE): Контекст выполнения с аргументами команды
+    """
+    topic = context.args[0].lower() if context.args else ALL_TOPICS
+    if topic != ALL_TOPICS and topic not in QUIZ_TOPICS:
+        await update.message.reply_text(
+            "❓ Неизвестная тема. Доступные темы: " + ", ".join(QUIZ_TOPICS)
+        )
+        return
+
+    stats = get_quiz_stats()
+    title = QUIZ_TOPICS[topic]["name"] if topic else "🌐 Все темы"
+    lines = [f"🏆 <b>Таблица лидеров</b> - {title}\n"]
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    leaders = stats.leaderboard(topic)
+    for place, (name, correct, total) in enumerate(leaders, start=1):
+        lines.append(f"{medals.get(place, f'{place}.')} {html.escape(name)} - {correct}/{total}")
+    if not leaders:
+        lines.append("Пока никто не отвечал на вопросы.")
+
+    correct, total = stats.user_stats(update.effective_user.id, topic)
+    lines.append(f"\n📊 <b>Ваш результат:</b> {correct}/{total}")
+
+    await update.message.reply_text("\n".join(lines), parse_mode='HTML')
+
+
+ROUTES = {
+    "commands": {"leaderboard": leaderboard_command},
+    "poll_answers": [handle_poll_answer],
+}
+
+
+CONVERSATION = {
+    "name": "quiz",
+    "entry_commands": {"quiz": quiz_command},
+    "entry_callbacks": {(NS_QUIZ, QUIZ_OPEN): quiz_start},
+    "states": {
+        SELECTING_TOPIC: {
+            "callbacks": {(NS_QUIZ, QUIZ_TOPIC): topic_selected},
+        },
+        ANSWERING_QUESTION: {
+            "text": handle_quiz_answer,
+            "callbacks": {
+                (NS_QUIZ, QUIZ_CONTINUE): handle_quiz_callback,
+                (NS_QUIZ, QUIZ_CHANGE_TOPIC): handle_quiz_callback,
+                (NS_QUIZ, QUIZ_FINISH): handle_quiz_callback,
+            },
+        },
+    },
+    "fallback_commands": {"start": basic.start},
+    "fallback_callbacks": {(NS_QUIZ, QUIZ_FINISH): handle_quiz_callback},
+}
@@ -7,25 +7,52 @@
 """
 
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
-from services.openai_client import get_random_fact
+from services.content_store import KIND_FACT, get_content_store
+from services.openai_client import FACT_ERROR_TEXT, generate_fact
+from data.callbacks import NS_RANDOM, RANDOM_OPEN, RANDOM_MORE, RANDOM_FINISH
+from data.menus import RANDOM_FACT_KEYBOARD
 from handlers import basic
 
 logger = logging.getLogger(__name__)
 
-keyboard = [
-    [InlineKeyboardButton("🎲 Хочу ещё факт", callback_data="random_more")],
-    [InlineKeyboardButton("🏠 Закончить", callback_data="random_finish")]
-]
+reply_markup = RANDOM_FACT_KEYBOARD
 
-reply_markup = InlineKeyboardMarkup(keyboard)
+
+async def next_fact(user_id: int) -> str:
+    """
+    Возвращает непросмотренный пользователем факт.
+
+    Факт берется из хранилища контента, а когда непросмотренные факты
+    закончились - генерируется через ChatGPT и сохраняется в хранилище
+    уже отмеченным как просмотренный.
+
+    Args:
+        user_id (int): ID пользователя
+
+    Returns:
+        str: Текст факта или сообщение об ошибке
+    """
+    store = get_content_store()
+    fact = store.draw_unseen(user_id, KIND_FACT)
+    if fact is not None:
+        logger.info("Факт выдан из хранилища контента")
+        return fact
+    try:
+        fact = await generate_fact()
+    except Exception as e:
+        logger.error(f"Ошибка при получении факта от OpenAI: {e}")
+        return FACT_ERROR_TEXT
+    store.add(KIND_FACT, "", fact, seen_by=user_id)
+    return fact
 
 async def random_fact(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обработчик команды /random для получения случайного факта.
 
-    Генерирует случайный факт с помощью OpenAI API и отправляет его пользователю
+    Берет непросмотренный факт из хранилища контента (или генерирует его с
+    помощью OpenAI API, если такие факты закончились) и отправляет его пользователю
     вместе с inline клавиатурой для получения дополнительных фактов.
 
     Args:
@@ -35,7 +62,7 @@ async def random_fact(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("Запуск обработки random_fact")
     try:
         loading_msg = await update.message.reply_text("🎲 Генерирую интересный факт... ⏳")
-        fact = await get_random_fact()
+        fact = await next_fact(update.effective_user.id)
         await loading_msg.edit_text(
             f"🧠 <b>Интересный факт:</b>\n\n{fact}",
             parse_mode='HTML',
@@ -60,15 +87,16 @@ async def random_fact_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         context (ContextTypes.DEFAULT_TYPE): Контекст выполнения callback
     """
     query = update.callback_query
-    logger.info(f"Обработка нажатий кнопок для рандомных фактов {query.data}")
+    action = context.callback_payload.action
+    logger.info(f"Обработка нажатий кнопок для рандомных фактов {action}")
 
     await query.answer()
 
-    if query.data in["random_more","random_fact"]:
+    if action in (RANDOM_MORE, RANDOM_OPEN):
         logger.info("Обработка random_more")
         try:
             await query.edit_message_text("🎲 Генерирую новый факт... ⏳")
-            fact = await get_random_fact()
+            fact = await next_fact(update.effective_user.id)
             await query.edit_message_text(
                 f"🧠 <b>Интересный факт:</b>\n\n{fact}",
                 parse_mode='HTML',
@@ -81,6 +109,16 @@ async def random_fact_callback(update: Update, context: ContextTypes.DEFAULT_TYP
                 "Используйте /start чтобы вернуться в меню."
             )
 
-    elif query.data == "random_finish":
+    elif action == RANDOM_FINISH:
         logger.info("Обработка random_finish")
         await basic.start(update,context)
+
+
+ROUTES = {
+    "commands": {"random": random_fact},
+    "callbacks": {
+        (NS_RANDOM, RANDOM_OPEN): random_fact_callback,
+        (NS_RANDOM, RANDOM_MORE): random_fact_callback,
+        (NS_RANDOM, RANDOM_FINISH): random_fact_callback,
+    },
+}
@@ -0,0 +1,196 @@
+"""
+Декларативная маршрутизация обновлений бота.
+
+Каждый модуль обработчиков описывает свои маршруты словарем:
+- CONVERSATION - диалог с состояниями (entry points, states, fallbacks)
+- ROUTES - команды, callback-и и ответы на опросы (poll_answers) вне диалогов
+
+Модуль собирает из этих описаний handler-ы telegram.ext. Вместо набора
+CallbackQueryHandler с регулярными выражениями каждый набор callback-ов
+обслуживается одним CallbackRouter: callback_data разбирается кодеком
+data.callbacks, а обработчик выбирается поиском в словаре по паре
+(namespace, action). Разобранный payload доступен обработчику как
+context.callback_payload.
+
+Нажатия, для которых не нашлось маршрута (кнопки старых версий схемы,
+кнопки диалога, из которого пользователь уже вышел), получают ответ на
+callback query от последнего handler-а, чтобы у клиента не висел индикатор
+загрузки.
+
+Описание диалога:
+    CONVERSATION = {
+        "name": "gpt",
+        "entry_commands": {"gpt": gpt_command},
+        "entry_callbacks": {(NS_GPT, GPT_OPEN): gpt_command},
+        "states": {
+            WAITING_FOR_MESSAGE: {
+                "text": handle_gpt_message,
+                "callbacks": {(NS_GPT, GPT_CONTINUE): continue_gpt},
+            },
+        },
+        "fallback_commands": {"start": basic.start},
+        "fallback_callbacks": {(NS_GPT, GPT_FINISH): finish_gpt},
+    }
+"""
+
+import logging
+
+from telegram import Update
+from telegram.ext import (
+    BaseHandler, CallbackQueryHandler, CommandHandler, ConversationHandler, MessageHandler, PollAnswerHandler, filters,
+)
+
+from data.callbacks import decode_callback
+
+logger = logging.getLogger(__name__)
+
+# Фильтры сообщений, доступные в описании состояний
+MESSAGE_FILTERS = {
+    "text": filters.TEXT & ~filters.COMMAND,
+    "voice": filters.VOICE,
+}
+
+STALE_BUTTON_TEXT = "⌛ Кнопка устарела. Откройте меню заново: /start"
+
+
+async def reject_stale_callback(update: Update, context) -> None:
+    """
+    Отвечает на нажатие кнопки, для которой не нашлось обработчика.
+
+    Args:
+        update (Update): Объект обновления от Telegram
+        context (ContextTypes.DEFAULT_TYPE): Контекст выполнения
+    """
+    logger.info(f"Отклонена устаревшая кнопка: {update.callback_query.data}")
+    await update.callback_query.answer(STALE_BUTTON_TEXT)
+
+
+class CallbackRouter(BaseHandler):
+    """
+    Handler callback query с выбором обработчика по словарю маршрутов.
+
+    Маршруты задаются парами (namespace, action) из data.callbacks.
+    Кнопки, которые не удалось разобрать или для которых нет маршрута,
+    роутер пропускает дальше по цепочке handler-ов.
+    """
+
+    __slots__ = ("routes",)
+
+    def __init__(self, routes: dict):
+        super().__init__(self._dispatch)
+        self.routes = dict(routes)
+
+    def resolve(self, data: str):
+        """
+        Находит обработчик для callback_data.
+
+        Args:
+            data (str): callback_data нажатой кнопки
+
+        Returns:
+            callable: Обработчик или None, если маршрут не найден
+        """
+        payload = decode_callback(data)
+        if payload is None:
+            return None
+        return self.routes.get(payload.route)
+
+    def check_update(self, update: object):
+        if isinstance(update, Update) and update.callback_query:
+            data = update.callback_query.data
+            if isinstance(data, str):
+                return self.resolve(data)
+        return None
+
+    async def handle_update(self, update, application, check_result, context):
+        self.collect_additional_context(context, update, application, check_result)
+        context.callback_payload = decode_callback(update.callback_query.data)
+        return await check_result(update, context)
+
+    async def _dispatch(self, update, context):
+        callback = self.resolve(update.callback_query.data)
+        return await callback(update, context)
+
+
+def _command_handlers(commands: dict) -> list:
+    return [CommandHandler(command, callback) for command, callback in commands.items()]
+
+
+def _callback_handlers(callbacks: dict) -> list:
+    return [CallbackRouter(callbacks)] if callbacks else []
+
+
+def _state_handlers(state: dict) -> list:
+    handlers = [
+        MessageHandler(message_filter, state[kind])
+        for kind, message_filter in MESSAGE_FILTERS.items()
+        if kind in state
+    ]
+    return handlers + _callback_handlers(state.get("callbacks", {}))
+
+
+def build_conversation(spec: dict) -> ConversationHandler:
+    """
+    Строит ConversationHandler по описанию CONVERSATION модуля.
+
+    Состояние диалога хранится в persistence приложения (services.persistence).
+
+    Args:
+        spec (dict): Описание диалога
+
+    Returns:
+        ConversationHandler: Готовый handler диалога
+    """
+    return ConversationHandler(
+        entry_points=(
+            _command_handlers(spec.get("entry_commands", {}))
+            + _callback_handlers(spec.get("entry_callbacks", {}))
+        ),
+        states={state: _state_handlers(state_spec) for state, state_spec in spec["states"].items()},
+        fallbacks=(
+            _command_handlers(spec.get("fallback_commands", {}))
+            + _callback_handlers(spec.get("fallback_callbacks", {}))
+        ),
+        name=spec["name"],
+        persistent=True,
+    )
+
+
+def build_handlers(modules) -> list:
+    """
+    Собирает все handler-ы бота из описаний ROUTES и CONVERSATION модулей.
+
+    Сначала регистрируются диалоги в порядке перечисления модулей, затем
+    маршруты вне диалогов (команды, один общий CallbackRouter и обработчики
+    ответов на опросы) и последним - ответ на нажатия, которые не забрал ни
+    один маршрут. Диалоги идут первыми, чтобы их fallbacks (например, /start
+    с отменой голосовых задач) перехватывали команду раньше одноименной
+    команды вне диалогов; пользователю вне диалога /start по-прежнему
+    отвечает маршрут из ROUTES. Ответы на опросы не привязаны к чату, поэтому
+    обрабатываются только вне диалогов.
+
+    Args:
+        modules (iterable): Модули обработчиков
+
+    Returns:
+        list: Handler-ы для Application.add_handler в порядке регистрации
+    """
+    commands = {}
+    callbacks = {}
+    poll_answers = []
+    conversations = []
+    for module in modules:
+        routes = getattr(module, "ROUTES", None)
+        if routes:
+            commands.update(routes.get("commands", {}))
+            callbacks.update(routes.get("callbacks", {}))
+            poll_answers.extend(PollAnswerHandler(callback) for callback in routes.get("poll_answers", ()))
+        spec = getattr(module, "CONVERSATION", None)
+        if spec:
+            conversations.append(build_conversation(spec))
+
+    logger.info(f"Маршруты: {len(commands)} команд, {len(callbacks)} callback-ов, {len(conversations)} диалогов")
+    return (
+        conversations + _command_handlers(commands) + _callback_handlers(callbacks) + poll_answers
+        + [CallbackQueryHandler(reject_stale_callback)]
+    )
@@ -15,13 +15,19 @@
 
 import logging
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 import os
 
 from data.languages import get_languages_data, get_translate_keyboard
+from data.callbacks import (
+    NS_MENU, MENU_MAIN,
+    NS_TRANSLATE, TRANSLATE_OPEN, TRANSLATE_SELECT, TRANSLATE_CONTINUE, TRANSLATE_CHANGE, TRANSLATE_FINISH,
+)
+from data.menus import TRANSLATE_CAPTION, TRANSLATOR_SELECTED_KEYBOARD, TRANSLATOR_CHAT_KEYBOARD
 from handlers import basic
 from services.openai_client import get_personality_response
+from services.reply_pipeline import ReplyTurn
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +40,11 @@ async def translate_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Args:
         update (Update): Объект обновления от Telegram
         context (ContextTypes.DEFAULT_TYPE): Контекст выполнения
+
+    Returns:
+        int: SELECTION_LANGUAGE для перехода в состояние выбора языка
     """
-    await translate_start(update, context)
+    return await translate_start(update, context)
 
 async def translate_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -53,11 +62,7 @@ async def translate_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     try:
         image_path = "data/images/translate.png"
-        message_text = (
-            "🌍 <b>Переводчик</b>\n\n"
-            "Выберите язык для перевода:\n\n"
-            "Я могу переводить с русского на выбранный язык и обратно!"
-        )
+        message_text = TRANSLATE_CAPTION
 
         keyboard = get_translate_keyboard()
 
@@ -137,7 +142,7 @@ async def languages_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
 
     try:
-        language_key = query.data.replace("languages_", "")
+        language_key = context.callback_payload.key
         language = get_languages_data(language_key)
 
         if not language:
@@ -147,13 +152,6 @@ async def languages_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
         context.user_data['current_language'] = language_key
         context.user_data['language_data'] = language
 
-        keyboard = [
-            [InlineKeyboardButton("📝 Продолжить перевод", callback_data="continue_translate")],
-            [InlineKeyboardButton("🔄 Сменить язык", callback_data="change_languages")],
-            [InlineKeyboardButton("🏠 Вернуться в меню", callback_data="finish_translate")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
             f"{language['emoji']} <b>Выбран язык: {language['name']}</b>\n\n"
             f"📝 Теперь напишите любой текст, и я переведу его!\n\n"
@@ -163,7 +161,7 @@ async def languages_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
             f"• Что такое искусственный интеллект?\n\n"
             f"Я автоматически определю направление перевода!",
             parse_mode='HTML',
-            reply_markup=reply_markup
+            reply_markup=TRANSLATOR_SELECTED_KEYBOARD
         )
 
         return CHATING_WITH_TRANSLATOR
@@ -188,6 +186,7 @@ async def handle_languages_message(update: Update, context: ContextTypes.DEFAULT
         int: CHATING_WITH_TRANSLATOR для продолжения режима перевода
     """
     logger.info(f"Получено сообщение для перевода: {update.message.text}")
+    turn = ReplyTurn(update, context, "translate")
     try:
         user_message = update.message.text
         language_key = context.user_data.get('current_language')
@@ -198,25 +197,18 @@ async def handle_languages_message(update: Update, context: ContextTypes.DEFAULT
                 "❌ Произошла ошибка: язык не выбран. Используйте /translate для начала"
             )
             return CHATING_WITH_TRANSLATOR
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        processing_msg = await update.message.reply_text("🔄 Перевожу текст... ⏳")
-        translation = await get_personality_response(user_message, language_data['prompt'])
-        await processing_msg.delete()
-        keyboard = [
-            [InlineKeyboardButton("🔄 Сменить язык", callback_data="change_languages")],
-            [InlineKeyboardButton("🏠 Вернуться в меню", callback_data="finish_translate")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
+        await turn.start("🔄 Перевожу текст... ⏳")
+        translation = await get_personality_response(user_message, language_data['prompt'], feature="translate")
+        await turn.finish(
             f"{language_data['emoji']} <b>Перевод:</b>\n\n{translation}",
             parse_mode='HTML',
-            reply_markup=reply_markup
+            reply_markup=TRANSLATOR_CHAT_KEYBOARD
         )
         return CHATING_WITH_TRANSLATOR
 
     except Exception as e:
         logger.error(f"Ошибка в handle_languages_message: {e}", exc_info=True)
-        await update.message.reply_text("😔 Произошла ошибка при переводе. Попробуйте снова.")
+        await turn.fail("😔 Произошла ошибка при переводе. Попробуйте снова.")
         return CHATING_WITH_TRANSLATOR
 
 async def handle_languages_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -236,23 +228,51 @@ async def handle_languages_callback(update: Update, context: ContextTypes.DEFAUL
         int: Соответствующее состояние в зависимости от выбранного действия
     """
     query = update.callback_query
-    logger.info(f"Получен callback в Translator: {query.data}")
+    action = context.callback_payload.action
+    logger.info(f"Получен callback в Translator: {action}")
     await query.answer()
 
-    if query.data == "continue_translate":
+    if action == TRANSLATE_CONTINUE:
         language_data = context.user_data.get("language_data")
         if language_data:
             logger.info("Продолжение перевода с тем же языком")
         return CHATING_WITH_TRANSLATOR
 
-    elif query.data == "change_languages":
+    elif action == TRANSLATE_CHANGE:
         logger.info("Смена языка")
         return await translate_start(update, context)
 
-    elif query.data == "finish_translate":
+    elif action == TRANSLATE_FINISH:
         logger.info("Завершение работы переводчика")
         context.user_data.clear()
         await basic.start(update, context)
         return ConversationHandler.END
 
     return CHATING_WITH_TRANSLATOR
+
+
+_TRANSLATOR_CALLBACKS = {
+    (NS_TRANSLATE, TRANSLATE_CONTINUE): handle_languages_callback,
+    (NS_TRANSLATE, TRANSLATE_FINISH): handle_languages_callback,
+    (NS_TRANSLATE, TRANSLATE_CHANGE): handle_languages_callback,
+}
+
+CONVERSATION = {
+    "name": "translator",
+    "entry_commands": {"translate": translate_command},
+    "entry_callbacks": {(NS_TRANSLATE, TRANSLATE_OPEN): translate_start},
+    "states": {
+        SELECTION_LANGUAGE: {
+            "callbacks": {**_TRANSLATOR_CALLBACKS, (NS_TRANSLATE, TRANSLATE_SELECT): languages_selected},
+        },
+        CHATING_WITH_TRANSLATOR: {
+            "text": handle_languages_message,
+            "callbacks": _TRANSLATOR_CALLBACKS,
+        },
+    },
+    "fallback_commands": {"start": basic.start},
+    "fallback_callbacks": {
+        (NS_TRANSLATE, TRANSLATE_FINISH): basic.menu_callback,
+        (NS_MENU, MENU_MAIN): basic.menu_callback,
+    },
+}
@@ -15,37 +15,31 @@
 Интегрируется с services.voice_recognition для обработки аудио.
 """
 
-from dotenv import load_dotenv
 from telegram.ext import (
                           ConversationHandler,
                           CallbackContext, ContextTypes)
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 import os
 import logging
+from data.callbacks import NS_MENU, MENU_MAIN, NS_VOICE, VOICE_OPEN, VOICE_STOP
+from data.menus import VOICE_CAPTION, VOICE_KEYBOARD
 from handlers import basic
+from services.voice_jobs import VoiceJobRejected, get_voice_queue
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 VOICE_DIALOG: int = 1
 
-CAPTION_VOICE = (
-    "🎤 <b>Голосовой чат с ChatGPT</b>\n\n"
-    "📱 Отправьте голосовое сообщение, и я отвечу голосом!\n\n"
-    "💡 <b>Как это работает:</b>\n"
-    "1. Отправьте голосовое сообщение\n"
-    "2. Я распознаю вашу речь\n"
-    "3. Отправлю текст в ChatGPT\n"
-    "4. Получу ответ и озвучу его\n\n"
-    "🗣️ Говорите четко и не слишком быстро для лучшего распознавания."
-)
+CAPTION_VOICE = VOICE_CAPTION
 
 async def start_voice_dialog(update: Update, context: CallbackContext) -> int:
     """
     Запускает голосовой диалог с ChatGPT.
 
-    Инициализирует новую сессию голосового чата, очищает историю диалога
-    и отправляет приветственное меню с инструкциями.
+    Инициализирует новую сессию голосового чата, отменяет задачи прошлой
+    сессии, очищает историю диалога и отправляет приветственное меню
+    с инструкциями.
 
     Args:
         update (Update): Объект обновления от Telegram
@@ -55,6 +49,7 @@ async def start_voice_dialog(update: Update, context: CallbackContext) -> int:
         int: VOICE_DIALOG для перехода в состояние голосового диалога
     """
     logger.info("Начинается диалог с голосовыми сообщениями.")
+    get_voice_queue().cancel_user(update.effective_user.id)
     context.user_data['voice_history'] = []  # Очистка истории
     await send_voice_menu(update, context)
     return VOICE_DIALOG
@@ -72,11 +67,7 @@ async def send_voice_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """
     image_path = "data/images/voice_chat.png"
     caption = CAPTION_VOICE
-
-    keyboard = [
-        [InlineKeyboardButton("🏠 Вернуться в меню", callback_data="voice_stop")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = VOICE_KEYBOARD
 
     try:
         if update.message:
@@ -139,7 +130,8 @@ async def voice_cancel(update: Update, context: CallbackContext) -> int:
     """
     Завершает голосовой диалог и возвращает в главное меню.
 
-    Очищает данные пользователя и возвращает в главное меню бота.
+    Отменяет голосовые задачи пользователя в очереди, очищает данные
+    пользователя и возвращает в главное меню бота.
 
     Args:
         update (Update): Объект обновления от Telegram
@@ -153,6 +145,53 @@ async def voice_cancel(update: Update, context: CallbackContext) -> int:
         await query.answer()
 
     logger.info("Голосовой диалог завершен пользователем")
+    get_voice_queue().cancel_user(update.effective_user.id)
     context.user_data.clear()
     await basic.start(update, context)
     return ConversationHandler.END
+
+async def handle_voice_message(update: Update, context: CallbackContext) -> int:
+    """
+    Ставит голосовое сообщение в очередь обработки.
+
+    Слишком длинные сообщения и сообщения сверх лимита пользователя
+    отклоняются по voice.duration до скачивания. Если все слоты заняты,
+    пользователь получает свою позицию в очереди. Сервис распознавания
+    импортируется при первом сообщении, так как сам зависит от этого модуля.
+
+    Args:
+        update (Update): Объект обновления от Telegram с голосовым сообщением
+        context (CallbackContext): Контекст выполнения
+
+    Returns:
+        int: VOICE_DIALOG для продолжения conversation handler
+    """
+    from services.voice_recognition import handle_voice
+
+    queue = get_voice_queue()
+    user_id = update.effective_user.id
+    try:
+        queue.check(user_id, update.message.voice.duration)
+    except VoiceJobRejected as e:
+        logger.info(f"Голосовое сообщение пользователя {user_id} отклонено: {e}")
+        await update.message.reply_text(str(e))
+        return VOICE_DIALOG
+
+    position = queue.submit(context.application, user_id, handle_voice(update, context), update)
+    if position:
+        await update.message.reply_text(f"⏳ Сообщение в очереди, позиция: {position}")
+    return VOICE_DIALOG
+
+
+CONVERSATION = {
+    "name": "voice",
+    "entry_commands": {"voice": start_voice_dialog},
+    "entry_callbacks": {(NS_VOICE, VOICE_OPEN): start_voice_dialog},
+    "states": {
+        VOICE_DIALOG: {
+            "voice": handle_voice_message,
+        },
+    },
+    "fallback_commands": {"start": voice_cancel},
+    "fallback_callbacks": {(NS_MENU, MENU_MAIN): voice_cancel, (NS_VOICE, VOICE_STOP): voice_cancel},
+}
@@ -3,7 +3,27 @@
 
 Включает в себя:
 - openai_client.py - клиент для работы с OpenAI API (ChatGPT)
+- content_store.py - хранилище заранее сгенерированных фактов и вопросов квиза
+- seen_set.py - компактные множества просмотренного (roaring bitmap)
+- quiz_stats.py - долговременная статистика квиза и таблицы лидеров
+- content_batch.py - пакетная генерация контента через OpenAI Batch API (CLI)
+- openai_stub.py - локальная заглушка OpenAI-совместимого API: чат, файлы, пакеты (CLI)
+- semantic_cache.py - семантический кэш ответов ChatGPT
 - voice_recognition.py - сервис для обработки голосовых сообщений
+- voice_jobs.py - очередь голосовых задач с лимитами на пользователя и процесс
+- stt.py - бэкенды распознавания речи (Google, офлайн Vosk)
+- vad.py - обрезка тишины и деление голосовых сообщений на фразы
+- speech_bench.py - бенчмарк распознавания речи на наборе клипов: WER, задержка, экономия VAD (CLI)
+- tts.py - бэкенды синтеза речи (gTTS, офлайн Piper)
+- rate_limiter.py - очередь исходящих запросов Bot API с лимитами Telegram
+- telegram_http.py - пулы соединений и таймауты HTTP-клиента Bot API
+- persistence.py - хранилище user_data и состояний диалогов (память, Redis)
+- lifecycle.py - остановка без потери принятой работы, временные аудиофайлы
+- sharding.py - многопроцессный режим: раздача обновлений воркерам по chat_id
+- health.py - HTTP-проверки /healthz и /readyz, задержка event loop
+- dispatch_bench.py - микробенчмарк выбора обработчика callback query (CLI)
+- bot_api_loadtest.py - нагрузочные тесты на заглушке Bot API: пул соединений, воркеры, остановка (CLI)
+- reply_pipeline.py - конвейер ответов с минимальным числом вызовов Bot API
 
 Все сервисы предоставляют асинхронные функции для интеграции с основным ботом.
 """
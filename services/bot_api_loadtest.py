@@ -0,0 +1,523 @@
+"""
+Нагрузочные тесты бота на локальной заглушке Bot API.
+
+Заглушка Bot API (asyncio, HTTP/1.1 keep-alive, фиксированная задержка
+ответа) работает в отдельном процессе, чтобы она не делила event loop и
+процессор с клиентом. Режимы:
+
+pool - пачка параллельных sendMessage через python-telegram-bot с
+настройками services.telegram_http, меняется только размер пула
+соединений. Для каждого размера печатаются перцентили задержки, число
+ошибок (в том числе PoolTimeout) и пропускная способность.
+
+    python -m services.bot_api_loadtest pool --pool-sizes 1,8,32,64,256 --requests 2000 --concurrency 200
+
+Параметр --base-url направляет запросы на внешний сервер (например,
+локальный telegram-bot-api) вместо встроенной заглушки.
+
+sharding - заглушка отдает через getUpdates заданное число команд /start
+от разных чатов, а бот (bot.py) запускается отдельным процессом с
+BOT_WORKERS = 1, 2, ... и временными базами. Для каждого числа воркеров
+печатается число обработанных обновлений в секунду (от первой выдачи
+getUpdates до последнего ответа sendMessage).
+
+    python -m services.bot_api_loadtest sharding --workers 1,2,4 --updates 2000 --chats 500
+
+shutdown - бот получает /voice и голосовые сообщения (с временными
+аудиофайлами) и под нагрузкой останавливается сигналом SIGTERM. Печатается
+число обновлений, подтвержденных Telegram, число ответов, потерянные
+голосовые сообщения (подтвержденные, но оставшиеся без итогового ответа),
+оставшиеся временные файлы и время остановки. Код завершения 1, если
+хотя бы один прогон потерял работу, оставил файлы или завершился с ошибкой.
+
+    python -m services.bot_api_loadtest shutdown --workers 1,2 --updates 300 --after 100
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+from telegram.error import TelegramError
+from telegram.ext import ApplicationBuilder
+
+from services.telegram_http import apply_http_settings, load_http_settings
+
+logger = logging.getLogger(__name__)
+
+STUB_TOKEN = "123456:loadtest"
+
+STUB_RESULTS = {
+    "getMe": {"id": 123456, "is_bot": True, "first_name": "Stub", "username": "stub_bot"},
+    "getFile": {"file_id": "voice", "file_unique_id": "voice", "file_size": 64, "file_path": "voice/voice.ogg"},
+}
+
+# Содержимое скачиваемых с заглушки файлов (голосовые сообщения)
+STUB_FILE = b"OggS" + bytes(60)
+
+# Методы-ответы пользователю: возвращают сообщение и учитываются в счетчике ответов
+REPLY_METHODS = frozenset({"sendMessage", "sendPhoto", "sendVoice", "editMessageText"})
+
+# Сценарии обновлений заглушки: start - только /start, voice - /voice и затем голосовые сообщения
+STUB_SCRIPTS = ("start", "voice")
+
+# Сколько заглушка держит пустой getUpdates, как long polling без обновлений
+STUB_POLL_WAIT = 0.5
+
+# Корень проекта: отсюда запускается bot.py в режимах sharding и shutdown
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _request_params(payload: bytes, content_type: str) -> dict:
+    if content_type.startswith("multipart/form-data"):
+        # Из multipart (отправка файлов) нужен только chat_id
+        match = re.search(rb'name="chat_id"\r\n\r\n(-?\d+)', payload)
+        return {"chat_id": match.group(1).decode()} if match else {}
+    return {key: values[0] for key, values in urllib.parse.parse_qs(payload.decode()).items()}
+
+
+class _StubUpdates:
+    # Синтетические обновления заглушки от chats разных чатов и счетчики ответов по чатам
+    def __init__(self, updates: int = 0, chats: int = 1, script: str = "start"):
+        self.updates = updates
+        self.chats = chats
+        self.script = script
+        self.first_served = None
+        self.last_sent = None
+        self.sent = 0
+        self.acked = 0
+        self.completed = {}
+
+    def chat_for(self, update_id: int) -> int:
+        return 1000 + update_id % self.chats
+
+    def _update(self, update_id: int) -> dict:
+        chat_id = self.chat_for(update_id)
+        user = {"id": chat_id, "is_bot": False, "first_name": f"User {chat_id}"}
+        message = {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+        }
+        # В сценарии voice первое сообщение чата открывает голосовой чат, остальные - голосовые
+        if self.script == "voice" and update_id > self.chats:
+            message["voice"] = {"file_id": "voice", "file_unique_id": "voice", "duration": 2,
+                                "mime_type": "audio/ogg", "file_size": len(STUB_FILE)}
+        else:
+            command = "/voice" if self.script == "voice" else "/start"
+            message["text"] = command
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return {"update_id": update_id, "message": message}
+
+    async def get_updates(self, params: dict) -> list:
+        offset = max(int(params.get("offset", 1)), 1)
+        # offset подтверждает Telegram все обновления до него
+        self.acked = max(self.acked, min(offset - 1, self.updates))
+        limit = int(params.get("limit", 100))
+        last = min(offset + limit, self.updates + 1)
+        if offset >= last:
+            await asyncio.sleep(min(float(params.get("timeout", 0)), STUB_POLL_WAIT))
+            return []
+        if self.first_served is None:
+            self.first_served = time.monotonic()
+        return [self._update(update_id) for update_id in range(offset, last)]
+
+    def _completes(self, update_id: int) -> bool:
+        # Обновления, завершение которых проверяется: голосовые (voice) или /start
+        return self.script == "start" or update_id > self.chats
+
+    def reply(self, method: str, params: dict) -> dict:
+        chat_id = int(params.get("chat_id", 0))
+        # Голосовое сообщение завершено, когда заглушка "Обрабатываю..." заменена ответом
+        if self.script == "start" or method == "editMessageText":
+            self.completed[chat_id] = self.completed.get(chat_id, 0) + 1
+        self.sent += 1
+        self.last_sent = time.monotonic()
+        return {"message_id": self.sent, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": "stub"}
+
+    def stats(self) -> dict:
+        elapsed = (self.last_sent - self.first_served) if self.sent and self.first_served else 0.0
+        # Подтвержденное обновление без завершающего ответа в его чате считается потерянным
+        expected = {}
+        for update_id in range(1, self.acked + 1):
+            if self._completes(update_id):
+                chat_id = self.chat_for(update_id)
+                expected[chat_id] = expected.get(chat_id, 0) + 1
+        lost = sum(max(0, count - self.completed.get(chat_id, 0)) for chat_id, count in expected.items())
+        return {"updates": self.updates, "sent": self.sent, "elapsed": elapsed, "acked": self.acked, "lost": lost}
+
+
+async def _serve_connection(reader, writer, delay: float, stub_updates: _StubUpdates) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            length = 0
+            content_type = ""
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                name = name.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "content-type":
+                    content_type = value.strip()
+            payload = await reader.readexactly(length) if length else b""
+
+            path = request_line.split()[1]
+            method = path.rsplit(b"/", 1)[-1].decode()
+            if path.startswith(b"/file/"):
+                body, body_type = STUB_FILE, b"application/octet-stream"
+            else:
+                if method == "stats":
+                    result = stub_updates.stats()
+                elif method == "getUpdates":
+                    result = await stub_updates.get_updates(_request_params(payload, content_type))
+                else:
+                    await asyncio.sleep(delay)
+                    if method in REPLY_METHODS:
+                        result = stub_updates.reply(method, _request_params(payload, content_type))
+                    else:
+                        result = STUB_RESULTS.get(method, True)
+                body, body_type = json.dumps({"ok": True, "result": result}).encode(), b"application/json"
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: %s\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (body_type, len(body), body)
+            )
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run_stub(delay: float, host: str, ports, updates: int, chats: int, script: str) -> None:
+    stub_updates = _StubUpdates(updates, chats, script)
+    server = await asyncio.start_server(
+        lambda r, w: _serve_connection(r, w, delay, stub_updates), host, 0, backlog=1024
+    )
+    ports.put(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def _stub_process(delay: float, host: str, ports, updates: int, chats: int, script: str) -> None:
+    asyncio.run(_run_stub(delay, host, ports, updates, chats, script))
+
+
+def start_stub(delay: float, host: str = "127.0.0.1", updates: int = 0, chats: int = 1, script: str = "start"):
+    """
+    Запускает заглушку Bot API в отдельном процессе.
+
+    Args:
+        delay (float): Задержка ответа на каждый запрос в секундах (кроме getUpdates)
+        host (str): Адрес прослушивания
+        updates (int): Сколько обновлений отдать через getUpdates
+        chats (int): Между сколькими чатами распределить обновления
+        script (str): Сценарий обновлений из STUB_SCRIPTS
+
+    Returns:
+        tuple: (multiprocessing.Process, base_url для ApplicationBuilder.base_url)
+    """
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_stub_process, args=(delay, host, ports, updates, chats, script), daemon=True
+    )
+    process.start()
+    return process, f"http://{host}:{ports.get(timeout=10)}/bot"
+
+
+def _percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def run_load(base_url: str, pool_size: int, requests: int, concurrency: int) -> dict:
+    """
+    Отправляет requests вызовов sendMessage не более чем по concurrency одновременно.
+
+    Args:
+        base_url (str): Адрес Bot API
+        pool_size (int): Размер пула исходящих соединений
+        requests (int): Число вызовов
+        concurrency (int): Число одновременных вызовов
+
+    Returns:
+        dict: Перцентили задержки (мс), число ошибок и запросов в секунду
+    """
+    settings = {**load_http_settings(), "connection_pool_size": pool_size, "base_url": base_url}
+    bot = apply_http_settings(ApplicationBuilder().token(STUB_TOKEN), settings).build().bot
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(number: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await bot.send_message(chat_id=number, text="load")
+            except TelegramError:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    async with bot:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(number) for number in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "pool": pool_size,
+        "p50": _percentile(latencies, 0.50),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else 0.0,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+def _stub_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(f"{base_url}{STUB_TOKEN}/stats", timeout=5) as response:
+        return json.load(response)["result"]
+
+
+def _bot_env(base_url: str, directory: str, **overrides) -> dict:
+    # Бот на заглушке: без ограничителя Bot API, с базами во временном каталоге
+    return {
+        **os.environ,
+        "TELEGRAM_TOKEN": STUB_TOKEN,
+        "CHATGPT_TOKEN": os.getenv("CHATGPT_TOKEN", "loadtest"),
+        "TG_BASE_URL": base_url,
+        "RATE_LIMITER": "0",
+        "CONTENT_DB_PATH": os.path.join(directory, "content.db"),
+        "QUIZ_STATS_DB_PATH": os.path.join(directory, "quiz_stats.db"),
+        **overrides,
+    }
+
+
+def _start_bot(env: dict, cwd: str = PROJECT_DIR) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_DIR, "bot.py")], cwd=cwd, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def _stop_bot(bot: subprocess.Popen, signal_number: int, timeout: float) -> None:
+    bot.send_signal(signal_number)
+    try:
+        bot.wait(timeout)
+    except subprocess.TimeoutExpired:
+        bot.kill()
+        bot.wait()
+
+
+def run_sharding(workers: int, updates: int, chats: int, delay: float, timeout: float = 300) -> dict:
+    """
+    Запускает бота с BOT_WORKERS = workers на заглушке и ждет ответа на все обновления.
+
+    Args:
+        workers (int): Число воркеров
+        updates (int): Число обновлений /start
+        chats (int): Число разных чатов
+        delay (float): Задержка ответа заглушки в секундах
+        timeout (float): Предельное время прогона в секундах
+
+    Returns:
+        dict: Число воркеров, обработанных обновлений, время и обновлений в секунду
+    """
+    stub, base_url = start_stub(delay, updates=updates, chats=chats)
+    with tempfile.TemporaryDirectory() as directory:
+        bot = _start_bot(_bot_env(base_url, directory, BOT_WORKERS=str(workers)))
+        try:
+            deadline = time.monotonic() + timeout
+            stats = _stub_stats(base_url)
+            while stats["sent"] < updates and bot.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.2)
+                stats = _stub_stats(base_url)
+        finally:
+            _stop_bot(bot, signal.SIGINT, 30)
+            stub.terminate()
+
+    return {
+        "workers": workers,
+        "sent": stats["sent"],
+        "elapsed": stats["elapsed"],
+        "rps": stats["sent"] / stats["elapsed"] if stats["elapsed"] else 0.0,
+    }
+
+
+def run_shutdown(workers: int, updates: int, chats: int, delay: float, after: int,
+                 shutdown_timeout: float = 20, timeout: float = 300) -> dict:
+    """
+    Останавливает бота сигналом SIGTERM под нагрузкой и проверяет, что работа не потеряна.
+
+    Заглушка отдает сценарий voice: /voice и голосовые сообщения, которые
+    бот скачивает во временные файлы. Бот запускается во временном рабочем
+    каталоге; после ответа на after обновлений ему отправляется SIGTERM.
+
+    Args:
+        workers (int): Число воркеров (BOT_WORKERS)
+        updates (int): Число обновлений
+        chats (int): Число разных чатов
+        delay (float): Задержка ответа заглушки в секундах
+        after (int): После скольких ответов отправить SIGTERM
+        shutdown_timeout (float): SHUTDOWN_TIMEOUT бота
+        timeout (float): Предельное время ожидания до сигнала в секундах
+
+    Returns:
+        dict: Подтвержденные Telegram обновления, ответы, потерянные
+            обновления, оставшиеся аудиофайлы, время остановки и код выхода
+    """
+    stub, base_url = start_stub(delay, updates=updates, chats=chats, script="voice")
+    with tempfile.TemporaryDirectory() as directory:
+        audio_dir = os.path.join(directory, "audio")
+        os.makedirs(audio_dir)
+        env = _bot_env(
+            base_url, directory,
+            BOT_WORKERS=str(workers),
+            TG_BASE_FILE_URL=base_url.replace("/bot", "/file/bot"),
+            AUDIO_TMP_DIR=audio_dir,
+            SHUTDOWN_TIMEOUT=str(shutdown_timeout),
+            # Каждое голосовое сообщение ставится в очередь, а не отклоняется лимитом пользователя
+            VOICE_MAX_JOBS_PER_USER=str(updates),
+        )
+        bot = _start_bot(env, cwd=directory)
+        try:
+            deadline = time.monotonic() + timeout
+            stats = _stub_stats(base_url)
+            while stats["sent"] < after and bot.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+                stats = _stub_stats(base_url)
+            stopping = time.monotonic()
+            _stop_bot(bot, signal.SIGTERM, shutdown_timeout + 30)
+            stop_seconds = time.monotonic() - stopping
+            stats = _stub_stats(base_url)
+        finally:
+            if bot.poll() is None:
+                _stop_bot(bot, signal.SIGKILL, 5)
+            stub.terminate()
+        files_left = sum(len(files) for _, _, files in os.walk(audio_dir))
+        files_left += sum(1 for name in os.listdir(directory) if name.endswith(".ogg"))
+
+    return {
+        "workers": workers,
+        "acked": stats["acked"],
+        "sent": stats["sent"],
+        "lost": stats["lost"],
+        "files_left": files_left,
+        "stop_seconds": stop_seconds,
+        "exit_code": bot.returncode,
+    }
+
+
+def _main_shutdown(args) -> bool:
+    ok = True
+    print(f"{'воркеров':>8} {'принято':>8} {'ответов':>8} {'потеряно':>9} {'файлов':>7} {'остановка с':>12} {'код':>4}")
+    for workers in args.workers:
+        result = run_shutdown(workers, args.updates, args.chats, args.delay, args.after, args.shutdown_timeout)
+        print(
+            f"{result['workers']:>8} {result['acked']:>8} {result['sent']:>8} {result['lost']:>9} "
+            f"{result['files_left']:>7} {result['stop_seconds']:>12.1f} {result['exit_code']:>4}"
+        )
+        ok = ok and result["lost"] == 0 and result["files_left"] == 0 and result["exit_code"] == 0
+    return ok
+
+
+def _main_sharding(args) -> None:
+    logger.info(f"Заглушка Bot API: задержка ответа {args.delay * 1000:.0f} мс, обновлений {args.updates}")
+    print(f"{'воркеров':>8} {'обработано':>10} {'время с':>8} {'обн/с':>8}")
+    for workers in args.workers:
+        result = run_sharding(workers, args.updates, args.chats, args.delay)
+        print(f"{result['workers']:>8} {result['sent']:>10} {result['elapsed']:>8.1f} {result['rps']:>8.0f}")
+
+
+async def _main(args) -> None:
+    stub = None
+    base_url = args.base_url
+    if not base_url:
+        stub, base_url = start_stub(args.delay)
+        logger.info(f"Заглушка Bot API: {base_url}, задержка ответа {args.delay * 1000:.0f} мс")
+
+    print(f"{'пул':>5} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} {'max мс':>8} {'ошибок':>7} {'запр/с':>8}")
+    try:
+        for pool_size in args.pool_sizes:
+            result = await run_load(base_url, pool_size, args.requests, args.concurrency)
+            print(
+                f"{result['pool']:>5} {result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f} "
+                f"{result['max']:>8.1f} {result['errors']:>7} {result['rps']:>8.0f}"
+            )
+    finally:
+        if stub is not None:
+            stub.terminate()
+
+
+def _int_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main(argv=None) -> int:
+    """
+    Точка входа командной строки.
+
+    Args:
+        argv (list, optional): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(prog="python -m services.bot_api_loadtest", description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pool = commands.add_parser("pool", help="Задержки и пропускная способность по размеру пула соединений")
+    pool.add_argument("--pool-sizes", default="1,8,32,64,256", type=_int_list, help="Размеры пула через запятую")
+    pool.add_argument("--requests", type=int, default=2000, help="Число вызовов sendMessage на каждый размер")
+    pool.add_argument("--concurrency", type=int, default=200, help="Число одновременных вызовов")
+    pool.add_argument("--delay", type=float, default=0.05, help="Задержка ответа заглушки в секундах")
+    pool.add_argument("--base-url", help="Внешний Bot API вместо встроенной заглушки (вида http://host:port/bot)")
+
+    sharding = commands.add_parser("sharding", help="Пропускная способность бота по числу воркеров (BOT_WORKERS)")
+    sharding.add_argument("--workers", default="1,2,4", type=_int_list, help="Числа воркеров через запятую")
+    sharding.add_argument("--updates", type=int, default=2000, help="Число обновлений /start на каждый прогон")
+    sharding.add_argument("--chats", type=int, default=500, help="Число разных чатов")
+    sharding.add_argument("--delay", type=float, default=0.05, help="Задержка ответа заглушки в секундах")
+
+    shutdown = commands.add_parser("shutdown", help="Остановка SIGTERM под нагрузкой: потерянные обновления и файлы")
+    shutdown.add_argument("--workers", default="1,2", type=_int_list, help="Числа воркеров через запятую")
+    shutdown.add_argument("--updates", type=int, default=300, help="Число обновлений")
+    shutdown.add_argument("--chats", type=int, default=100, help="Число разных чатов")
+    shutdown.add_argument("--delay", type=float, default=0.1, help="Задержка ответа заглушки в секундах")
+    shutdown.add_argument("--after", type=int, default=100, help="Число ответов до отправки SIGTERM")
+    shutdown.add_argument("--shutdown-timeout", type=float, default=20, help="SHUTDOWN_TIMEOUT бота в секундах")
+
+    args = parser.parse_args(argv)
+    if args.command == "pool":
+        asyncio.run(_main(args))
+    elif args.command == "sharding":
+        _main_sharding(args)
+    elif not _main_shutdown(args):
+        # Потерянная работа, оставшиеся файлы или ошибка бота при остановке
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Пакетная генерация фактов и вопросов квиза через OpenAI Batch API.
+
+Контент, которому не нужна интерактивность, генерируется заранее и дешевле
+(Batch API), а бот выдает его из локального хранилища services.content_store.
+
+Команды:
+    python -m services.content_batch build --facts 200 --questions 100 -o batch.jsonl
+    python -m services.content_batch submit --facts 200 --questions 100
+    python -m services.content_batch status <batch_id>
+    python -m services.content_batch ingest <batch_id>
+    python -m services.content_batch ingest --file output.jsonl
+
+Запросы используют профили генерации fact и quiz из services.openai_client.
+Параметр --base-url (или OPENAI_BASE_URL) направляет вызовы на локальный
+сервер-заглушку с тем же API, например для проверки без реального аккаунта.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from data.quiz_topics import QUIZ_TOPICS
+from services.content_store import KIND_FACT, KIND_QUIZ, get_content_store
+from services.openai_client import FACT_SYSTEM_PROMPT, FACT_USER_PROMPT, build_messages, get_profile
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+QUIZ_USER_PROMPT = "Создай новый вопрос"
+
+
+def _request(custom_id: str, feature: str, system_prompt: str, user_prompt: str) -> dict:
+    profile = get_profile(feature)
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": profile["model"],
+            "messages": build_messages(system_prompt, [{"role": "user", "content": user_prompt}]),
+            "max_tokens": profile["max_tokens"],
+            "temperature": profile["temperature"],
+        },
+    }
+
+
+def build_requests(facts: int, questions: int) -> list:
+    """
+    Собирает запросы пакета для фактов и для каждой темы квиза.
+
+    custom_id имеет вид "<kind>:<topic>:<номер>" и используется при загрузке
+    результатов, чтобы разложить ответы по типам и темам.
+
+    Args:
+        facts (int): Число фактов
+        questions (int): Число вопросов на каждую тему QUIZ_TOPICS
+
+    Returns:
+        list: Строки пакета в формате Batch API
+    """
+    requests = [
+        _request(f"{KIND_FACT}::{number}", "fact", FACT_SYSTEM_PROMPT, FACT_USER_PROMPT)
+        for number in range(facts)
+    ]
+    for topic, topic_data in QUIZ_TOPICS.items():
+        requests += [
+            _request(f"{KIND_QUIZ}:{topic}:{number}", "quiz", topic_data["prompt"], QUIZ_USER_PROMPT)
+            for number in range(questions)
+        ]
+    return requests
+
+
+def parse_results(lines) -> dict:
+    """
+    Разбирает файл результатов пакета.
+
+    Вопросы квиза, которые не удалось разобрать, отбрасываются.
+
+    Args:
+        lines (iterable): Строки JSONL файла результатов
+
+    Returns:
+        dict: {kind: [(topic, body), ...]}
+    """
+    from handlers.quiz import parse_question_response
+
+    results = {KIND_FACT: [], KIND_QUIZ: []}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            logger.warning(f"Запрос {record.get('custom_id')} завершился ошибкой: {record.get('error')}")
+            continue
+        kind, topic, _ = record["custom_id"].split(":", 2)
+        body = response["body"]["choices"][0]["message"]["content"].strip()
+        if kind == KIND_QUIZ and not parse_question_response(body):
+            continue
+        results.setdefault(kind, []).append((topic, body))
+    return results
+
+
+def ingest(lines) -> dict:
+    """
+    Загружает результаты пакета в хранилище контента.
+
+    Args:
+        lines (iterable): Строки JSONL файла результатов
+
+    Returns:
+        dict: Число добавленных элементов по типам (дубликаты не считаются)
+    """
+    store = get_content_store()
+    return {kind: store.add_many(kind, items) for kind, items in parse_results(lines).items()}
+
+
+def _client(base_url: str = None):
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.getenv("CHATGPT_TOKEN"),
+        base_url=base_url or os.getenv("OPENAI_BASE_URL") or None
+    )
+
+
+def main(argv=None) -> int:
+    """
+    Точка входа командной строки.
+
+    Args:
+        argv (list, optional): Аргументы командной строки
+
+    Returns:
+        int: Код завершения
+    """
+    load_dotenv()
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    parser = argparse.ArgumentParser(prog="python -m services.content_batch", description=__doc__.split("\n")[1])
+    parser.add_argument("--base-url", help="Адрес OpenAI-совместимого API (например, локальной заглушки)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("build", "submit"):
+        command = commands.add_parser(name)
+        command.add_argument("--facts", type=int, default=100, help="Число фактов")
+        command.add_argument("--questions", type=int, default=50, help="Число вопросов на тему квиза")
+        if name == "build":
+            command.add_argument("-o", "--output", default="-", help="Файл пакета JSONL ('-' - stdout)")
+
+    commands.add_parser("status").add_argument("batch_id")
+
+    ingest_command = commands.add_parser("ingest")
+    ingest_command.add_argument("batch_id", nargs="?")
+    ingest_command.add_argument("--file", help="Локальный файл результатов JSONL вместо batch_id")
+
+    args = parser.parse_args(argv)
+
+    if args.command in ("build", "submit"):
+        payload = "".join(
+            json.dumps(request, ensure_ascii=False) + "\n"
+            for request in build_requests(args.facts, args.questions)
+        )
+        if args.command == "build":
+            if args.output == "-":
+                sys.stdout.write(payload)
+            else:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(payload)
+            return 0
+
+        client = _client(args.base_url)
+        batch_file = client.files.create(file=("content_batch.jsonl", io.BytesIO(payload.encode("utf-8"))), purpose="batch")
+        batch = client.batches.create(input_file_id=batch_file.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+        print(batch.id)
+        logger.info(f"Пакет {batch.id} отправлен: {payload.count(chr(10))} запросов")
+        return 0
+
+    if args.command == "status":
+        batch = _client(args.base_url).batches.retrieve(args.batch_id)
+        print(f"{batch.id}: {batch.status} {batch.request_counts}")
+        return 0
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            added = ingest(f)
+    else:
+        if not args.batch_id:
+            parser.error("укажите batch_id или --file")
+        client = _client(args.base_url)
+        batch = client.batches.retrieve(args.batch_id)
+        if batch.status != "completed" or not batch.output_file_id:
+            logger.error(f"Пакет {batch.id} еще не готов: {batch.status}")
+            return 1
+        added = ingest(client.files.content(batch.output_file_id).text.splitlines())
+    logger.info(f"Загружено в хранилище: {added}, всего {get_content_store().counts()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Локальное хранилище заранее сгенерированного контента.
+
+Факты и вопросы квиза генерируются пакетно (services.content_batch) или
+живым запросом к ChatGPT и сохраняются в SQLite. Обработчики выдают
+пользователю элементы, которые он еще не видел, и обращаются к ChatGPT
+только когда непросмотренные элементы темы закончились.
+
+Схема:
+- items: kind (fact | quiz), topic (ключ темы квиза или ""), seq (плотный
+  номер элемента внутри темы), body (текст ответа модели), hash (SHA-256
+  нормализованного текста, уникален - дубликаты не сохраняются)
+- seen: множество просмотренных номеров seq (services.seen_set.SeenSet) и
+  курсор для каждой пары (пользователь, тема)
+
+Номер seq выделяется внутри транзакции записи (BEGIN IMMEDIATE) как
+MAX(seq) + 1 темы, поэтому с одной базой могут работать несколько
+процессов: запись, совпавшая по hash, пропускается как дубликат, а
+совпадение по первичному ключу приводит к ошибке, а не к потере элемента.
+
+Выдача непросмотренного элемента выполняется за амортизированное O(1):
+курсор пользователя обходит номера темы по кругу, начиная со случайного
+смещения, и пропускает только элементы, отмеченные в битовом множестве.
+Элемент по (kind, topic, seq) читается по первичному ключу.
+
+Состояния активных пользователей держатся в памяти, не больше
+SEEN_CACHE_SIZE пар (пользователь, тема); давно не использованные
+вытесняются и при следующем обращении читаются из базы.
+
+Путь к базе задается переменной окружения CONTENT_DB_PATH.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from services.seen_set import SeenSet
+
+logger = logging.getLogger(__name__)
+
+KIND_FACT = "fact"
+KIND_QUIZ = "quiz"
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    kind TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    seq INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    hash TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    PRIMARY KEY (kind, topic, seq)
+);
+CREATE TABLE IF NOT EXISTS seen (
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    bits BLOB NOT NULL,
+    cursor INTEGER NOT NULL,
+    PRIMARY KEY (user_id, kind, topic)
+);
+"""
+
+
+def content_hash(body: str) -> str:
+    """
+    Возвращает хэш текста для поиска дубликатов.
+
+    Регистр и пробельные символы не влияют на хэш.
+
+    Args:
+        body (str): Текст элемента
+
+    Returns:
+        str: SHA-256 в hex
+    """
+    normalized = " ".join(body.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class _SeenState:
+    # Просмотренные номера темы одного пользователя и курсор обхода
+    __slots__ = ("seen", "cursor")
+
+    def __init__(self, seen: SeenSet = None, cursor: int = 0):
+        self.seen = seen if seen is not None else SeenSet()
+        self.cursor = cursor
+
+
+class ContentStore:
+    """Хранилище фактов и вопросов квиза в SQLite с учетом просмотренного."""
+
+    def __init__(self, path: str, seen_cache_size: int = 10000):
+        self.path = path
+        self.seen_cache_size = seen_cache_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._seen = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.draw_seconds = 0.0
+
+    @contextmanager
+    def _write(self):
+        # Блокировка записи берется до чтения MAX(seq), чтобы другой процесс не выдал тот же номер
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            yield
+
+    def _size(self, kind: str, topic: str) -> int:
+        # Номер следующего элемента темы: MAX по первичному ключу, без сканирования таблицы
+        return self._db.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM items WHERE kind = ? AND topic = ?", (kind, topic)
+        ).fetchone()[0]
+
+    def add(self, kind: str, topic: str, body: str, seen_by: int = None):
+        """
+        Добавляет элемент, если такого текста еще нет.
+
+        Args:
+            kind (str): Тип контента (KIND_FACT, KIND_QUIZ)
+            topic (str): Ключ темы ("" для фактов)
+            body (str): Текст элемента
+            seen_by (int, optional): ID пользователя, которому элемент уже показан
+
+        Returns:
+            int: Номер seq элемента или None, если это дубликат
+
+        Raises:
+            sqlite3.IntegrityError: Если номер seq уже занят
+        """
+        with self._write():
+            seq = self._insert(kind, topic, body, time.time())
+        if seq is not None and seen_by is not None:
+            state = self._state(seen_by, kind, topic)
+            state.seen.add(seq)
+            self._save_state(seen_by, kind, topic, state)
+        return seq
+
+    def add_many(self, kind: str, items) -> int:
+        """
+        Добавляет элементы, пропуская дубликаты.
+
+        Args:
+            kind (str): Тип контента (KIND_FACT, KIND_QUIZ)
+            items (iterable): Пары (topic, body)
+
+        Returns:
+            int: Число добавленных элементов
+
+        Raises:
+            sqlite3.IntegrityError: Если номер seq уже занят
+        """
+        now = time.time()
+        with self._write():
+            return sum(self._insert(kind, topic, body, now) is not None for topic, body in items)
+
+    def _insert(self, kind: str, topic: str, body: str, now: float):
+        # Вызывается внутри _write: дубликат по hash пропускается, конфликт по seq - ошибка
+        seq = self._size(kind, topic)
+        cursor = self._db.execute(
+            "INSERT INTO items (kind, topic, seq, body, hash, created) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (hash) DO NOTHING",
+            (kind, topic, seq, body, content_hash(body), now)
+        )
+        return seq if cursor.rowcount else None
+
+    def _state(self, user_id: int, kind: str, topic: str) -> _SeenState:
+        key = (user_id, kind, topic)
+        state = self._seen.get(key)
+        if state is not None:
+            self._seen.move_to_end(key)
+        else:
+            row = self._db.execute(
+                "SELECT bits, cursor FROM seen WHERE user_id = ? AND kind = ? AND topic = ?", key
+            ).fetchone()
+            if row:
+                state = _SeenState(SeenSet.from_bytes(row[0]), row[1])
+            else:
+                # Случайное начальное смещение: пользователи проходят тему в разном порядке
+                state = _SeenState(cursor=random.randrange(max(1, self._size(kind, topic))))
+            self._seen[key] = state
+            # Вытесненные состояния уже сохранены в базе
+            while len(self._seen) > self.seen_cache_size:
+                self._seen.popitem(last=False)
+        return state
+
+    def _save_state(self, user_id: int, kind: str, topic: str, state: _SeenState) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO seen (user_id, kind, topic, bits, cursor) VALUES (?, ?, ?, ?, ?)",
+                (user_id, kind, topic, state.seen.to_bytes(), state.cursor)
+            )
+
+    def draw_unseen(self, user_id: int, kind: str, topic: str = ""):
+        """
+        Выдает пользователю элемент темы, который он еще не видел.
+
+        Args:
+            user_id (int): ID пользователя
+            kind (str): Тип контента
+            topic (str): Ключ темы ("" для фактов)
+
+        Returns:
+            str: Текст элемента или None, если непросмотренных элементов нет
+        """
+        started = time.perf_counter()
+        size = self._size(kind, topic)
+        state = self._state(user_id, kind, topic)
+        if len(state.seen) >= size:
+            self.misses += 1
+            self.draw_seconds += time.perf_counter() - started
+            return None
+
+        # Курсор пропускает только элементы, показанные вне обхода (например, живые)
+        seq = state.cursor % size
+        while seq in state.seen:
+            seq = (seq + 1) % size
+        state.seen.add(seq)
+        state.cursor = seq + 1
+        self._save_state(user_id, kind, topic, state)
+
+        body = self._db.execute(
+            "SELECT body FROM items WHERE kind = ? AND topic = ? AND seq = ?", (kind, topic, seq)
+        ).fetchone()[0]
+        self.hits += 1
+        self.draw_seconds += time.perf_counter() - started
+        return body
+
+    def counts(self) -> dict:
+        """
+        Возвращает число элементов по типам и темам.
+
+        Returns:
+            dict: {(kind, topic): count}
+        """
+        return {
+            (kind, topic): size
+            for kind, topic, size in self._db.execute("SELECT kind, topic, MAX(seq) + 1 FROM items GROUP BY kind, topic")
+        }
+
+    def seen_memory(self) -> tuple:
+        """
+        Оценивает память, занятую состояниями просмотренного в кэше.
+
+        Returns:
+            tuple: (число пользователей, число состояний, байт данных SeenSet)
+        """
+        users = {user_id for user_id, _, _ in self._seen}
+        return len(users), len(self._seen), sum(state.seen.nbytes for state in self._seen.values())
+
+    def log_report(self) -> None:
+        """Пишет в лог долю выдачи из хранилища, среднее время выдачи и память просмотренного."""
+        draws = self.hits + self.misses
+        hit_ratio = self.hits / draws if draws else 0.0
+        average = self.draw_seconds / draws * 1000 if draws else 0.0
+        users, states, nbytes = self.seen_memory()
+        per_user = nbytes / users if users else 0
+        logger.info(
+            f"📊 Хранилище контента: выдач {draws}, из хранилища {self.hits} ({hit_ratio:.0%}), "
+            f"живая генерация {self.misses}, среднее время выдачи {average:.3f} мс, "
+            f"просмотренное в памяти: пользователей {users}, состояний {states}, "
+            f"{nbytes / 1024:.1f} КБ ({per_user:.0f} Б на пользователя)"
+        )
+
+
+_store = None
+
+
+def get_content_store() -> ContentStore:
+    """
+    Возвращает общее для процесса хранилище контента.
+
+    Returns:
+        ContentStore: Хранилище по пути CONTENT_DB_PATH (по умолчанию data/content.db),
+            в памяти не больше SEEN_CACHE_SIZE состояний просмотренного
+    """
+    global _store
+    if _store is None:
+        _store = ContentStore(
+            os.getenv("CONTENT_DB_PATH", "data/content.db"),
+            seen_cache_size=int(os.getenv("SEEN_CACHE_SIZE", "10000"))
+        )
+        logger.info(f"Хранилище контента: {_store.path}, элементов {sum(_store.counts().values())}")
+    return _store
@@ -0,0 +1,196 @@
+"""
+Микробенчмарк выбора обработчика для callback query.
+
+Сравнивает стоимость поиска обработчика на одно обновление:
+- regex - цепочка CallbackQueryHandler с регулярными выражениями и
+  строковым callback_data, как bot.main собирал их до handlers.routing
+- routing - handler-ы из handlers.routing.build_handlers (CallbackRouter:
+  разбор data.callbacks и поиск в словаре)
+
+Поиск повторяет цикл Application.process_update: handler-ы группы
+проверяются по порядку до первого check_update, вернувшего результат.
+Обработчики не вызываются. Наборы обновлений:
+- menu - кнопки главного меню от пользователя вне диалогов (все handler-ы)
+- state - кнопки квиза в состоянии ANSWERING_QUESTION (handler-ы состояния
+  и fallbacks диалога, как их проверяет ConversationHandler)
+
+    python -m services.dispatch_bench --updates 200000
+"""
+
+import argparse
+import time
+
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, CommandHandler, ConversationHandler, MessageHandler, filters
+
+from data.callbacks import (
+    NS_MENU, MENU_COMING_SOON, NS_RANDOM, RANDOM_OPEN, NS_GPT, GPT_OPEN, NS_TALK, TALK_OPEN,
+    NS_QUIZ, QUIZ_OPEN, QUIZ_CONTINUE, QUIZ_CHANGE_TOPIC, QUIZ_FINISH,
+    NS_TRANSLATE, TRANSLATE_OPEN, NS_VOICE, VOICE_OPEN, encode_callback,
+)
+
+# Кнопки главного меню: (callback_data до handlers.routing, callback_data сейчас)
+MENU_BUTTONS = [
+    ("random_fact", encode_callback(NS_RANDOM, RANDOM_OPEN)),
+    ("gpt_interface", encode_callback(NS_GPT, GPT_OPEN)),
+    ("talk_interface", encode_callback(NS_TALK, TALK_OPEN)),
+    ("quiz_interface", encode_callback(NS_QUIZ, QUIZ_OPEN)),
+    ("translate_interface", encode_callback(NS_TRANSLATE, TRANSLATE_OPEN)),
+    ("start_voice_dialog", encode_callback(NS_VOICE, VOICE_OPEN)),
+    ("coming_soon", encode_callback(NS_MENU, MENU_COMING_SOON)),
+]
+
+# Кнопки квиза в состоянии ответа на вопрос
+QUIZ_BUTTONS = [
+    ("quiz_continue_programming", encode_callback(NS_QUIZ, QUIZ_CONTINUE, 0)),
+    ("quiz_change_topic", encode_callback(NS_QUIZ, QUIZ_CHANGE_TOPIC)),
+    ("quiz_finish", encode_callback(NS_QUIZ, QUIZ_FINISH)),
+]
+
+
+async def _noop(update, context):
+    return None
+
+
+def _regex_conversation(entry: str, states: dict, fallbacks: list) -> ConversationHandler:
+    return ConversationHandler(
+        entry_points=[CommandHandler(entry, _noop), CallbackQueryHandler(_noop, pattern=f"^{entry}_interface$")],
+        states={state: [MessageHandler(filters.TEXT & ~filters.COMMAND, _noop)] + [
+            CallbackQueryHandler(_noop, pattern=pattern) for pattern in patterns
+        ] for state, patterns in states.items()},
+        fallbacks=[CommandHandler("start", _noop)] + [CallbackQueryHandler(_noop, pattern=p) for p in fallbacks],
+    )
+
+
+def regex_handlers() -> tuple:
+    """
+    Собирает цепочку handler-ов с регулярными выражениями прежнего bot.main.
+
+    Returns:
+        tuple: (все handler-ы группы, handler-ы состояния ответа квиза с fallbacks)
+    """
+    commands = ("start", "random", "gpt", "personality", "quiz", "translate", "voice")
+    quiz_states = {1: ["^quiz_continue_", "^quiz_change_topic$", "^quiz_finish$"]}
+    conversations = [
+        _regex_conversation("gpt", {0: ["^(gpt_finish$|main_menu$)", "^gpt_continue"]}, ["^(gpt_finish$|main_menu$)"]),
+        _regex_conversation("talk", {0: ["^(continue_chat|finish_talk|change_personality)$", "^personality_.*"],
+                                     1: ["^(continue_chat|finish_talk|change_personality)$"]},
+                            ["^(gpt_finish$|main_menu$)"]),
+        _regex_conversation("quiz", {0: ["^quiz_topic_"], **quiz_states}, ["^quiz_finish$"]),
+        _regex_conversation("translate", {0: ["^(continue_translate|finish_translate|change_languages)$",
+                                              "^languages_.*"],
+                                          1: ["^(continue_translate|finish_translate|change_languages)$"]},
+                            ["^(finish_translate|main_menu$)"]),
+        ConversationHandler(
+            entry_points=[CommandHandler("voice", _noop), CallbackQueryHandler(_noop, pattern="^start_voice_dialog$")],
+            states={1: [MessageHandler(filters.VOICE, _noop)]},
+            fallbacks=[CommandHandler("start", _noop), CallbackQueryHandler(_noop, pattern="^(main_menu|voice_stop)$")],
+        ),
+    ]
+    handlers = (
+        [CommandHandler(command, _noop) for command in commands]
+        + [CallbackQueryHandler(_noop, pattern="^random_")]
+        + conversations
+        + [CallbackQueryHandler(_noop, pattern="^coming_soon$")]
+    )
+    quiz = conversations[2]
+    return handlers, quiz.states[1] + quiz.fallbacks
+
+
+def routing_handlers() -> tuple:
+    """
+    Собирает handler-ы бота через handlers.routing.
+
+    Returns:
+        tuple: (все handler-ы группы, handler-ы состояния ответа квиза с fallbacks)
+    """
+    import bot
+    from handlers import quiz, routing
+
+    handlers = routing.build_handlers(bot.ROUTED_MODULES)
+    conversation = next(h for h in handlers if isinstance(h, ConversationHandler) and h.name == quiz.CONVERSATION["name"])
+    return handlers, conversation.states[quiz.ANSWERING_QUESTION] + conversation.fallbacks
+
+
+def _callback_update(update_id: int, data: str) -> Update:
+    user = {"id": 1000, "is_bot": False, "first_name": "Bench"}
+    return Update.de_json({"update_id": update_id, "callback_query": {
+        "id": str(update_id), "from": user, "chat_instance": "bench", "data": data,
+        "message": {"message_id": 1, "date": 0, "chat": {"id": 1000, "type": "private"}, "text": "menu"},
+    }}, None)
+
+
+def _find_handler(handlers: list, update: Update):
+    # Как Application.process_update: первый handler группы с результатом check_update
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def measure(handlers: list, updates: list, count: int) -> float:
+    """
+    Измеряет среднее время поиска обработчика.
+
+    Args:
+        handlers (list): Handler-ы в порядке проверки
+        updates (list): Обновления, перебираемые по кругу
+        count (int): Число поисков
+
+    Returns:
+        float: Микросекунды на одно обновление
+
+    Raises:
+        RuntimeError: Если для какого-то обновления обработчик не найден
+    """
+    for update in updates:
+        if _find_handler(handlers, update) is None:
+            raise RuntimeError(f"Нет обработчика для {update.callback_query.data}")
+    started = time.perf_counter()
+    for index in range(count):
+        _find_handler(handlers, updates[index % len(updates)])
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def run(count: int) -> dict:
+    """
+    Сравнивает поиск обработчика для обоих наборов обновлений.
+
+    Args:
+        count (int): Число поисков на каждый замер
+
+    Returns:
+        dict: {(набор, схема): микросекунды на обновление}
+    """
+    # bot.py импортируется первым: он отключает предупреждения PTB о per_message
+    routing_all, routing_state = routing_handlers()
+    regex_all, regex_state = regex_handlers()
+    results = {}
+    for mix, buttons, (old_handlers, new_handlers) in (
+        ("menu", MENU_BUTTONS, (regex_all, routing_all)),
+        ("state", QUIZ_BUTTONS, (regex_state, routing_state)),
+    ):
+        old_updates = [_callback_update(index, old) for index, (old, _) in enumerate(buttons)]
+        new_updates = [_callback_update(index, new) for index, (_, new) in enumerate(buttons)]
+        results[(mix, "regex")] = measure(old_handlers, old_updates, count)
+        results[(mix, "routing")] = measure(new_handlers, new_updates, count)
+    return results
+
+
+def main(argv=None) -> int:
+    """Точка входа CLI: печатает время поиска обработчика на обновление."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=200000, help="поисков на каждый замер")
+    args = parser.parse_args(argv)
+
+    results = run(args.updates)
+    print(f"{'набор':<8}{'regex, мкс':>14}{'routing, мкс':>16}{'ускорение':>12}")
+    for mix in ("menu", "state"):
+        old, new = results[(mix, "regex")], results[(mix, "routing")]
+        print(f"{mix:<8}{old:>14.2f}{new:>16.2f}{old / new:>11.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,364 @@
+"""
+HTTP-проверки живости и готовности бота для оркестратора (Docker, Kubernetes).
+
+Небольшой HTTP-сервер на asyncio работает в event loop бота и включается
+переменной окружения HEALTH_PORT:
+- GET /healthz - живость: задержка event loop и очередь работы (обновления
+  в очереди, обработчики и фоновые задачи в работе, голосовые задачи,
+  очередь исходящих запросов Bot API). 503, если задержка больше
+  HEALTH_MAX_LAG секунд или в очереди больше HEALTH_MAX_BACKLOG обновлений
+- GET /readyz - готовность: бот запущен и не останавливается, предохранитель
+  OpenAI не разомкнут, бэкенды распознавания и синтеза речи доступны,
+  хранилище состояния отвечает на чтение. 503, если хотя бы одна проверка
+  не прошла
+
+Задержка event loop измеряется непрерывно: фоновая задача засыпает на
+HEALTH_LAG_INTERVAL секунд и записывает, насколько позже она проснулась.
+Средняя и максимальная задержка пишутся в лог при остановке. Результат
+каждой проверки готовности кэшируется на HEALTH_CACHE_TTL секунд, а
+одновременные запросы /readyz ждут одну и ту же проверку, поэтому частые
+пробы не нагружают Redis и импорты бэкендов.
+
+В многопроцессном режиме (BOT_WORKERS > 1) фронт отвечает на HEALTH_PORT
+(готов, если живы все воркеры), а воркер N - на HEALTH_PORT + 1 + N.
+
+Сервер слушает HEALTH_HOST, по умолчанию 127.0.0.1: проверки без
+аутентификации и показывают внутреннее состояние, поэтому наружу они не
+открываются. Пробам из другого сетевого пространства (kubelet, healthcheck
+соседнего контейнера, проброс порта Docker) нужен HEALTH_HOST=0.0.0.0.
+Соединение, не приславшее строку запроса и заголовки за
+HEALTH_READ_TIMEOUT секунд, закрывается.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Ключ хранилища состояния, чтение которого проверяет его доступность
+PERSISTENCE_PROBE_KEY = "health"
+
+# Ограничение на размер строки запроса и заголовков
+MAX_REQUEST_LINE = 8192
+
+HTTP_STATUSES = {200: b"OK", 404: b"Not Found", 405: b"Method Not Allowed", 503: b"Service Unavailable"}
+
+
+class HealthMonitor:
+    """
+    Сервер /healthz и /readyz с непрерывным замером задержки event loop.
+
+    Источники данных передаются функциями, поэтому один и тот же монитор
+    обслуживает и процесс бота, и фронт многопроцессного режима.
+    """
+
+    def __init__(self, host: str, port: int, backlog=None, checks: dict = None, state=None,
+                 cache_ttl: float = 5.0, lag_interval: float = 0.5, max_lag: float = 5.0, max_backlog: int = 1000,
+                 check_timeout: float = 2.0, read_timeout: float = 5.0):
+        """
+        Args:
+            host (str): Адрес для прослушивания
+            port (int): Порт
+            backlog (callable): Функция без аргументов, возвращающая словарь
+                очередей работы; ключ "queued" сравнивается с max_backlog
+            checks (dict): Проверки готовности: имя -> async функция без
+                аргументов, возвращающая (ok, описание)
+            state (callable): Состояние процесса без кэширования: функция без
+                аргументов, возвращающая (ok, описание), например "остановка"
+            cache_ttl (float): Время жизни результата проверки в секундах
+            lag_interval (float): Период замера задержки event loop в секундах
+            max_lag (float): Задержка event loop, после которой /healthz отвечает 503
+            max_backlog (int): Обновлений в очереди, после которых /healthz отвечает 503
+            check_timeout (float): Таймаут одной проверки готовности в секундах
+            read_timeout (float): Время на получение запроса от клиента в секундах
+        """
+        self.host = host
+        self.port = port
+        self.backlog = backlog or dict
+        self.checks = checks or {}
+        self.state = state
+        self.cache_ttl = cache_ttl
+        self.lag_interval = lag_interval
+        self.max_lag = max_lag
+        self.max_backlog = max_backlog
+        self.check_timeout = check_timeout
+        self.read_timeout = read_timeout
+        self.stats = {
+            "samples": 0, "lag_total": 0.0, "lag_max": 0.0, "probes": 0, "checks": 0, "cached": 0, "timeouts": 0,
+        }
+        self._lag = 0.0
+        self._last_tick = None
+        self._results = {}
+        self._running = {}
+        self._server = None
+        self._sampler = None
+
+    async def start(self) -> None:
+        """Запускает замер задержки event loop и HTTP-сервер."""
+        self._last_tick = time.monotonic()
+        self._sampler = asyncio.create_task(self._sample_lag())
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        logger.info(f"Проверки состояния: http://{self.host}:{self.port}/healthz, /readyz")
+
+    async def stop(self) -> None:
+        """Останавливает HTTP-сервер и замер задержки, пишет отчет в лог."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in (self._sampler, *self._running.values()):
+            if task is not None:
+                task.cancel()
+        self._sampler = None
+        self.log_report()
+
+    async def _sample_lag(self) -> None:
+        while True:
+            await asyncio.sleep(self.lag_interval)
+            now = time.monotonic()
+            self._lag = max(0.0, now - self._last_tick - self.lag_interval)
+            self._last_tick = now
+            self.stats["samples"] += 1
+            self.stats["lag_total"] += self._lag
+            self.stats["lag_max"] = max(self.stats["lag_max"], self._lag)
+
+    def loop_lag(self) -> float:
+        """
+        Возвращает текущую задержку event loop.
+
+        Если замер давно не выполнялся, задержка оценивается по времени с
+        последнего срабатывания, чтобы зависший loop не выглядел здоровым.
+
+        Returns:
+            float: Задержка в секундах
+        """
+        if self._last_tick is None:
+            return 0.0
+        overdue = time.monotonic() - self._last_tick - self.lag_interval
+        return max(self._lag, overdue, 0.0)
+
+    def liveness(self) -> tuple:
+        """
+        Собирает ответ /healthz.
+
+        Returns:
+            tuple: (ok, тело ответа)
+        """
+        lag = self.loop_lag()
+        backlog = self.backlog()
+        samples = self.stats["samples"]
+        ok = lag <= self.max_lag and backlog.get("queued", 0) <= self.max_backlog
+        return ok, {
+            "status": "ok" if ok else "fail",
+            "loop_lag_ms": round(lag * 1000, 1),
+            "loop_lag_avg_ms": round(self.stats["lag_total"] / samples * 1000, 1) if samples else 0.0,
+            "loop_lag_max_ms": round(self.stats["lag_max"] * 1000, 1),
+            "backlog": backlog,
+        }
+
+    async def readiness(self) -> tuple:
+        """
+        Собирает ответ /readyz из кэшированных результатов проверок.
+
+        Returns:
+            tuple: (ok, тело ответа)
+        """
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._check(name) for name in names))
+        checks = {name: {"ok": ok, "detail": detail} for name, (ok, detail) in zip(names, results)}
+        if self.state is not None:
+            ok, detail = self.state()
+            checks["running"] = {"ok": ok, "detail": detail}
+        ok = all(result["ok"] for result in checks.values())
+        return ok, {"status": "ok" if ok else "fail", "checks": checks}
+
+    async def _check(self, name: str) -> tuple:
+        cached = self._results.get(name)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            self.stats["cached"] += 1
+            return cached[1]
+        task = self._running.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._run_check(name))
+            self._running[name] = task
+            task.add_done_callback(lambda _: self._running.pop(name, None))
+        # shield: отключившийся клиент не отменяет проверку, которую ждут другие
+        return await asyncio.shield(task)
+
+    async def _run_check(self, name: str) -> tuple:
+        self.stats["checks"] += 1
+        try:
+            result = await asyncio.wait_for(self.checks[name](), self.check_timeout)
+        except asyncio.TimeoutError:
+            result = (False, f"нет ответа за {self.check_timeout:.0f} с")
+        except Exception as e:
+            result = (False, f"ошибка: {e}")
+        if not result[0] and (name not in self._results or self._results[name][1][0]):
+            logger.warning(f"❗ Проверка готовности {name} не пройдена: {result[1]}")
+        self._results[name] = (time.monotonic(), result)
+        return result
+
+    @staticmethod
+    async def _read_request(reader) -> bytes:
+        request_line = await reader.readline()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return request_line
+
+    async def _serve_connection(self, reader, writer) -> None:
+        try:
+            # Общий срок на весь запрос: медленный клиент не держит соединение, присылая по байту
+            try:
+                request_line = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                return
+            parts = request_line[:MAX_REQUEST_LINE].split()
+            method = parts[0] if parts else b""
+            path = parts[1].split(b"?", 1)[0] if len(parts) > 1 else b""
+
+            self.stats["probes"] += 1
+            if path not in (b"/healthz", b"/readyz"):
+                status, body = 404, {"status": "not found"}
+            elif method not in (b"GET", b"HEAD"):
+                status, body = 405, {"status": "method not allowed"}
+            else:
+                ok, body = self.liveness() if path == b"/healthz" else await self.readiness()
+                status = 200 if ok else 503
+
+            payload = json.dumps(body, ensure_ascii=False).encode()
+            writer.write(
+                b"HTTP/1.1 %d %s\r\nContent-Type: application/json; charset=utf-8\r\n"
+                b"Content-Length: %d\r\nConnection: close\r\n\r\n" % (status, HTTP_STATUSES[status], len(payload))
+            )
+            if method != b"HEAD":
+                writer.write(payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def log_report(self) -> None:
+        """Пишет в лог статистику задержки event loop и проверок."""
+        stats = self.stats
+        average = stats["lag_total"] / stats["samples"] * 1000 if stats["samples"] else 0.0
+        logger.info(
+            f"📊 Event loop: замеров {stats['samples']}, средняя задержка {average:.1f} мс, "
+            f"максимальная {stats['lag_max'] * 1000:.1f} мс; запросов проверок {stats['probes']}, "
+            f"выполнено проверок {stats['checks']}, из кэша {stats['cached']}, "
+            f"закрыто по таймауту чтения {stats['timeouts']}"
+        )
+
+
+def get_health_port():
+    """
+    Возвращает порт проверок состояния.
+
+    Returns:
+        int: HEALTH_PORT или None, если проверки выключены (по умолчанию)
+    """
+    port = os.getenv("HEALTH_PORT")
+    return int(port) if port else None
+
+
+def create_monitor(port: int, backlog=None, checks: dict = None, state=None) -> HealthMonitor:
+    """
+    Создает монитор с настройками из окружения.
+
+    Args:
+        port (int): Порт HTTP-сервера
+        backlog (callable): Функция, возвращающая словарь очередей работы
+        checks (dict): Проверки готовности: имя -> async функция
+        state (callable): Состояние процесса, проверяемое без кэширования
+
+    Returns:
+        HealthMonitor: Монитор (еще не запущенный)
+    """
+    return HealthMonitor(
+        host=os.getenv("HEALTH_HOST", "127.0.0.1"),
+        port=port,
+        backlog=backlog,
+        checks=checks,
+        state=state,
+        cache_ttl=float(os.getenv("HEALTH_CACHE_TTL", "5")),
+        lag_interval=float(os.getenv("HEALTH_LAG_INTERVAL", "0.5")),
+        max_lag=float(os.getenv("HEALTH_MAX_LAG", "5")),
+        max_backlog=int(os.getenv("HEALTH_MAX_BACKLOG", "1000")),
+        check_timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "2")),
+        read_timeout=float(os.getenv("HEALTH_READ_TIMEOUT", "5")),
+    )
+
+
+async def start_application_monitor(application):
+    """
+    Запускает проверки состояния процесса бота, если задан HEALTH_PORT.
+
+    Args:
+        application (BotApplication): Приложение бота
+
+    Returns:
+        HealthMonitor: Запущенный монитор или None, если проверки выключены
+    """
+    port = get_health_port()
+    if port is None:
+        return None
+    backlog, checks, state = application_checks(application)
+    monitor = create_monitor(port, backlog, checks, state)
+    await monitor.start()
+    return monitor
+
+
+def application_checks(application) -> tuple:
+    """
+    Собирает очереди работы и проверки готовности процесса бота.
+
+    Args:
+        application (BotApplication): Приложение бота
+
+    Returns:
+        tuple: (функция очередей работы, словарь проверок готовности, состояние процесса)
+    """
+    from services import openai_client, stt, tts
+    from services.voice_jobs import get_voice_queue
+
+    def backlog() -> dict:
+        limiter = application.bot.rate_limiter
+        return {
+            "queued": application.update_queue.qsize(),
+            "in_flight": application.tasks_in_flight,
+            "voice_jobs": get_voice_queue().pending,
+            "bot_api_queue": limiter.snapshot()["queue_depth"] if hasattr(limiter, "snapshot") else 0,
+        }
+
+    def running() -> tuple:
+        if application.stopping:
+            return False, "остановка"
+        return (True, "запущен") if application.running else (False, "не запущен")
+
+    async def openai() -> tuple:
+        state = openai_client.circuit_state()
+        return state != "open", state
+
+    async def speech(backend) -> tuple:
+        # available() импортирует пакет бэкенда и проверяет модель на диске
+        ok = await asyncio.to_thread(backend.available)
+        return ok, backend.name if ok else f"{backend.name} недоступен"
+
+    async def state_store() -> tuple:
+        backend = application.persistence.backend
+        await backend.read([PERSISTENCE_PROBE_KEY])
+        return True, backend.name
+
+    checks = {
+        "openai": openai,
+        "stt": lambda: speech(stt.get_speech_backend()),
+        "tts": lambda: speech(tts.get_tts_backend()),
+    }
+    if getattr(application.persistence, "backend", None) is not None:
+        checks["persistence"] = state_store
+    return backlog, checks, running
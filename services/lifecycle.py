@@ -0,0 +1,191 @@
+"""
+Корректная остановка бота без потери принятой работы.
+
+При остановке (SIGTERM, Ctrl+C) telegram.ext сначала останавливает
+получение обновлений и подтверждает Telegram все уже полученные, а затем
+Application.stop() выбрасывает обновления, которые еще лежат в очереди, и
+без ограничения по времени ждет фоновые задачи. BotApplication меняет
+порядок остановки:
+- новые обновления не принимаются (Updater уже остановлен)
+- все принятые обновления обрабатываются, и завершаются фоновые задачи
+  (голосовые задачи, отложенные удаления) - не дольше SHUTDOWN_TIMEOUT
+  секунд
+- по истечении срока или по повторному сигналу незавершенные обработчики
+  и задачи отменяются, а оставшиеся в очереди обновления пропускаются с
+  записью в лог
+- затем telegram.ext сохраняет persistence и закрывает HTTP-клиенты Bot API
+
+Временные аудиофайлы создаются в отдельном каталоге процесса (audio_path),
+который удаляется целиком при остановке, даже если задача была прервана.
+Каталог для таких каталогов задается AUDIO_TMP_DIR (по умолчанию системный
+каталог временных файлов).
+
+Проверка под нагрузкой: python -m services.bot_api_loadtest shutdown.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import time
+import warnings
+
+from telegram.warnings import PTBUserWarning
+
+from services.persistence import StateApplication
+
+logger = logging.getLogger(__name__)
+
+# Сигналы, повторное получение которых во время остановки прерывает ожидание
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+_audio_dir = None
+
+
+def get_shutdown_timeout() -> float:
+    """
+    Возвращает срок завершения принятой работы при остановке.
+
+    Returns:
+        float: SHUTDOWN_TIMEOUT в секундах (по умолчанию 20)
+    """
+    return float(os.getenv("SHUTDOWN_TIMEOUT", "20"))
+
+
+def audio_path(name: str) -> str:
+    """
+    Возвращает путь для временного аудиофайла в каталоге процесса.
+
+    Args:
+        name (str): Имя файла
+
+    Returns:
+        str: Путь внутри временного каталога, созданного при первом вызове
+    """
+    global _audio_dir
+    if _audio_dir is None:
+        _audio_dir = tempfile.mkdtemp(prefix="momotmr-audio-", dir=os.getenv("AUDIO_TMP_DIR") or None)
+    return os.path.join(_audio_dir, name)
+
+
+def remove_audio_dir() -> int:
+    """
+    Удаляет временный каталог аудиофайлов процесса.
+
+    Returns:
+        int: Число файлов, оставшихся в каталоге к моменту удаления
+    """
+    global _audio_dir
+    if _audio_dir is None:
+        return 0
+    left = len(os.listdir(_audio_dir)) if os.path.isdir(_audio_dir) else 0
+    shutil.rmtree(_audio_dir, ignore_errors=True)
+    if left:
+        logger.warning(f"❗ Удалено оставшихся временных аудиофайлов: {left}")
+    _audio_dir = None
+    return left
+
+
+class BotApplication(StateApplication):
+    """
+    Application бота с ограниченной по времени остановкой без потери обновлений.
+
+    Подключается через ApplicationBuilder.application_class. Обработка
+    каждого обновления и задачи create_task отслеживаются, чтобы при
+    истечении срока остановки их можно было отменить.
+    """
+
+    __slots__ = ("shutdown_timeout", "stopping", "_in_flight", "_cancelled", "_expired", "shutdown_stats")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shutdown_timeout = get_shutdown_timeout()
+        # Выставляется в начале остановки: проверка готовности (services.health) отвечает 503
+        self.stopping = False
+        self._in_flight = set()
+        self._cancelled = set()
+        self._expired = False
+        self.shutdown_stats = {"drained": 0, "cancelled": 0, "skipped": 0, "seconds": 0.0}
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    def create_task(self, coroutine, update=None, *, name=None):
+        with warnings.catch_warnings():
+            # Задачи, созданные во время остановки (очистка после отмены), ожидает stop()
+            warnings.filterwarnings("ignore", message=".*not running", category=PTBUserWarning)
+            task = super().create_task(coroutine, update=update, name=name)
+        self._track(task)
+        return task
+
+    async def process_update(self, update: object) -> None:
+        if self._expired:
+            self.shutdown_stats["skipped"] += 1
+            logger.warning(f"❗ Обновление {getattr(update, 'update_id', '?')} пропущено: срок остановки истек")
+            return
+        task = asyncio.ensure_future(super().process_update(update))
+        self._track(task)
+        try:
+            await task
+        except asyncio.CancelledError:
+            if task not in self._cancelled:
+                raise
+            logger.warning(f"❗ Обработка обновления {getattr(update, 'update_id', '?')} прервана при остановке")
+
+    async def _drain_and_stop(self) -> None:
+        # Application.stop() выбрасывает необработанные обновления, поэтому сначала дожидаемся очереди
+        await self.update_queue.join()
+        await super().stop()
+        while self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def _cancel_in_flight(self, reason: str) -> None:
+        pending = [task for task in self._in_flight if not task.done()]
+        self._expired = True
+        logger.warning(f"❗ Остановка: {reason}, отмена незавершенных задач: {len(pending)}")
+        for task in pending:
+            self._cancelled.add(task)
+            task.cancel()
+        self.shutdown_stats["cancelled"] += len(pending)
+
+    @property
+    def tasks_in_flight(self) -> int:
+        """Число незавершенных обработчиков обновлений и фоновых задач."""
+        return sum(not task.done() for task in self._in_flight)
+
+    async def stop(self) -> None:
+        self.stopping = True
+        started = time.monotonic()
+        queued = self.update_queue.qsize()
+        in_flight = self.tasks_in_flight
+        logger.info(
+            f"Остановка: обновлений в очереди {queued}, задач в работе {in_flight}, "
+            f"срок {self.shutdown_timeout:.0f} с"
+        )
+
+        loop = asyncio.get_running_loop()
+        forced = asyncio.Event()
+        for signal_number in STOP_SIGNALS:
+            try:
+                loop.add_signal_handler(signal_number, forced.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+        stopping = asyncio.ensure_future(self._drain_and_stop())
+        forcing = asyncio.ensure_future(forced.wait())
+        await asyncio.wait({stopping, forcing}, timeout=self.shutdown_timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not stopping.done():
+            self._cancel_in_flight("повторный сигнал" if forced.is_set() else f"срок {self.shutdown_timeout:.0f} с истек")
+        forcing.cancel()
+        await stopping
+
+        stats = self.shutdown_stats
+        stats["drained"] = queued + in_flight
+        stats["seconds"] = time.monotonic() - started
+        logger.info(
+            f"📊 Остановка за {stats['seconds']:.1f} с: было в очереди и в работе {stats['drained']}, "
+            f"отменено {stats['cancelled']}, пропущено обновлений {stats['skipped']}"
+        )
@@ -7,64 +7,486 @@
 - Общение с ChatGPT в режиме диалога
 - Персонифицированные ответы с различными личностями
 
+Каждая функция бота (fact, chat, personality, translate, quiz) вызывает модель
+по своему профилю генерации: модель, max_tokens, temperature, таймаут и
+резервная модель. Профили по умолчанию совпадают с прежними параметрами,
+кроме переводчика (temperature 0 вместо 0.8, см. single-flight ниже), и
+переопределяются JSON файлом OPENAI_PROFILES_FILE или переменными окружения
+вида OPENAI_<FEATURE>_<FIELD>, например OPENAI_TRANSLATE_MODEL=gpt-4o-mini.
+
+Профиль может включить single-flight: одинаковые запросы (модель, сообщения,
+параметры), выполняющиеся одновременно, разделяют один вызов API. По
+умолчанию включено только для переводчика: он работает с temperature 0, и
+общий ответ совпадает с тем, что получил бы каждый запрос отдельно. Факты и
+вопросы квиза должны оставаться разными даже для одинаковых промптов. Профиль
+с single_flight и ненулевой temperature загружается с предупреждением.
+
+Для профилей с semantic_cache первый ход диалога может быть обслужен из
+семантического кэша (services.semantic_cache), если он включен SEMANTIC_CACHE=1.
+
+Сообщения запроса строятся так, что статичный префикс (системный промпт
+функции, личности, языка или темы квиза) идет первым и побайтно совпадает
+между вызовами, а изменяемая часть (история и сообщение пользователя) - после
+него. Это позволяет провайдеру кэшировать префикс (prompt caching).
+
+Для каждого профиля накапливаются число вызовов, ошибки, переходы на
+резервную модель, объединенные запросы, задержка, токены (prompt, из кэша,
+completion) и стоимость;
+отчет с долей кэшированных токенов пишется в лог при остановке бота
+(log_usage_report).
+
+Предохранитель (circuit breaker): после OPENAI_BREAKER_FAILURES подряд
+неудачных запросов (ни одна модель профиля не ответила) запросы не
+отправляются OPENAI_BREAKER_COOLDOWN секунд и сразу завершаются
+CircuitOpenError - обработчики отвечают сообщением об ошибке без ожидания
+таймаутов. После паузы запросы снова пропускаются; первая же ошибка снова
+размыкает цепь, первый успех замыкает. Состояние (circuit_state) учитывается
+в проверке готовности services.health.
+
 Требует настройки переменной окружения CHATGPT_TOKEN с действующим API ключом OpenAI.
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
 import os
+import time
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+client = None
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Профили генерации по функциям бота
+DEFAULT_PROFILES = {
+    "fact": {
+        "model": DEFAULT_MODEL, "max_tokens": 200, "temperature": 0.8,
+        "timeout": 30, "fallback_model": None, "single_flight": False,
+        "semantic_cache": False,
+    },
+    "chat": {
+        "model": DEFAULT_MODEL, "max_tokens": 1000, "temperature": 0.7,
+        "timeout": 60, "fallback_model": None, "single_flight": False,
+        "semantic_cache": True,
+    },
+    "personality": {
+        "model": DEFAULT_MODEL, "max_tokens": 80, "temperature": 0.8,
+        "timeout": 30, "fallback_model": None, "single_flight": False,
+        "semantic_cache": True,
+    },
+    "translate": {
+        "model": DEFAULT_MODEL, "max_tokens": 80, "temperature": 0.0,
+        "timeout": 30, "fallback_model": None, "single_flight": True,
+        "semantic_cache": False,
+    },
+    "quiz": {
+        "model": DEFAULT_MODEL, "max_tokens": 80, "temperature": 0.8,
+        "timeout": 30, "fallback_model": None, "single_flight": False,
+        "semantic_cache": False,
+    },
+}
+
+
+# Типы полей профиля для значений из переменных окружения
+PROFILE_FIELDS = {
+    "model": str,
+    "max_tokens": int,
+    "temperature": float,
+    "timeout": float,
+    "fallback_model": str,
+    "single_flight": lambda value: value.lower() in ("1", "true", "yes"),
+    "semantic_cache": lambda value: value.lower() in ("1", "true", "yes"),
+}
+
+# Цена в долларах за 1000 токенов: (prompt, completion)
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4-turbo": (0.01, 0.03),
+}
+
+# Доля цены prompt-токенов, взятых из кэша провайдера
+CACHED_PROMPT_PRICE_RATIO = 0.5
+
+FACT_SYSTEM_PROMPT = "Ты помощник, который рассказывает интересные и познавательные факты. Отвечай на русском языке."
+FACT_USER_PROMPT = (
+    "Расскажи интересный случайный факт из любой области знаний. Факт должен быть познавательным, "
+    "удивительным и не слишком длинным (максимум 3-4 предложения)."
+)
+CHAT_SYSTEM_PROMPT = (
+    "Ты полезный помощник. Отвечай на русском языке, будь дружелюбным и информативным. "
+    "Если не знаешь ответ, честно об этом скажи."
+)
+
+_profiles = None
+
+# Запросы single-flight в полете: ключ запроса -> общая задача
+_in_flight = {}
+
+# Накопленная статистика по профилям: feature -> счетчики
+usage_stats = {}
+
+# Предохранитель: неудачные запросы подряд и время размыкания цепи (time.monotonic)
+_circuit = {"failures": 0, "opened_at": None}
+
+
+class CircuitOpenError(RuntimeError):
+    """Запрос к OpenAI не отправлен: предохранитель разомкнут после серии ошибок."""
+
+
+def get_client():
+    """
+    Возвращает общий асинхронный клиент OpenAI, создавая его при первом вызове.
+
+    Пакет openai импортируется только здесь, чтобы не замедлять старт бота.
+
+    Returns:
+        AsyncOpenAI: Клиент OpenAI API
+
+    Raises:
+        ValueError: Если в окружении не задан CHATGPT_TOKEN
+    """
+    global client
+    if client is None:
+        from openai import AsyncOpenAI
+
+        chatgpt_token = os.getenv("CHATGPT_TOKEN")
+        if not chatgpt_token:
+            raise ValueError("Введите токен в .env")
+        # OPENAI_BASE_URL позволяет направить запросы на совместимый API или локальную заглушку
+        client = AsyncOpenAI(api_key=chatgpt_token, base_url=os.getenv("OPENAI_BASE_URL") or None)
+        logger.info("GPT_TOKEN загружен !")
+    return client
+
+
+async def close_client() -> None:
+    """Закрывает HTTP-соединения клиента OpenAI, если он был создан."""
+    global client
+    if client is not None:
+        await client.close()
+        client = None
+        logger.info("Клиент OpenAI закрыт")
+
+
+def load_profiles() -> dict:
+    """
+    Собирает профили генерации из значений по умолчанию, файла и окружения.
+
+    Файл OPENAI_PROFILES_FILE содержит JSON вида
+    {"profiles": {"translate": {"model": "gpt-4o-mini"}}, "prices": {"gpt-4o-mini": [0.00015, 0.0006]}}.
+    Переменные окружения OPENAI_<FEATURE>_<FIELD> имеют приоритет над файлом.
+
+    Returns:
+        dict: Профили по функциям бота
+    """
+    profiles = {feature: dict(profile) for feature, profile in DEFAULT_PROFILES.items()}
+
+    profiles_file = os.getenv("OPENAI_PROFILES_FILE")
+    if profiles_file:
+        with open(profiles_file, encoding="utf-8") as f:
+            config = json.load(f)
+        for feature, overrides in config.get("profiles", {}).items():
+            profiles.setdefault(feature, dict(DEFAULT_PROFILES["chat"])).update(overrides)
+        MODEL_PRICES.update({model: tuple(price) for model, price in config.get("prices", {}).items()})
+        logger.info(f"Профили OpenAI загружены из {profiles_file}")
+
+    for feature, profile in profiles.items():
+        for field, field_type in PROFILE_FIELDS.items():
+            value = os.getenv(f"OPENAI_{feature.upper()}_{field.upper()}")
+            if value:
+                profile[field] = field_type(value)
+
+    for feature, profile in profiles.items():
+        logger.info(f"Профиль OpenAI {feature}: {profile}")
+        if profile.get("single_flight") and profile.get("temperature"):
+            logger.warning(f"❗ Профиль OpenAI {feature}: single_flight при temperature {profile['temperature']} "
+                           f"отдает одновременным одинаковым запросам один случайный ответ")
+    return profiles
+
+
+def get_profile(feature: str) -> dict:
+    """
+    Возвращает профиль генерации функции бота.
+
+    Args:
+        feature (str): Функция бота (fact, chat, personality, translate, quiz)
+
+    Returns:
+        dict: Профиль с полями model, max_tokens, temperature, timeout, fallback_model
+    """
+    global _profiles
+    if _profiles is None:
+        _profiles = load_profiles()
+    return _profiles[feature]
+
+
+@lru_cache(maxsize=128)
+def _system_message(prompt: str) -> dict:
+    # Один и тот же объект для каждого промпта: префикс сериализуется одинаково
+    return {"role": "system", "content": prompt}
+
+
+def build_messages(system_prompt: str, messages: list) -> list:
+    """
+    Собирает сообщения запроса со статичным префиксом в начале.
+
+    Системный промпт всегда идет первым и не содержит изменяемых данных,
+    поэтому префикс запроса побайтно совпадает между вызовами одной функции,
+    личности, языка или темы квиза.
+
+    Args:
+        system_prompt (str): Статичный системный промпт
+        messages (list): Изменяемая часть: история и сообщение пользователя
+
+    Returns:
+        list: Сообщения для OpenAI API
+    """
+    return [_system_message(system_prompt), *messages]
+
+
+def _cached_tokens(usage) -> int:
+    # prompt_tokens_details может прийти как объект или как словарь (доп. поле ответа)
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
+
 
-CHATGPT_TOKEN = os.getenv("CHATGPT_TOKEN")
-if not CHATGPT_TOKEN:
-    raise ValueError("Введите токен в .env")
-else:
-    logger.info("GPT_TOKEN загружен !")
+def _stats(feature: str) -> dict:
+    return usage_stats.setdefault(feature, {
+        "calls": 0, "errors": 0, "fallbacks": 0, "coalesced": 0, "rejected": 0, "latency": 0.0,
+        "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost": 0.0,
+    })
 
 
-client = AsyncOpenAI(api_key=CHATGPT_TOKEN)
+def _record_usage(feature: str, model: str, response, elapsed: float, fallback: bool) -> None:
+    stats = _stats(feature)
+    if response is None:
+        stats["errors"] += 1
+        return
+
+    stats["calls"] += 1
+    stats["fallbacks"] += fallback
+    stats["latency"] += elapsed
+    usage = response.usage
+    if usage is not None:
+        cached_tokens = _cached_tokens(usage)
+        stats["prompt_tokens"] += usage.prompt_tokens
+        stats["cached_tokens"] += cached_tokens
+        stats["completion_tokens"] += usage.completion_tokens
+        prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        prompt_cost = (usage.prompt_tokens - cached_tokens + cached_tokens * CACHED_PROMPT_PRICE_RATIO) * prompt_price
+        stats["cost"] += (prompt_cost + usage.completion_tokens * completion_price) / 1000
+
+
+def _request_key(profile: dict, messages: list) -> str:
+    payload = json.dumps(
+        [profile["model"], profile["fallback_model"], profile["max_tokens"], profile["temperature"], messages],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _breaker_settings() -> tuple:
+    return int(os.getenv("OPENAI_BREAKER_FAILURES", "5")), float(os.getenv("OPENAI_BREAKER_COOLDOWN", "30"))
+
+
+def circuit_state() -> str:
+    """
+    Возвращает состояние предохранителя запросов к OpenAI.
+
+    Returns:
+        str: closed - запросы идут, open - запросы отклоняются до конца паузы,
+            half_open - пауза истекла, следующий запрос проверит API
+    """
+    if _circuit["opened_at"] is None:
+        return "closed"
+    _, cooldown = _breaker_settings()
+    return "open" if time.monotonic() - _circuit["opened_at"] < cooldown else "half_open"
+
+
+def _circuit_failure() -> None:
+    threshold, cooldown = _breaker_settings()
+    _circuit["failures"] += 1
+    if threshold and _circuit["failures"] >= threshold:
+        if _circuit["opened_at"] is None:
+            logger.warning(f"❗ OpenAI: ошибок подряд {_circuit['failures']}, запросы приостановлены на {cooldown:.0f} с")
+        _circuit["opened_at"] = time.monotonic()
+
+
+def _circuit_success() -> None:
+    if _circuit["opened_at"] is not None:
+        logger.info("OpenAI снова отвечает, запросы возобновлены")
+    _circuit["failures"] = 0
+    _circuit["opened_at"] = None
+
+
+async def create_completion(feature: str, messages: list):
+    """
+    Выполняет запрос к ChatGPT по профилю функции бота.
+
+    Если основная модель вернула ошибку или не уложилась в таймаут, запрос
+    повторяется один раз на резервной модели профиля (если она задана).
+    Для профилей с single_flight одинаковый запрос, который уже выполняется,
+    не отправляется повторно: вызывающий получает результат общего вызова.
+
+    Args:
+        feature (str): Функция бота (fact, chat, personality, translate, quiz)
+        messages (list): Сообщения запроса
+
+    Returns:
+        ChatCompletion: Ответ OpenAI API
+
+    Raises:
+        CircuitOpenError: Если предохранитель разомкнут после серии ошибок
+        Exception: Ошибка OpenAI API, если не удалось получить ответ ни от одной модели
+    """
+    if circuit_state() == "open":
+        _stats(feature)["rejected"] += 1
+        raise CircuitOpenError("OpenAI временно недоступен")
+    profile = get_profile(feature)
+    if not profile.get("single_flight"):
+        return await _create_completion(feature, profile, messages)
+
+    key = _request_key(profile, messages)
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_create_completion(feature, profile, messages))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        _stats(feature)["coalesced"] += 1
+        logger.info(f"📊 OpenAI {feature}: запрос объединен с уже выполняющимся")
+    # shield: отмена одного из ожидающих не отменяет общий вызов для остальных
+    return await asyncio.shield(task)
+
+
+async def _create_completion(feature: str, profile: dict, messages: list):
+    models = [profile["model"]]
+    if profile.get("fallback_model") and profile["fallback_model"] != profile["model"]:
+        models.append(profile["fallback_model"])
+
+    for attempt, model in enumerate(models):
+        started = time.perf_counter()
+        try:
+            response = await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=profile["max_tokens"],
+                temperature=profile["temperature"],
+                timeout=profile["timeout"]
+            )
+        except Exception as e:
+            _record_usage(feature, model, None, time.perf_counter() - started, False)
+            if attempt + 1 == len(models):
+                _circuit_failure()
+                raise
+            logger.warning(f"❗ {feature}: ошибка модели {model} ({e}), переход на {models[attempt + 1]}")
+            continue
+
+        elapsed = time.perf_counter() - started
+        _circuit_success()
+        _record_usage(feature, model, response, elapsed, attempt > 0)
+        logger.info(f"📊 OpenAI {feature}: {model}, {elapsed * 1000:.0f} мс")
+        return response
+
+
+async def complete_text(feature: str, system_prompt: str, messages: list) -> str:
+    """
+    Возвращает текст ответа модели с учетом семантического кэша.
+
+    Кэш используется только для первого хода (единственное сообщение
+    пользователя без истории) и только если он включен для профиля.
+
+    Args:
+        feature (str): Функция бота
+        system_prompt (str): Статичный системный промпт
+        messages (list): История и сообщение пользователя
+
+    Returns:
+        str: Текст ответа
+
+    Raises:
+        Exception: Ошибка OpenAI API
+    """
+    cache = None
+    if get_profile(feature).get("semantic_cache") and len(messages) == 1 and messages[0]["role"] == "user":
+        from services.semantic_cache import get_semantic_cache
+
+        cache = get_semantic_cache()
+
+    vector = None
+    if cache is not None:
+        vector = await cache.embed(messages[0]["content"])
+        answer = cache.lookup(system_prompt, messages[0]["content"], vector)
+        if answer is not None:
+            return answer
+
+    started = time.perf_counter()
+    response = await create_completion(feature, build_messages(system_prompt, messages))
+    answer = response.choices[0].message.content
+    if cache is not None:
+        cache.store(system_prompt, messages[0]["content"], vector, answer, time.perf_counter() - started)
+    return answer
+
+
+def log_usage_report() -> None:
+    """Пишет в лог накопленную статистику вызовов OpenAI по профилям."""
+    for feature, stats in sorted(usage_stats.items()):
+        calls = stats["calls"]
+        average = stats["latency"] / calls * 1000 if calls else 0.0
+        cached_ratio = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        logger.info(
+            f"📊 OpenAI {feature}: вызовов {calls}, ошибок {stats['errors']}, "
+            f"резервная модель {stats['fallbacks']}, объединено {stats['coalesced']}, "
+            f"отклонено предохранителем {stats['rejected']}, "
+            f"средняя задержка {average:.0f} мс, "
+            f"токены prompt/кэш/completion {stats['prompt_tokens']}/{stats['cached_tokens']}/"
+            f"{stats['completion_tokens']} (кэш {cached_ratio:.0%}), стоимость ${stats['cost']:.6f}"
+        )
+
+FACT_ERROR_TEXT = "🤔 К сожалению, не удалось получить факт в данный момент. Попробуйте позже!"
+
+async def generate_fact() -> str:
+    """
+    Генерирует интересный и познавательный факт из любой области знаний.
+
+    Returns:
+        str: Текст факта
+
+    Raises:
+        Exception: Ошибки OpenAI API передаются вызывающему
+    """
+    logger.info("CHATGPT - generate_fact")
+    response = await create_completion("fact", build_messages(
+        FACT_SYSTEM_PROMPT,
+        [{"role": "user", "content": FACT_USER_PROMPT}]
+    ))
+    fact = response.choices[0].message.content.strip()
+    logger.info("Факт успешно получен от OpenAI")
+    return fact
 
 async def get_random_fact():
     """
     Получить случайный факт от ChatGPT.
 
-    Генерирует интересный и познавательный факт из любой области знаний
-    с использованием OpenAI API.
-
     Returns:
         str: Случайный факт или сообщение об ошибке
     """
-    logger.info("CHATGPT - get_random_fact")
     try:
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Ты помощник, который рассказывает интересные и познавательные факты. Отвечай на русском языке."
-                },
-                {
-                    "role": "user",
-                    "content": "Расскажи интересный случайный факт из любой области знаний. Факт должен быть познавательным, удивительным и не слишком длинным (максимум 3-4 предложения)."
-                }
-            ],
-            max_tokens=200,
-            temperature=0.8
-        )
-
-        fact = response.choices[0].message.content.strip()
-        logger.info("Факт успешно получен от OpenAI")
-        return fact
+        return await generate_fact()
 
     except Exception as e:
         logger.error(f"Ошибка при получении факта от OpenAI: {e}")
-        return "🤔 К сожалению, не удалось получить факт в данный момент. Попробуйте позже!"
+        return FACT_ERROR_TEXT
 
-async def get_chatgpt_response(messages: list):
+async def get_chatgpt_response(messages: list, feature: str = "chat"):
     """
     Получение ответа ChatGPT на запрос пользователя.
 
@@ -73,6 +495,7 @@ async def get_chatgpt_response(messages: list):
 
     Args:
         messages (list): Список сообщений в формате [{"role": "user/assistant", "content": "текст"}]
+        feature (str): Профиль генерации
 
     Returns:
         str: Ответ от ChatGPT или сообщение об ошибке
@@ -85,23 +508,8 @@ async def get_chatgpt_response(messages: list):
                 logger.error(f"Некорректный формат content в сообщении: {msg}")
                 raise ValueError(f"Content должен быть строкой, получено: {msg['content']}")
 
-        full_messages = [
-                            {
-                                "role": "system",
-                                "content": "Ты полезный помощник. Отвечай на русском языке, будь дружелюбным и информативным. Если не знаешь ответ, честно об этом скажи."
-                            }
-                        ] + messages  # Добавляем историю к системному промпту
-
-        logger.info(f"Полный список сообщений, отправляемый в OpenAI: {full_messages}")
-
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=full_messages,
-            max_tokens=1000,
-            temperature=0.7
-        )
-
-        answer = response.choices[0].message.content
+        # Системный промпт - статичный префикс, история добавляется после него
+        answer = await complete_text(feature, CHAT_SYSTEM_PROMPT, messages)
         logger.info(f"Ответ успешно получен от OpenAI {answer}")
         return answer
 
@@ -109,7 +517,7 @@ async def get_chatgpt_response(messages: list):
         logger.error(f"Ошибка при получении ответа от OpenAI: {e}")
         return "😔 Извините, произошла ошибка при обращении к ChatGPT. Попробуйте позже!"
 
-async def get_personality_response(user_message, personality_prompt: str):
+async def get_personality_response(user_message, personality_prompt: str, feature: str = "personality"):
     """
     Получить персонифицированный ответ от ChatGPT.
 
@@ -119,28 +527,14 @@ async def get_personality_response(user_message, personality_prompt: str):
     Args:
         user_message (str): Сообщение от пользователя
         personality_prompt (str): Промпт с описанием личности для системной роли
+        feature (str): Профиль генерации (personality, translate, quiz)
 
     Returns:
         str: Персонифицированный ответ от ChatGPT или сообщение об ошибке
     """
     try:
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": personality_prompt
-                },
-                {
-                    "role": "user",
-                    "content": user_message
-                }
-            ],
-            max_tokens=80,
-            temperature=0.8
-        )
-
-        answer = response.choices[0].message.content.strip()
+        answer = await complete_text(feature, personality_prompt, [{"role": "user", "content": user_message}])
+        answer = answer.strip()
         logger.info("Персонифицированный ответ успешно получен от OpenAI")
         return answer
 
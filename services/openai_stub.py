@@ -0,0 +1,267 @@
+"""
+Локальный сервер-заглушка OpenAI-совместимого API.
+
+Отвечает заготовленным текстом без сети и без аккаунта, поэтому на нем
+проверяются services.content_batch (--base-url) и сам бот (OPENAI_BASE_URL):
+- POST /v1/chat/completions - ответ на запрос чата
+- POST /v1/files, GET /v1/files/<id>/content - загрузка и выдача файлов
+- POST /v1/batches, GET /v1/batches/<id> - пакет выполняется сразу при
+  создании: для каждой строки входного файла пишется ответ в файл результатов
+
+Текст ответа строится по custom_id (для пакетов) или по системному промпту:
+вопросы квиза приходят в формате handlers.quiz.parse_question_response,
+остальные запросы получают пронумерованный факт. Каждый FAIL_EVERY-й запрос
+пакета завершается ошибкой, чтобы проверить их отбрасывание при загрузке.
+
+    python -m services.openai_stub --port 8090
+    python -m services.content_batch --base-url http://127.0.0.1:8090/v1 submit --facts 5 --questions 2
+"""
+
+import argparse
+import email.parser
+import email.policy
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+STUB_MODEL = "stub"
+
+QUIZ_ANSWER = (
+    "Вопрос: Заглушка {number}: сколько будет {number} + 1?\n"
+    "A) {number}\nB) {next}\nC) {prev}\nD) 0\n"
+    "Правильный ответ: B"
+)
+FACT_ANSWER = "Факт заглушки номер {number}: у осьминога три сердца."
+
+# Каждый FAIL_EVERY-й запрос пакета завершается ошибкой (0 - без ошибок)
+FAIL_EVERY = 0
+
+
+def stub_answer(number: int, quiz: bool) -> str:
+    """
+    Строит текст ответа заглушки.
+
+    Args:
+        number (int): Номер ответа, чтобы ответы не совпадали
+        quiz (bool): Вопрос квиза вместо факта
+
+    Returns:
+        str: Текст ответа
+    """
+    template = QUIZ_ANSWER if quiz else FACT_ANSWER
+    return template.format(number=number, next=number + 1, prev=number - 1)
+
+
+def _completion(body: dict, number: int, quiz: bool) -> dict:
+    content = stub_answer(number, quiz)
+    return {
+        "id": f"chatcmpl-stub-{number}", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model", STUB_MODEL),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": len(content.split()), "total_tokens": 10 + len(content.split())},
+    }
+
+
+def _is_quiz(body: dict) -> bool:
+    system = next((m.get("content", "") for m in body.get("messages", []) if m.get("role") == "system"), "")
+    return "квиз" in system.lower()
+
+
+class OpenAIStub:
+    """
+    Состояние заглушки: файлы, пакеты и счетчик ответов.
+
+    Запускается в фоновом потоке:
+        with OpenAIStub() as stub:
+            client = OpenAI(api_key="test", base_url=stub.base_url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_every: int = FAIL_EVERY):
+        self.fail_every = fail_every
+        self.files = {}
+        self.batches = {}
+        self.requests = []
+        self._numbers = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Адрес API для клиента OpenAI (с префиксом /v1)."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "OpenAIStub":
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_number(self) -> int:
+        with self._lock:
+            return next(self._numbers)
+
+    def _add_file(self, filename: str, purpose: str, content: bytes) -> dict:
+        file_id = f"file-stub-{len(self.files) + 1}"
+        record = {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        }
+        self.files[file_id] = (record, content)
+        return record
+
+    def chat(self, body: dict) -> dict:
+        """Отвечает на запрос /v1/chat/completions."""
+        return _completion(body, self._next_number(), _is_quiz(body))
+
+    def create_batch(self, body: dict) -> dict:
+        """
+        Создает пакет и сразу выполняет его запросы.
+
+        Args:
+            body (dict): Тело POST /v1/batches
+
+        Returns:
+            dict: Объект пакета со статусом completed
+        """
+        _, content = self.files[body["input_file_id"]]
+        output, failed, total = [], 0, 0
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            total += 1
+            request = json.loads(line)
+            custom_id = request["custom_id"]
+            if self.fail_every and total % self.fail_every == 0:
+                failed += 1
+                output.append({"id": f"batch-req-{total}", "custom_id": custom_id, "response": None,
+                               "error": {"code": "server_error", "message": "stub failure"}})
+                continue
+            quiz = custom_id.startswith("quiz:") or _is_quiz(request["body"])
+            output.append({"id": f"batch-req-{total}", "custom_id": custom_id, "error": None, "response": {
+                "status_code": 200, "request_id": f"req-{total}",
+                "body": _completion(request["body"], self._next_number(), quiz),
+            }})
+
+        payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in output).encode("utf-8")
+        output_file = self._add_file("batch_output.jsonl", "batch_output", payload)
+        now = int(time.time())
+        batch = {
+            "id": f"batch-stub-{len(self.batches) + 1}", "object": "batch", "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"], "completion_window": body["completion_window"],
+            "status": "completed", "output_file_id": output_file["id"], "error_file_id": None,
+            "created_at": now, "in_progress_at": now, "completed_at": now,
+            "request_counts": {"total": total, "completed": total - failed, "failed": failed},
+        }
+        self.batches[batch["id"]] = batch
+        return batch
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, status: int, payload, content_type: str = "application/json") -> None:
+                data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _not_found(self) -> None:
+                self._send(404, {"error": {"message": f"Нет маршрута {self.command} {self.path}", "type": "invalid_request_error"}})
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                body = self._body()
+                stub.requests.append((self.command, self.path))
+                if self.path == "/v1/chat/completions":
+                    self._send(200, stub.chat(json.loads(body)))
+                elif self.path == "/v1/files":
+                    self._send(200, stub._add_file(*self._multipart_file(body)))
+                elif self.path == "/v1/batches":
+                    self._send(200, stub.create_batch(json.loads(body)))
+                else:
+                    self._not_found()
+
+            def do_GET(self):
+                stub.requests.append((self.command, self.path))
+                match = re.fullmatch(r"/v1/(files|batches)/([\w-]+)(/content)?", self.path)
+                if match is None:
+                    return self._not_found()
+                kind, object_id, content = match.groups()
+                if kind == "batches" and object_id in stub.batches and not content:
+                    self._send(200, stub.batches[object_id])
+                elif kind == "files" and object_id in stub.files:
+                    record, data = stub.files[object_id]
+                    self._send(200, data if content else record,
+                               "application/octet-stream" if content else "application/json")
+                else:
+                    self._not_found()
+
+            def _multipart_file(self, body: bytes) -> tuple:
+                # multipart/form-data из files.create: поле purpose и файл
+                header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                message = email.parser.BytesParser(policy=email.policy.default).parsebytes(header + body)
+                filename, purpose, content = "upload.jsonl", "batch", b""
+                for part in message.iter_parts():
+                    name = part.get_param("name", header="content-disposition")
+                    if name == "purpose":
+                        purpose = part.get_content().strip()
+                    elif name == "file":
+                        filename = part.get_filename() or filename
+                        content = part.get_payload(decode=True)
+                return filename, purpose, content
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    """Точка входа CLI: запускает заглушку до Ctrl+C."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fail-every", type=int, default=FAIL_EVERY, help="каждый N-й запрос пакета с ошибкой")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    stub = OpenAIStub(args.host, args.port, args.fail_every)
+    logger.info(f"Заглушка OpenAI: {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,499 @@
+"""
+Внешнее хранилище user_data, chat_data и состояний диалогов.
+
+Чтобы несколько экземпляров бота обслуживали одних и тех же пользователей,
+состояние должно жить вне процесса. Модуль подключается к telegram.ext как
+BasePersistence поверх сменного бэкенда (StateBackend):
+- memory - словарь в процессе (по умолчанию, один экземпляр бота)
+- redis - любой сервер с протоколом Redis (redis-server, KeyDB, Valkey),
+  нужен пакет redis: pip install redis
+
+Записи хранятся по ключам user:<id>, chat:<id> и conv:<диалог>:<ключ> вместе
+с номером версии. Для общего бэкенда (redis) каждое обновление
+обрабатывается так:
+- до обработчиков все ключи обновления (пользователь, чат, состояния
+  диалогов) читаются одним конвейером (pipeline), один сетевой запрос
+- после обработчиков измененные записи пишутся одним конвейером; запись
+  проходит, только если версия в хранилище совпадает с прочитанной
+  (оптимистическая блокировка)
+- при конфликте (запись успел изменить другой экземпляр) запись
+  перечитывается и изменения сливаются с чужой версией: в user_data и
+  chat_data применяются ключи, которые изменил или удалил этот обработчик,
+  остальные берутся из хранилища; состояние диалога записывается новое.
+  Слияние повторяется до MAX_WRITE_ATTEMPTS раз, записи, которые так и не
+  удалось сохранить, commit() возвращает и пишет в лог как ошибку
+- записи, содержимое которых не изменилось, не отправляются
+
+Для memory записи сохраняются раз в STATE_UPDATE_INTERVAL секунд и при
+остановке, как в обычной persistence telegram.ext. bot_data (ожидающие
+опросы квиза) остается в процессе.
+
+Бэкенд выбирается переменными окружения STATE_BACKEND (memory | redis),
+REDIS_URL и STATE_KEY_PREFIX.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from telegram import Update
+from telegram.ext import Application, BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+# Сравнение версии и запись (или удаление) одной командой на сервере
+REDIS_CAS_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'v') or '0')
+if current ~= tonumber(ARGV[1]) then
+    return -1
+end
+if ARGV[2] == '1' then
+    redis.call('HSET', KEYS[1], 'v', current + 1, 'd', ARGV[3])
+    return current + 1
+end
+redis.call('DEL', KEYS[1])
+return 0
+"""
+
+
+# Попыток записи с перечитыванием и слиянием при конфликте версий
+MAX_WRITE_ATTEMPTS = 3
+
+
+def merge_data(base: dict, ours: dict, theirs: dict) -> dict:
+    """
+    Сливает изменения user_data или chat_data с версией другого экземпляра.
+
+    Args:
+        base (dict): Данные, прочитанные до обработчиков
+        ours (dict): Данные после обработчиков этого экземпляра
+        theirs (dict): Данные, записанные другим экземпляром
+
+    Returns:
+        dict: theirs с ключами, которые изменил или удалил этот экземпляр
+    """
+    merged = dict(theirs)
+    for key in base.keys() | ours.keys():
+        if key not in ours:
+            merged.pop(key, None)
+        elif key not in base or ours[key] != base[key]:
+            merged[key] = ours[key]
+    return merged
+
+
+class StateBackend:
+    """
+    Базовый класс хранилища записей с версиями.
+
+    Запись - пара (версия, данные в байтах). Отсутствующая запись имеет
+    версию 0. Бэкенд с shared = True доступен нескольким процессам, и его
+    записи перечитываются на каждом обновлении.
+    """
+
+    name = "base"
+    shared = False
+
+    async def read(self, keys: list) -> dict:
+        """
+        Читает записи за один запрос.
+
+        Args:
+            keys (list): Ключи записей
+
+        Returns:
+            dict: {ключ: (версия, данные)} для существующих записей
+        """
+        raise NotImplementedError
+
+    async def write(self, writes: list) -> list:
+        """
+        Записывает или удаляет записи за один запрос с проверкой версий.
+
+        Args:
+            writes (list): [(ключ, данные или None для удаления, ожидаемая версия), ...]
+
+        Returns:
+            list: Новая версия каждой записи или None, если версия в хранилище
+                не совпала с ожидаемой (запись не выполнена)
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Закрывает соединения бэкенда."""
+
+
+class MemoryBackend(StateBackend):
+    """Записи в словаре процесса."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._records = {}
+
+    async def read(self, keys: list) -> dict:
+        return {key: self._records[key] for key in keys if key in self._records}
+
+    async def write(self, writes: list) -> list:
+        versions = []
+        for key, data, expected in writes:
+            current = self._records.get(key, (0, None))[0]
+            if current != expected:
+                versions.append(None)
+            elif data is None:
+                self._records.pop(key, None)
+                versions.append(0)
+            else:
+                self._records[key] = (current + 1, data)
+                versions.append(current + 1)
+        return versions
+
+
+class RedisBackend(StateBackend):
+    """
+    Записи в Redis: хэш {v: версия, d: данные} на ключ.
+
+    Чтение - конвейер HMGET, запись - конвейер вызовов Lua-скрипта
+    REDIS_CAS_SCRIPT, который сравнивает версию и пишет атомарно.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "momotmr:", client=None):
+        """
+        Args:
+            url (str): Адрес сервера Redis
+            prefix (str): Префикс ключей бота в общей базе
+            client (redis.asyncio.Redis, optional): Готовый клиент (например, fakeredis)
+
+        Raises:
+            RuntimeError: Если пакет redis не установлен
+        """
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("Для STATE_BACKEND=redis установите пакет redis") from e
+            client = redis.from_url(url)
+        self.prefix = prefix
+        self._redis = client
+        self._cas = client.register_script(REDIS_CAS_SCRIPT)
+
+    async def read(self, keys: list) -> dict:
+        pipeline = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hmget(self.prefix + key, "v", "d")
+        records = {}
+        for key, (version, data) in zip(keys, await pipeline.execute()):
+            if version is not None:
+                records[key] = (int(version), data)
+        return records
+
+    async def write(self, writes: list) -> list:
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, data, expected in writes:
+            args = [expected, "1", data] if data is not None else [expected, "0"]
+            await self._cas(keys=[self.prefix + key], args=args, client=pipeline)
+        return [None if version < 0 else version for version in await pipeline.execute()]
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def _conversation_key(handler, update: Update):
+    # Ключ состояния так же, как его строит ConversationHandler по per_chat/per_user/per_message
+    key = []
+    if handler.per_chat:
+        if update.effective_chat is None:
+            return None
+        key.append(update.effective_chat.id)
+    if handler.per_user:
+        if update.effective_user is None:
+            return None
+        key.append(update.effective_user.id)
+    if handler.per_message:
+        query = update.callback_query
+        if query is None:
+            return None
+        key.append(query.inline_message_id or query.message.message_id)
+    return tuple(key)
+
+
+class StatePersistence(BasePersistence):
+    """
+    Persistence telegram.ext поверх StateBackend.
+
+    Данные не загружаются целиком при старте: каждая запись читается при
+    первом обновлении, которому она нужна (для общего бэкенда - на каждом
+    обновлении). Изменения копятся до commit().
+    """
+
+    def __init__(self, backend: StateBackend, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval
+        )
+        self.backend = backend
+        # ключ -> (версия, отпечаток данных) последней прочитанной или записанной версии
+        self._known = {}
+        # ключ -> данные этой версии, для слияния при конфликте (только общий бэкенд)
+        self._base = {}
+        self._pending = {}
+        self._conversations = None
+        self.stats = {"updates": 0, "reads": 0, "keys_read": 0, "writes": 0, "keys_written": 0,
+                      "unchanged": 0, "conflicts": 0, "merged": 0, "lost": 0}
+
+    @staticmethod
+    def _digest(data) -> bytes:
+        return None if data is None else hashlib.blake2b(data, digest_size=8).digest()
+
+    def _conversation_handlers(self, application: Application) -> list:
+        if self._conversations is None:
+            # TrackingDict состояний каждого постоянного диалога, по имени
+            stored = application._conversation_handler_conversations
+            self._conversations = [
+                (handler, stored[handler.name])
+                for handlers in application.handlers.values()
+                for handler in handlers
+                if getattr(handler, "persistent", False) and handler.name in stored
+            ]
+        return self._conversations
+
+    async def load_update(self, application: Application, update: Update) -> None:
+        """
+        Загружает записи, нужные обновлению, одним запросом к бэкенду.
+
+        Args:
+            application (Application): Приложение, чьи user_data, chat_data и
+                состояния диалогов обновляются
+            update (Update): Обрабатываемое обновление
+        """
+        self.stats["updates"] += 1
+        targets = {}
+        if update.effective_user:
+            user_id = update.effective_user.id
+            targets[f"user:{user_id}"] = ("data", application.user_data, user_id)
+        if update.effective_chat:
+            chat_id = update.effective_chat.id
+            targets[f"chat:{chat_id}"] = ("data", application.chat_data, chat_id)
+        for handler, states in self._conversation_handlers(application):
+            key = _conversation_key(handler, update)
+            if key is not None:
+                targets[f"conv:{handler.name}:{json.dumps(key)}"] = ("state", states, key)
+
+        if not self.backend.shared:
+            targets = {name: target for name, target in targets.items() if name not in self._known}
+        if not targets:
+            return
+
+        records = await self.backend.read(list(targets))
+        self.stats["reads"] += 1
+        self.stats["keys_read"] += len(targets)
+        for name, (kind, storage, key) in targets.items():
+            version, data = records.get(name, (0, None))
+            self._known[name] = (version, self._digest(data))
+            if self.backend.shared:
+                self._base[name] = data
+            value = pickle.loads(data) if data is not None else None
+            if kind == "data":
+                local = storage[key]
+                local.clear()
+                if value:
+                    local.update(value)
+            elif value is None:
+                # Без отметки об изменении: удаление уже отражено в хранилище
+                storage.data.pop(key, None)
+            else:
+                storage.update_no_track({key: value})
+
+    def _remember(self, name: str, version: int, data) -> None:
+        self._known[name] = (version, self._digest(data))
+        if self.backend.shared:
+            self._base[name] = data
+
+    def _merge(self, name: str, value, theirs):
+        # Состояние диалога - результат последнего обработчика, остальное сливается по ключам
+        if name.startswith("conv:"):
+            return value
+        base = self._base.get(name)
+        merged = merge_data(
+            pickle.loads(base) if base is not None else {},
+            value or {},
+            pickle.loads(theirs) if theirs is not None else {},
+        )
+        return merged or None
+
+    async def commit(self) -> list:
+        """
+        Отправляет накопленные изменения одним запросом к бэкенду.
+
+        При конфликте версий запись перечитывается, изменения сливаются с
+        чужой версией и отправляются снова, не больше MAX_WRITE_ATTEMPTS раз.
+
+        Returns:
+            list: Ключи записей, которые не удалось сохранить из-за конфликтов
+        """
+        if not self._pending:
+            return []
+        pending, self._pending = self._pending, {}
+        writes = []
+        for name, value in pending.items():
+            data = None if value is None else pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            version, digest = self._known.get(name, (0, None))
+            if self._digest(data) == digest:
+                self.stats["unchanged"] += 1
+                continue
+            writes.append((name, value, data, version))
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            if not writes:
+                return []
+            versions = await self.backend.write([(name, data, version) for name, _, data, version in writes])
+            self.stats["writes"] += 1
+            self.stats["keys_written"] += len(writes)
+            conflicts = []
+            for (name, value, data, _), version in zip(writes, versions):
+                if version is None:
+                    conflicts.append((name, value))
+                else:
+                    self._remember(name, version, data)
+            self.stats["conflicts"] += len(conflicts)
+            if not conflicts or attempt == MAX_WRITE_ATTEMPTS - 1:
+                break
+
+            # Запись изменил другой экземпляр: сливаем изменения с его версией
+            records = await self.backend.read([name for name, _ in conflicts])
+            self.stats["reads"] += 1
+            self.stats["keys_read"] += len(conflicts)
+            writes = []
+            for name, value in conflicts:
+                version, theirs = records.get(name, (0, None))
+                merged = self._merge(name, value, theirs)
+                data = None if merged is None else pickle.dumps(merged, protocol=pickle.HIGHEST_PROTOCOL)
+                self._remember(name, version, theirs)
+                self.stats["merged"] += 1
+                if data != theirs:
+                    writes.append((name, merged, data, version))
+
+        failed = [name for name, _ in conflicts]
+        for name in failed:
+            self.stats["lost"] += 1
+            self._known.pop(name, None)
+            self._base.pop(name, None)
+            logger.error(f"❗ Состояние {name} не сохранено: конфликт версий после {MAX_WRITE_ATTEMPTS} попыток")
+        return failed
+
+    def log_report(self) -> None:
+        """Пишет в лог счетчики чтений, записей и конфликтов."""
+        stats = self.stats
+        logger.info(
+            f"📊 Состояние ({self.backend.name}): обновлений {stats['updates']}, чтений {stats['reads']} "
+            f"({stats['keys_read']} ключей), записей {stats['writes']} ({stats['keys_written']} ключей, "
+            f"без изменений {stats['unchanged']}), конфликтов версий {stats['conflicts']} "
+            f"(слито {stats['merged']}, не сохранено {stats['lost']})"
+        )
+
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        self._pending[f"conv:{name}:{json.dumps(key)}"] = new_state
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._pending[f"user:{user_id}"] = data or None
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._pending[f"chat:{chat_id}"] = data or None
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending[f"user:{user_id}"] = None
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._pending[f"chat:{chat_id}"] = None
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        # Записи обновления уже прочитаны в load_update одним запросом
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        await self.commit()
+        self.log_report()
+        await self.backend.close()
+
+
+class StateApplication(Application):
+    """
+    Application, которое синхронизирует StatePersistence на каждом обновлении.
+
+    Подключается через ApplicationBuilder.application_class. Для общего
+    бэкенда записи обновления читаются перед обработчиками и пишутся сразу
+    после них, для локального - раз в update_interval.
+    """
+
+    __slots__ = ()
+
+    async def process_update(self, update: object) -> None:
+        persistence = self.persistence
+        if not isinstance(persistence, StatePersistence) or not isinstance(update, Update):
+            await super().process_update(update)
+            return
+        await persistence.load_update(self, update)
+        await super().process_update(update)
+        if persistence.backend.shared:
+            await self.update_persistence()
+
+    async def update_persistence(self) -> None:
+        await super().update_persistence()
+        if isinstance(self.persistence, StatePersistence):
+            await self.persistence.commit()
+
+
+def get_persistence() -> StatePersistence:
+    """
+    Создает persistence по настройкам окружения.
+
+    Returns:
+        StatePersistence: Persistence с бэкендом STATE_BACKEND
+
+    Raises:
+        ValueError: Если STATE_BACKEND содержит неизвестное значение
+        RuntimeError: Если для выбранного бэкенда не установлен пакет
+    """
+    backend_name = os.getenv("STATE_BACKEND", "memory").lower()
+    if backend_name == "memory":
+        backend = MemoryBackend()
+    elif backend_name == "redis":
+        backend = RedisBackend(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            prefix=os.getenv("STATE_KEY_PREFIX", "momotmr:")
+        )
+    else:
+        raise ValueError(f"Неизвестный STATE_BACKEND: {backend_name}")
+    logger.info(f"Хранилище состояния: {backend.name}")
+    return StatePersistence(backend, update_interval=float(os.getenv("STATE_UPDATE_INTERVAL", "60")))
@@ -0,0 +1,208 @@
+"""
+Долговременная статистика квиза и таблицы лидеров.
+
+Счетчики хранятся в SQLite и обновляются на каждом ответе (UPSERT с
+приращением), история ответов не хранится и не пересчитывается:
+- scores: user_id, topic (ключ темы или ALL_TOPICS для всех тем), name,
+  correct, total, reached (когда набран текущий счет) - по одной строке на
+  пару (пользователь, тема)
+
+Для каждой темы в памяти держится top-K (куча из LEADERBOARD_SIZE записей),
+которая обновляется вместе со счетчиками. Места определяются числом
+правильных ответов, при равенстве выше тот, кто набрал счет раньше. Такой
+ключ у пользователя только растет, поэтому пользователь вне top-K попадает
+в него, лишь обогнав минимальный элемент кучи - проверка за O(1), замена за
+O(log K). При старте кучи заполняются запросом по индексу, без полного скана.
+
+Если ответы записывают несколько процессов (BOT_WORKERS > 1), кучи
+перечитываются из базы не чаще раза в LEADERBOARD_REFRESH секунд.
+
+Путь к базе задается переменной окружения QUIZ_STATS_DB_PATH, размер
+таблицы лидеров - LEADERBOARD_SIZE.
+"""
+
+import heapq
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+ALL_TOPICS = ""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    user_id INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    correct INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    reached REAL NOT NULL,
+    PRIMARY KEY (user_id, topic)
+);
+CREATE INDEX IF NOT EXISTS scores_topic_rank ON scores (topic, correct DESC, reached);
+"""
+
+# Список тем прыжками по индексу (O(тем * log n)) вместо полного скана DISTINCT
+TOPICS_QUERY = """
+WITH RECURSIVE topics(topic) AS (
+    SELECT MIN(topic) FROM scores
+    UNION ALL
+    SELECT (SELECT MIN(topic) FROM scores WHERE topic > topics.topic) FROM topics WHERE topics.topic IS NOT NULL
+)
+SELECT topic FROM topics WHERE topic IS NOT NULL
+"""
+
+
+class _TopK:
+    # Min-куча лучших результатов темы: (correct, -reached, user_id) и (name, total) участников
+    __slots__ = ("size", "heap", "entries", "details")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.heap = []
+        self.entries = {}
+        self.details = {}
+
+    def update(self, user_id: int, name: str, correct: int, total: int, reached: float) -> None:
+        entry = (correct, -reached, user_id)
+        if user_id in self.entries:
+            if entry != self.entries[user_id]:
+                self.heap[self.heap.index(self.entries[user_id])] = entry
+                heapq.heapify(self.heap)
+        elif len(self.heap) < self.size:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            evicted = heapq.heapreplace(self.heap, entry)
+            del self.entries[evicted[2]]
+            del self.details[evicted[2]]
+        else:
+            return
+        self.entries[user_id] = entry
+        self.details[user_id] = (name, total)
+
+    def ranked(self) -> list:
+        return sorted(self.heap, reverse=True)
+
+
+class QuizStats:
+    """Счетчики ответов квиза по пользователям и темам с таблицами лидеров."""
+
+    def __init__(self, path: str, leaderboard_size: int = 10, refresh_interval: float = 0):
+        self.path = path
+        self.leaderboard_size = leaderboard_size
+        self.refresh_interval = refresh_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._load_top()
+
+    def _load_top(self) -> None:
+        self._top = {}
+        self._loaded = time.monotonic()
+        topics = [row[0] for row in self._db.execute(TOPICS_QUERY)]
+        for topic in topics:
+            top = self._top_for(topic)
+            for user_id, name, correct, total, reached in self._db.execute(
+                "SELECT user_id, name, correct, total, reached FROM scores WHERE topic = ? "
+                "ORDER BY correct DESC, reached LIMIT ?", (topic, self.leaderboard_size)
+            ):
+                top.update(user_id, name, correct, total, reached)
+
+    def _top_for(self, topic: str) -> _TopK:
+        top = self._top.get(topic)
+        if top is None:
+            top = self._top[topic] = _TopK(self.leaderboard_size)
+        return top
+
+    def record_answer(self, user_id: int, name: str, topic: str, is_correct: bool) -> tuple:
+        """
+        Учитывает ответ пользователя в теме и в общем зачете.
+
+        Args:
+            user_id (int): ID пользователя
+            name (str): Отображаемое имя пользователя
+            topic (str): Ключ темы квиза
+            is_correct (bool): Правильный ли ответ
+
+        Returns:
+            tuple: (correct, total) пользователя в теме после ответа
+        """
+        now = time.time()
+        counters = {}
+        with self._db:
+            for key in (topic, ALL_TOPICS):
+                self._db.execute(
+                    "INSERT INTO scores (user_id, topic, name, correct, total, reached) VALUES (?, ?, ?, ?, 1, ?) "
+                    "ON CONFLICT (user_id, topic) DO UPDATE SET name = excluded.name, "
+                    "correct = correct + excluded.correct, total = total + 1, "
+                    "reached = CASE WHEN excluded.correct THEN excluded.reached ELSE reached END",
+                    (user_id, key, name, int(is_correct), now)
+                )
+                counters[key] = self._db.execute(
+                    "SELECT correct, total, reached FROM scores WHERE user_id = ? AND topic = ?", (user_id, key)
+                ).fetchone()
+        for key, (correct, total, reached) in counters.items():
+            self._top_for(key).update(user_id, name, correct, total, reached)
+        return counters[topic][:2]
+
+    def user_stats(self, user_id: int, topic: str = ALL_TOPICS) -> tuple:
+        """
+        Возвращает счетчики пользователя.
+
+        Args:
+            user_id (int): ID пользователя
+            topic (str): Ключ темы или ALL_TOPICS
+
+        Returns:
+            tuple: (correct, total), (0, 0) если ответов еще не было
+        """
+        row = self._db.execute(
+            "SELECT correct, total FROM scores WHERE user_id = ? AND topic = ?", (user_id, topic)
+        ).fetchone()
+        return row or (0, 0)
+
+    def leaderboard(self, topic: str = ALL_TOPICS) -> list:
+        """
+        Возвращает таблицу лидеров темы из кучи в памяти.
+
+        Args:
+            topic (str): Ключ темы или ALL_TOPICS
+
+        Returns:
+            list: [(name, correct, total), ...] по убыванию числа правильных ответов
+        """
+        if self.refresh_interval and time.monotonic() - self._loaded > self.refresh_interval:
+            self._load_top()
+        top = self._top.get(topic)
+        if top is None:
+            return []
+        ranked = []
+        for correct, _, user_id in top.ranked():
+            name, total = top.details[user_id]
+            ranked.append((name, correct, total))
+        return ranked
+
+
+_stats = None
+
+
+def get_quiz_stats() -> QuizStats:
+    """
+    Возвращает общую для процесса статистику квиза.
+
+    Returns:
+        QuizStats: Статистика по пути QUIZ_STATS_DB_PATH (по умолчанию data/quiz_stats.db)
+    """
+    global _stats
+    if _stats is None:
+        _stats = QuizStats(
+            os.getenv("QUIZ_STATS_DB_PATH", "data/quiz_stats.db"),
+            leaderboard_size=int(os.getenv("LEADERBOARD_SIZE", "10")),
+            refresh_interval=float(os.getenv("LEADERBOARD_REFRESH", "0"))
+        )
+        logger.info(f"Статистика квиза: {_stats.path}, тем в таблицах лидеров {len(_stats._top)}")
+    return _stats
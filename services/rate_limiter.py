@@ -0,0 +1,313 @@
+"""
+Планировщик исходящих запросов к Bot API с учетом лимитов Telegram.
+
+Подключается к telegram.ext через ApplicationBuilder.rate_limiter, поэтому
+все вызовы обработчиков (reply_text, edit_message_text, delete_message,
+reply_photo и т.д.) проходят через него без изменений в коде обработчиков:
+- общий token bucket на бота (TG_GLOBAL_RATE запросов в секунду)
+- token bucket на каждый чат: личные чаты TG_CHAT_RATE в секунду с запасом
+  TG_CHAT_BURST, группы TG_GROUP_RATE в минуту
+- при нехватке токенов запросы ждут в очереди по приоритету: ответы
+  пользователю раньше косметических удалений и индикаторов набора
+- методы с PRIORITY_LOW в ENDPOINT_PRIORITIES (удаления, индикатор набора)
+  расходуют отдельную корзину чата (TG_CHAT_LOW_RATE в секунду с запасом
+  TG_CHAT_LOW_BURST) и не занимают лимит сообщений чата; индикатор набора
+  при пустой корзине не отправляется вовсе - к моменту появления токена он
+  уже не нужен
+- RetryAfter (flood wait) приостанавливает корзину чата (или общую) на
+  указанное Telegram время, после чего запрос повторяется, не больше
+  TG_MAX_RETRIES раз
+
+Приоритет определяется по методу Bot API (ENDPOINT_PRIORITIES), его можно
+задать явно аргументом rate_limit_args вызова (PRIORITY_HIGH, PRIORITY_LOW).
+
+Метрики (глубина очереди, время ожидания, flood wait) доступны через
+snapshot() и пишутся в лог при остановке бота.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Методы, которые пользователь не ждет: уступают место ответам
+ENDPOINT_PRIORITIES = {
+    "deleteMessage": PRIORITY_LOW,
+    "deleteMessages": PRIORITY_LOW,
+    "sendChatAction": PRIORITY_LOW,
+    "editMessageReplyMarkup": PRIORITY_NORMAL,
+}
+
+# Методы PRIORITY_LOW, которые пропускаются, если их корзина пуста: (результат вместо вызова)
+DROPPABLE_ENDPOINTS = {"sendChatAction": True}
+
+# Методы, которые не расходуют лимиты отправки
+UNLIMITED_ENDPOINTS = frozenset({"getUpdates", "getMe", "getFile", "answerCallbackQuery", "setMyCommands"})
+
+# Корзины чатов без ожидающих запросов удаляются, когда их больше этого числа
+MAX_IDLE_BUCKETS = 10000
+
+
+class TokenBucket:
+    """
+    Token bucket с очередью ожидающих по приоритету.
+
+    Пока токены есть и очередь пуста, acquire не ждет. Иначе запрос встает
+    в кучу (priority, порядок поступления), и по мере пополнения токены
+    выдаются сначала запросам с меньшим значением priority.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._order = itertools.count()
+        self._timer = None
+
+    @property
+    def depth(self) -> int:
+        """int: Число запросов, ожидающих токен."""
+        return len(self._waiters)
+
+    @property
+    def idle(self) -> bool:
+        """bool: Корзина полна и никто не ждет - ее можно удалить."""
+        self._refill()
+        return not self._waiters and self.tokens >= self.capacity
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> float:
+        """
+        Забирает один токен, дожидаясь его при необходимости.
+
+        Args:
+            priority (int): Приоритет запроса (меньше - раньше)
+
+        Returns:
+            float: Время ожидания в секундах
+        """
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self._schedule()
+        await future
+        return time.monotonic() - started
+
+    def try_acquire(self) -> bool:
+        """
+        Забирает токен без ожидания.
+
+        Returns:
+            bool: True, если токен был свободен и очередь пуста
+        """
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def pause(self, seconds: float) -> None:
+        """
+        Останавливает выдачу токенов на заданное время (RetryAfter).
+
+        Args:
+            seconds (float): Длительность паузы
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is None and self._waiters:
+            delay = max(0.0, (1 - self.tokens) / self.rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+        self._schedule()
+
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """
+    Ограничитель запросов Bot API: общий и по чатам, с приоритетами и повтором RetryAfter.
+
+    rate_limit_args вызова Bot API задает приоритет запроса (int).
+    """
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_rate_per_minute: float = 20, max_retries: int = 3,
+                 low_rate: float = 1, low_burst: float = 3):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_minute / 60
+        self.low_rate = low_rate
+        self.low_burst = low_burst
+        self.max_retries = max_retries
+        self._global = None
+        self._chats = {}
+        self._low_chats = {}
+        self._waiting = 0
+        self.stats = {
+            "requests": 0,
+            "delayed": 0,
+            "wait_seconds": 0.0,
+            "max_depth": 0,
+            "flood_waits": 0,
+            "flood_wait_seconds": 0.0,
+            "failed": 0,
+            "dropped": 0,
+        }
+
+    async def initialize(self) -> None:
+        self._global = TokenBucket(self.global_rate, self.global_rate)
+        logger.info(
+            f"Ограничитель Bot API: {self.global_rate}/с всего, {self.chat_rate}/с на личный чат, "
+            f"{self.group_rate * 60:.0f}/мин на группу, {self.low_rate}/с на чат для удалений и индикаторов"
+        )
+
+    async def shutdown(self) -> None:
+        self.log_report()
+
+    def _chat_bucket(self, chat_id, low: bool = False) -> TokenBucket:
+        buckets = self._low_chats if low else self._chats
+        bucket = buckets.get(chat_id)
+        if bucket is None:
+            if len(buckets) >= MAX_IDLE_BUCKETS:
+                for key in [key for key, value in buckets.items() if value.idle]:
+                    del buckets[key]
+            if low:
+                bucket = TokenBucket(self.low_rate, self.low_burst)
+            # Отрицательный ID (или @username) - группа или канал
+            elif isinstance(chat_id, str) or chat_id < 0:
+                bucket = TokenBucket(self.group_rate, 1)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            buckets[chat_id] = bucket
+        return bucket
+
+    @property
+    def queue_depth(self) -> int:
+        """int: Число запросов, ожидающих токен во всех корзинах."""
+        return self._waiting
+
+    def snapshot(self) -> dict:
+        """
+        Возвращает текущие метрики ограничителя.
+
+        Returns:
+            dict: Счетчики stats, текущая глубина очереди и число корзин чатов
+        """
+        return {**self.stats, "queue_depth": self.queue_depth, "chats": len(self._chats)}
+
+    def log_report(self) -> None:
+        """Пишет в лог метрики очереди и flood wait."""
+        stats = self.snapshot()
+        logger.info(
+            f"📊 Bot API: запросов {stats['requests']}, ожидали очереди {stats['delayed']} "
+            f"({stats['wait_seconds']:.1f} с), макс. глубина очереди {stats['max_depth']}, "
+            f"flood wait {stats['flood_waits']} ({stats['flood_wait_seconds']:.1f} с), "
+            f"отказов после повторов {stats['failed']}, пропущено индикаторов {stats['dropped']}"
+        )
+
+    async def _acquire(self, bucket: TokenBucket, priority: int) -> None:
+        self._waiting += 1
+        depth = self._waiting
+        try:
+            waited = await bucket.acquire(priority)
+        finally:
+            self._waiting -= 1
+        if waited:
+            self.stats["delayed"] += 1
+            self.stats["wait_seconds"] += waited
+            self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await callback(*args, **kwargs)
+
+        priority = rate_limit_args if rate_limit_args is not None else ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_HIGH)
+        chat_id = data.get("chat_id")
+        if isinstance(chat_id, str) and chat_id.lstrip("-").isdigit():
+            chat_id = int(chat_id)
+        # Удаления и индикаторы набора не расходуют лимит сообщений чата, даже с явным приоритетом
+        low = ENDPOINT_PRIORITIES.get(endpoint) == PRIORITY_LOW
+        chat_bucket = self._chat_bucket(chat_id, low) if chat_id is not None else None
+
+        self.stats["requests"] += 1
+        # Токен корзины чата для пропускаемого метода забирается сразу, без очереди
+        acquired = False
+        if endpoint in DROPPABLE_ENDPOINTS and chat_bucket is not None:
+            if not chat_bucket.try_acquire():
+                self.stats["dropped"] += 1
+                return DROPPABLE_ENDPOINTS[endpoint]
+            acquired = True
+        for attempt in range(self.max_retries + 1):
+            if chat_bucket is not None and not acquired:
+                await self._acquire(chat_bucket, priority)
+            acquired = False
+            await self._acquire(self._global, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                self.stats["flood_waits"] += 1
+                self.stats["flood_wait_seconds"] += retry_after
+                if attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    logger.error(f"❗ {endpoint}: flood wait {retry_after} с, повторы исчерпаны")
+                    raise
+                logger.warning(f"❗ {endpoint}: flood wait {retry_after} с (чат {chat_id}), повтор {attempt + 1}")
+                (chat_bucket or self._global).pause(retry_after + 0.1)
+
+
+def get_rate_limiter():
+    """
+    Создает ограничитель запросов Bot API по настройкам окружения.
+
+    Returns:
+        PriorityRateLimiter: Ограничитель или None, если RATE_LIMITER=0
+    """
+    if os.getenv("RATE_LIMITER", "1").lower() in ("0", "false", "no"):
+        return None
+    return PriorityRateLimiter(
+        global_rate=float(os.getenv("TG_GLOBAL_RATE", "30")),
+        chat_rate=float(os.getenv("TG_CHAT_RATE", "1")),
+        chat_burst=float(os.getenv("TG_CHAT_BURST", "3")),
+        group_rate_per_minute=float(os.getenv("TG_GROUP_RATE", "20")),
+        max_retries=int(os.getenv("TG_MAX_RETRIES", "3")),
+        low_rate=float(os.getenv("TG_CHAT_LOW_RATE", "1")),
+        low_burst=float(os.getenv("TG_CHAT_LOW_BURST", "3")),
+    )
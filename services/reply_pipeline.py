@@ -0,0 +1,155 @@
+"""
+Конвейер ответов для текстовых обработчиков.
+
+Объединяет типичную последовательность вызовов Bot API за один ход диалога:
+- индикатор набора и сообщение-заглушка отправляются параллельно
+- заглушка редактируется в итоговый ответ вместо удаления и повторной отправки
+- удаление служебных сообщений выполняется одним вызовом deleteMessages
+  параллельно с редактированием
+
+Было (ChatGPT): delete_message, send_chat_action, reply_text, delete_message x2,
+reply_text - 6 последовательных вызовов. Стало: 4 вызова за 2 параллельных шага.
+Для каждого хода в лог пишется число вызовов Bot API и время ответа.
+"""
+
+import asyncio
+import logging
+import time
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_TEXT = "🤔 Обрабатываю ваш запрос... ⏳"
+
+
+async def delete_messages(bot, chat_id, message_ids) -> int:
+    """
+    Удаляет несколько сообщений одним вызовом Bot API.
+
+    Для одного сообщения используется deleteMessage, для нескольких - deleteMessages.
+    Ошибки удаления не прерывают обработку и только логируются.
+
+    Args:
+        bot: Экземпляр telegram.Bot
+        chat_id (int): ID чата
+        message_ids (list): ID сообщений (пустые значения пропускаются)
+
+    Returns:
+        int: Количество выполненных вызовов Bot API
+    """
+    message_ids = [message_id for message_id in message_ids if message_id]
+    if not message_ids:
+        return 0
+
+    try:
+        if len(message_ids) == 1:
+            await bot.delete_message(chat_id=chat_id, message_id=message_ids[0])
+        else:
+            await bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+    except Exception as e:
+        logger.warning(f"❗ Не удалось удалить сообщения {message_ids}: {e}")
+    return 1
+
+
+class ReplyTurn:
+    """
+    Один ход диалога: заглушка "Обрабатываю...", ответ модели и очистка чата.
+
+    Использование:
+        turn = ReplyTurn(update, context, "gpt")
+        await turn.start()
+        turn.delete_later(update.message.message_id)
+        await turn.finish(text, parse_mode='HTML', reply_markup=markup)
+    """
+
+    def __init__(self, update: Update, context: ContextTypes.DEFAULT_TYPE, feature: str):
+        self.update = update
+        self.context = context
+        self.feature = feature
+        self.chat_id = update.effective_chat.id
+        self.placeholder = None
+        self.api_calls = 0
+        self._pending_deletes = []
+        self._started = time.perf_counter()
+
+    def delete_later(self, *message_ids) -> None:
+        """
+        Отмечает сообщения для удаления при завершении хода.
+
+        Args:
+            *message_ids (int): ID сообщений
+        """
+        self._pending_deletes.extend(message_ids)
+
+    async def start(self, text: str = PROCESSING_TEXT):
+        """
+        Параллельно отправляет индикатор набора и сообщение-заглушку.
+
+        Args:
+            text (str): Текст заглушки
+
+        Returns:
+            Message: Отправленная заглушка
+        """
+        action, placeholder = await asyncio.gather(
+            self.context.bot.send_chat_action(chat_id=self.chat_id, action="typing"),
+            self.update.message.reply_text(text),
+            return_exceptions=True
+        )
+        self.api_calls += 2
+        if isinstance(action, Exception):
+            logger.warning(f"❗ Не удалось отправить индикатор набора: {action}")
+        if isinstance(placeholder, Exception):
+            raise placeholder
+        self.placeholder = placeholder
+        return placeholder
+
+    async def finish(self, text: str, parse_mode=None, reply_markup=None):
+        """
+        Превращает заглушку в итоговый ответ и удаляет отмеченные сообщения.
+
+        Редактирование и удаление выполняются параллельно.
+
+        Args:
+            text (str): Текст ответа
+            parse_mode (str, optional): Режим разметки
+            reply_markup (InlineKeyboardMarkup, optional): Клавиатура ответа
+
+        Returns:
+            Message: Сообщение с итоговым ответом
+        """
+        if self.placeholder is None:
+            send = self.update.message.reply_text(text, parse_mode=parse_mode, reply_markup=reply_markup)
+        else:
+            send = self.placeholder.edit_text(text, parse_mode=parse_mode, reply_markup=reply_markup)
+
+        message, delete_calls = await asyncio.gather(
+            send,
+            delete_messages(self.context.bot, self.chat_id, self._pending_deletes)
+        )
+        self._pending_deletes = []
+        self.api_calls += 1 + delete_calls
+        self._log_stats()
+        return message
+
+    async def fail(self, text: str):
+        """
+        Сообщает пользователю об ошибке, по возможности через заглушку.
+
+        Args:
+            text (str): Текст сообщения об ошибке
+        """
+        try:
+            if self.placeholder is not None:
+                await self.placeholder.edit_text(text)
+            else:
+                await self.update.message.reply_text(text)
+            self.api_calls += 1
+        finally:
+            self._log_stats()
+
+    def _log_stats(self) -> None:
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        logger.info(f"📊 {self.feature}: вызовов Bot API за ход: {self.api_calls}, время ответа: {elapsed_ms:.0f} мс")
@@ -0,0 +1,158 @@
+"""
+Компактное множество просмотренных номеров контента.
+
+Устроено как roaring bitmap: номер делится на старшие и младшие 16 бит,
+для каждого старшего ключа хранится контейнер младших:
+- массив (array('H'), отсортирован) - пока в нем не больше ARRAY_LIMIT
+  номеров, 2 байта на номер
+- битовая карта (bytearray на 65536 бит, 8 КБ) - для плотных диапазонов
+
+Проверка и добавление выполняются за O(1) (бинарный поиск по массиву не
+длиннее ARRAY_LIMIT). Память растет с числом просмотренных номеров, а не с
+размером каталога: при каталоге в 1M элементов и 1000 просмотренных
+пользователь занимает около 2 КБ, в худшем случае не больше 16 карт по 8 КБ.
+"""
+
+import struct
+from array import array
+from bisect import bisect_left
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+BITMAP_BYTES = (1 << CHUNK_BITS) // 8
+# С 4096 номеров массив (2 байта на номер) становится больше битовой карты
+ARRAY_LIMIT = BITMAP_BYTES // 2
+
+FORMAT_VERSION = 1
+# Заголовок контейнера при сериализации: старший ключ, тип, число номеров
+CONTAINER_HEADER = struct.Struct("<HBI")
+TYPE_ARRAY = 0
+TYPE_BITMAP = 1
+
+
+class SeenSet:
+    """Множество неотрицательных целых (номеров seq) в формате roaring bitmap."""
+
+    __slots__ = ("_containers", "_count")
+
+    def __init__(self):
+        self._containers = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> CHUNK_BITS)
+        if container is None:
+            return False
+        low = value & CHUNK_MASK
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] >> (low & 7) & 1)
+        position = bisect_left(container, low)
+        return position < len(container) and container[position] == low
+
+    def add(self, value: int) -> bool:
+        """
+        Добавляет номер в множество.
+
+        Args:
+            value (int): Номер элемента (неотрицательный)
+
+        Returns:
+            bool: True, если номера раньше не было
+        """
+        key = value >> CHUNK_BITS
+        low = value & CHUNK_MASK
+        container = self._containers.get(key)
+        if container is None:
+            container = self._containers[key] = array("H")
+
+        if isinstance(container, bytearray):
+            byte, bit = low >> 3, 1 << (low & 7)
+            if container[byte] & bit:
+                return False
+            container[byte] |= bit
+        else:
+            position = bisect_left(container, low)
+            if position < len(container) and container[position] == low:
+                return False
+            container.insert(position, low)
+            if len(container) > ARRAY_LIMIT:
+                self._containers[key] = self._to_bitmap(container)
+        self._count += 1
+        return True
+
+    @staticmethod
+    def _to_bitmap(container: array) -> bytearray:
+        bitmap = bytearray(BITMAP_BYTES)
+        for low in container:
+            bitmap[low >> 3] |= 1 << (low & 7)
+        return bitmap
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Объем данных контейнеров в байтах (без накладных расходов Python).
+
+        Returns:
+            int: Размер в байтах
+        """
+        return sum(
+            len(container) if isinstance(container, bytearray) else len(container) * container.itemsize
+            for container in self._containers.values()
+        )
+
+    def to_bytes(self) -> bytes:
+        """
+        Сериализует множество для хранения в базе.
+
+        Returns:
+            bytes: Версия формата и контейнеры по возрастанию старшего ключа
+        """
+        parts = [bytes([FORMAT_VERSION])]
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            if isinstance(container, bytearray):
+                count = int.from_bytes(container, "little").bit_count()
+                payload = bytes(container)
+                parts.append(CONTAINER_HEADER.pack(key, TYPE_BITMAP, count))
+            else:
+                payload = container.tobytes()
+                parts.append(CONTAINER_HEADER.pack(key, TYPE_ARRAY, len(container)))
+            parts.append(payload)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeenSet":
+        """
+        Восстанавливает множество из результата to_bytes.
+
+        Args:
+            data (bytes): Сериализованное множество
+
+        Returns:
+            SeenSet: Множество
+
+        Raises:
+            ValueError: Если формат данных не поддерживается
+        """
+        seen = cls()
+        if not data:
+            return seen
+        if data[0] != FORMAT_VERSION:
+            raise ValueError(f"Неизвестная версия формата SeenSet: {data[0]}")
+        offset = 1
+        while offset < len(data):
+            key, kind, count = CONTAINER_HEADER.unpack_from(data, offset)
+            offset += CONTAINER_HEADER.size
+            if kind == TYPE_BITMAP:
+                seen._containers[key] = bytearray(data[offset:offset + BITMAP_BYTES])
+                offset += BITMAP_BYTES
+            else:
+                container = array("H")
+                container.frombytes(data[offset:offset + count * container.itemsize])
+                seen._containers[key] = container
+                offset += count * container.itemsize
+            seen._count += count
+        return seen
@@ -0,0 +1,359 @@
+"""
+Семантический кэш ответов ChatGPT.
+
+Похожие по смыслу вопросы получают сохраненный ответ без обращения к OpenAI:
+- вопрос переводится в вектор встраиванием (embedding), векторы нормированы
+- для каждого системного промпта (функция или личность) ведется отдельный
+  индекс в массивах numpy, ближайший ответ ищется по косинусной близости
+- ответ используется, если близость не ниже порога и у вопросов совпадают
+  смысловые метки (meaning_markers): отрицания, числа и имена. Встраивание
+  почти не различает "я люблю кошек" и "я не люблю кошек" (близость 0.97 при
+  пороге 0.92), поэтому такие попадания отклоняются; остальные слова могут
+  различаться как угодно, решает близость
+- записи живут не дольше TTL, при превышении размера вытесняются самые
+  давно использованные
+
+Какие перефразировки совпадут, зависит от встраивания. Локальное hashing
+сравнивает буквосочетания и ловит только близкие формулировки ("какая
+столица Франции?" и "какая столица у Франции"); модели sentence-transformers
+и openai сводят и перефразировки с другими словами ("как приготовить пасту
+карбонара?" и "как готовить карбонару").
+
+Кэш применяется только к первому ходу диалога, когда ответ не зависит от
+истории. Включается переменной окружения SEMANTIC_CACHE=1, настройки:
+- SEMANTIC_CACHE_THRESHOLD: порог косинусной близости (по умолчанию 0.92)
+- SEMANTIC_CACHE_TTL: время жизни записи в секундах (по умолчанию 86400)
+- SEMANTIC_CACHE_SIZE: максимум записей на один системный промпт (по умолчанию 500)
+- SEMANTIC_CACHE_EMBEDDER: hashing (локально, без модели) |
+  sentence-transformers (локальная модель SEMANTIC_CACHE_MODEL) | openai
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Слова, меняющие смысл вопроса на противоположный; "n't" приводится к "not"
+NEGATIONS = frozenset({"не", "ни", "нет", "без", "no", "not", "never", "without"})
+
+# Имена сравниваются по первым буквам, чтобы падеж не мешал ("Пушкин" и "Пушкине")
+NAME_PREFIX_LENGTH = 5
+
+# Конец предложения: следующее слово с заглавной буквы не считается именем
+SENTENCE_END = re.compile(r"[.!?:;]\s*$")
+
+
+def meaning_markers(text: str) -> tuple:
+    """
+    Возвращает смысловые метки вопроса: отрицания, числа и имена.
+
+    Именем считается слово с заглавной буквы не в начале предложения.
+    Остальные слова в метки не попадают: их различие оценивает встраивание.
+
+    Args:
+        text (str): Текст вопроса
+
+    Returns:
+        tuple: (отрицания и числа, имена, начала всех слов); имена и начала
+            слов обрезаны до NAME_PREFIX_LENGTH букв
+    """
+    text = re.sub(r"n't\b", " not", text.replace("ё", "е").replace("Ё", "Е"))
+    markers, names, prefixes = set(), set(), set()
+    for match in WORD_PATTERN.finditer(text):
+        word = match.group()
+        lowered = word.lower()
+        prefixes.add(lowered[:NAME_PREFIX_LENGTH])
+        if lowered in NEGATIONS:
+            markers.add(lowered)
+        elif word.isdigit():
+            markers.add(word.lstrip("0") or "0")
+        elif word[0].isupper():
+            before = text[:match.start()]
+            if before.strip() and not SENTENCE_END.search(before):
+                names.add(lowered[:NAME_PREFIX_LENGTH])
+    return frozenset(markers), frozenset(names), frozenset(prefixes)
+
+
+def same_meaning(first: tuple, second: tuple) -> bool:
+    """
+    Сравнивает смысловые метки двух вопросов.
+
+    Отрицания и числа должны совпасть, а каждое имя одного вопроса - найтись
+    среди слов другого, в любом регистре ("Пушкин" и "пушкин" совпадают).
+
+    Args:
+        first (tuple): Метки первого вопроса (meaning_markers)
+        second (tuple): Метки второго вопроса
+
+    Returns:
+        bool: True, если вопросы не различаются отрицаниями, числами и именами
+    """
+    return first[0] == second[0] and first[1] <= second[2] and second[1] <= first[2]
+
+
+class HashingEmbedder:
+    """
+    Локальное встраивание без модели: хэширование символьных n-грамм слов.
+
+    Устойчиво к окончаниям и опечаткам, работает офлайн и не требует
+    загрузки весов, поэтому используется по умолчанию.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions: int = 1024, ngram: int = 3):
+        self.dimensions = dimensions
+        self.ngram = ngram
+
+    def _features(self, text: str):
+        for word in WORD_PATTERN.findall(text.lower()):
+            padded = f"<{word}>"
+            for start in range(max(1, len(padded) - self.ngram + 1)):
+                yield padded[start:start + self.ngram]
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Строит нормированный вектор текста.
+
+        Args:
+            text (str): Текст вопроса
+
+        Returns:
+            np.ndarray: Вектор float32 единичной длины
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest, "little")
+            vector[index % self.dimensions] += 1.0 if index >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """Локальная модель sentence-transformers, загружается один раз на процесс."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+
+    def _encode(self, text: str) -> np.ndarray:
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+            logger.info(f"Модель встраивания загружена: {self.model_name}")
+        return self._model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    async def embed(self, text: str) -> np.ndarray:
+        return await asyncio.to_thread(self._encode, text)
+
+
+class OpenAIEmbedder:
+    """Встраивание через OpenAI Embeddings API."""
+
+    name = "openai"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    async def embed(self, text: str) -> np.ndarray:
+        from services.openai_client import get_client
+
+        response = await get_client().embeddings.create(model=self.model_name, input=text)
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+class _Index:
+    # Индекс одного системного промпта: векторы в массиве, ответы и времена рядом
+    __slots__ = ("vectors", "answers", "markers", "created", "used", "latency", "misses")
+
+    def __init__(self, dimensions: int):
+        self.vectors = np.empty((0, dimensions), dtype=np.float32)
+        self.answers = []
+        self.markers = []
+        self.created = np.empty(0)
+        self.used = np.empty(0)
+        self.latency = 0.0
+        self.misses = 0
+
+    def keep(self, mask: np.ndarray) -> None:
+        self.vectors = self.vectors[mask]
+        self.answers = [answer for answer, kept in zip(self.answers, mask) if kept]
+        self.markers = [markers for markers, kept in zip(self.markers, mask) if kept]
+        self.created = self.created[mask]
+        self.used = self.used[mask]
+
+
+class SemanticCache:
+    """
+    Кэш ответов с поиском ближайшего вопроса по косинусной близости.
+
+    Использование:
+        vector = await cache.embed(question)
+        answer = cache.lookup(system_prompt, question, vector)
+        if answer is None:
+            answer = ...  # запрос к OpenAI
+            cache.store(system_prompt, question, vector, answer, latency)
+    """
+
+    def __init__(self, embedder, threshold: float = 0.92, ttl: float = 86400, max_entries: int = 500):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._indexes = {}
+        self.lookups = 0
+        self.hits = 0
+        self.rejected = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _namespace(system_prompt: str) -> str:
+        return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Строит вектор вопроса выбранным встраиванием.
+
+        Args:
+            text (str): Текст вопроса
+
+        Returns:
+            np.ndarray: Нормированный вектор
+        """
+        return await self.embedder.embed(text)
+
+    def lookup(self, system_prompt: str, question: str, vector: np.ndarray):
+        """
+        Ищет сохраненный ответ на близкий вопрос.
+
+        Из записей с близостью не ниже порога берется самая близкая, у
+        которой совпадают смысловые метки (same_meaning).
+
+        Args:
+            system_prompt (str): Системный промпт, к которому относится вопрос
+            question (str): Текст вопроса
+            vector (np.ndarray): Вектор вопроса
+
+        Returns:
+            str: Сохраненный ответ или None, если близкого вопроса нет
+        """
+        self.lookups += 1
+        index = self._indexes.get(self._namespace(system_prompt))
+        if index is None or not index.answers:
+            return None
+
+        now = time.monotonic()
+        alive = now - index.created < self.ttl
+        if not alive.all():
+            index.keep(alive)
+            if not index.answers:
+                return None
+
+        similarities = index.vectors @ vector
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        if not len(candidates):
+            return None
+        markers = meaning_markers(question)
+        matched = [int(i) for i in candidates[np.argsort(-similarities[candidates])] if same_meaning(index.markers[i], markers)]
+        if not matched:
+            self.rejected += 1
+            logger.info(f"Семантический кэш: близость {similarities[candidates].max():.3f}, "
+                        f"но отрицания, числа или имена в вопросах различаются")
+            return None
+
+        best = matched[0]
+        index.used[best] = now
+        self.hits += 1
+        if index.misses:
+            self.saved_seconds += index.latency / index.misses
+        logger.info(f"Семантический кэш: попадание, близость {similarities[best]:.3f}")
+        return index.answers[best]
+
+    def store(self, system_prompt: str, question: str, vector: np.ndarray, answer: str, latency: float) -> None:
+        """
+        Сохраняет ответ модели на вопрос.
+
+        Args:
+            system_prompt (str): Системный промпт, к которому относится вопрос
+            question (str): Текст вопроса
+            vector (np.ndarray): Вектор вопроса
+            answer (str): Ответ модели
+            latency (float): Время получения ответа от модели в секундах
+        """
+        index = self._indexes.get(self._namespace(system_prompt))
+        if index is None:
+            index = self._indexes[self._namespace(system_prompt)] = _Index(len(vector))
+
+        if len(index.answers) >= self.max_entries:
+            # Вытесняются самые давно использованные записи
+            evicted = np.argsort(index.used)[:len(index.answers) - self.max_entries + 1]
+            mask = np.ones(len(index.answers), dtype=bool)
+            mask[evicted] = False
+            index.keep(mask)
+
+        now = time.monotonic()
+        index.vectors = np.vstack([index.vectors, vector[np.newaxis, :]])
+        index.answers.append(answer)
+        index.markers.append(meaning_markers(question))
+        index.created = np.append(index.created, now)
+        index.used = np.append(index.used, now)
+        index.latency += latency
+        index.misses += 1
+
+    def log_report(self) -> None:
+        """Пишет в лог долю попаданий и сэкономленное время."""
+        hit_rate = self.hits / self.lookups if self.lookups else 0.0
+        entries = sum(len(index.answers) for index in self._indexes.values())
+        logger.info(
+            f"📊 Семантический кэш ({self.embedder.name}): запросов {self.lookups}, попаданий {self.hits} "
+            f"({hit_rate:.0%}), отклонено по смыслу {self.rejected}, сэкономлено {self.saved_seconds:.1f} с, записей {entries}"
+        )
+
+
+_cache = None
+
+
+def get_semantic_cache():
+    """
+    Возвращает семантический кэш, если он включен в окружении.
+
+    Returns:
+        SemanticCache: Общий для процесса кэш или None, если SEMANTIC_CACHE не включен
+
+    Raises:
+        ValueError: Если SEMANTIC_CACHE_EMBEDDER содержит неизвестное значение
+    """
+    global _cache
+    if _cache is None and os.getenv("SEMANTIC_CACHE", "0").lower() in ("1", "true", "yes"):
+        embedder_name = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing").lower()
+        if embedder_name == "hashing":
+            embedder = HashingEmbedder()
+        elif embedder_name == "sentence-transformers":
+            embedder = SentenceTransformerEmbedder(
+                os.getenv("SEMANTIC_CACHE_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+            )
+        elif embedder_name == "openai":
+            embedder = OpenAIEmbedder(os.getenv("SEMANTIC_CACHE_MODEL", "text-embedding-3-small"))
+        else:
+            raise ValueError(f"Неизвестный SEMANTIC_CACHE_EMBEDDER: {embedder_name}")
+        _cache = SemanticCache(
+            embedder,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "86400")),
+            max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "500")),
+        )
+        logger.info(f"Семантический кэш включен: встраивание {embedder.name}, порог {_cache.threshold}")
+    return _cache
@@ -0,0 +1,281 @@
+"""
+Многопроцессный режим: обновления распределяются по воркерам по chat_id.
+
+Один процесс Python использует одно ядро, а голосовой конвейер и
+обработка обновлений конкурируют за него. При BOT_WORKERS > 1 бот
+запускается так:
+- фронтальный процесс получает обновления long polling (getUpdates) и
+  по хэшу chat_id (для обновлений без чата - ID пользователя) выбирает
+  воркер, которому передает обновление через multiprocessing.Queue
+- каждый воркер - обычное Application со всеми обработчиками bot.py, но
+  без Updater: обновления берутся из очереди и обрабатываются по порядку
+
+Все обновления одного чата попадают в один воркер, поэтому порядок
+сообщений в чате, состояние conversation handler-ов и user_data/chat_data
+остаются в одном процессе. Ответы на опросы (PollAnswer) приходят без
+чата, поэтому воркер, отправивший опрос квиза, сообщает фронту его ID
+(register_poll), и ответы передаются этому воркеру: в группе он не совпадает
+с воркером ответившего пользователя. Опросы, о которых фронт не знает
+(например, после его перезапуска), распределяются по ID пользователя - в
+личных чатах это тот же воркер.
+
+Общие для бота лимиты делятся между воркерами: каждый получает
+TG_GLOBAL_RATE / BOT_WORKERS запросов в секунду. Таблицы лидеров квиза
+в воркерах перечитываются из базы раз в LEADERBOARD_REFRESH секунд
+(если не задан или 0 - раз в SHARDED_LEADERBOARD_REFRESH секунд), так как
+ответы приходят в разные процессы.
+
+Проверки состояния (services.health) фронт обслуживает на HEALTH_PORT,
+воркер N - на HEALTH_PORT + 1 + N.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import zlib
+
+from telegram import Update
+from telegram.error import NetworkError, TimedOut
+from telegram.ext import ApplicationBuilder
+
+from services import health, lifecycle, telegram_http
+
+logger = logging.getLogger(__name__)
+
+# Максимум обновлений в очереди одного воркера, дальше фронт ждет
+WORKER_QUEUE_SIZE = 1000
+
+# Таймаут long polling getUpdates в секундах
+POLL_TIMEOUT = 10
+
+# Период перечитывания таблиц лидеров в воркерах, если LEADERBOARD_REFRESH не задан или 0
+SHARDED_LEADERBOARD_REFRESH = 5
+
+# Сколько опросов помнит фронт для передачи ответов, дальше вытесняются самые старые
+MAX_POLL_ROUTES = 10000
+
+# Очередь к фронту и номер воркера для register_poll (задаются в процессе воркера)
+_poll_routes = None
+_worker_index = None
+
+
+def shard_for(update: Update, workers: int) -> int:
+    """
+    Выбирает воркер для обновления.
+
+    Args:
+        update (Update): Обновление Telegram
+        workers (int): Число воркеров
+
+    Returns:
+        int: Номер воркера от 0 до workers - 1
+    """
+    if update.effective_chat:
+        key = update.effective_chat.id
+    elif update.effective_user:
+        key = update.effective_user.id
+    else:
+        key = update.update_id
+    return zlib.crc32(str(key).encode()) % workers
+
+
+def register_poll(poll_id: str) -> None:
+    """
+    Просит фронт передавать ответы на опрос этому воркеру.
+
+    Вне многопроцессного режима ничего не делает.
+
+    Args:
+        poll_id (str): ID отправленного опроса
+    """
+    if _poll_routes is not None:
+        _poll_routes.put((poll_id, _worker_index))
+
+
+def _configure_worker(index: int, workers: int) -> None:
+    # Настройки окружения воркера: доля общего лимита, период таблиц лидеров, свой порт проверок
+    os.environ["TG_GLOBAL_RATE"] = str(float(os.getenv("TG_GLOBAL_RATE", "30")) / workers)
+    # 0 из .env значит "не перечитывать", но воркер без перечитывания видит только свои ответы
+    if float(os.getenv("LEADERBOARD_REFRESH") or 0) <= 0:
+        os.environ["LEADERBOARD_REFRESH"] = str(SHARDED_LEADERBOARD_REFRESH)
+    health_port = health.get_health_port()
+    if health_port is not None:
+        os.environ["HEALTH_PORT"] = str(health_port + 1 + index)
+
+
+def _worker_main(index: int, workers: int, updates, ready, poll_routes) -> None:
+    global _poll_routes, _worker_index
+    # Остановкой управляет фронт: по Ctrl+C он отправляет воркерам сигнал завершения
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _configure_worker(index, workers)
+    _poll_routes, _worker_index = poll_routes, index
+
+    import bot
+
+    asyncio.run(_run_worker(bot.build_application(updater=False), index, updates, ready))
+
+
+async def _run_worker(application, index: int, updates, ready) -> None:
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    logger.info(f"Воркер {index} запущен (PID {os.getpid()})")
+    ready.put(index)
+    try:
+        while True:
+            data = await asyncio.to_thread(updates.get)
+            if data is None:
+                break
+            await application.update_queue.put(Update.de_json(data, application.bot))
+    finally:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info(f"Воркер {index} остановлен")
+
+
+class ShardedPoller:
+    """
+    Фронтальный процесс: long polling и раздача обновлений воркерам.
+
+    Упавший воркер перезапускается с той же очередью; обновления, которые
+    он не успел обработать, теряются вместе с его состоянием в памяти.
+    """
+
+    def __init__(self, token: str, workers: int):
+        self.token = token
+        self.workers = workers
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue(WORKER_QUEUE_SIZE) for _ in range(workers)]
+        self._ready = self._context.Queue()
+        self._poll_routes = self._context.SimpleQueue()
+        self._poll_owners = {}
+        self._processes = [None] * workers
+        self.dispatched = [0] * workers
+        self.health = None
+        self.stopping = False
+
+    def _start_worker(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.workers, self._queues[index], self._ready, self._poll_routes),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _check_workers(self) -> None:
+        for index, process in enumerate(self._processes):
+            if not process.is_alive():
+                logger.error(f"❗ Воркер {index} завершился с кодом {process.exitcode}, перезапуск")
+                self._start_worker(index)
+
+    async def _start_health(self, port: int) -> None:
+        def backlog() -> dict:
+            return {"workers_alive": sum(process.is_alive() for process in self._processes)}
+
+        async def workers() -> tuple:
+            alive = backlog()["workers_alive"]
+            return alive == self.workers, f"живых воркеров {alive}/{self.workers}"
+
+        def running() -> tuple:
+            return (False, "остановка") if self.stopping else (True, "запущен")
+
+        self.health = health.create_monitor(port, backlog, {"workers": workers}, running)
+        await self.health.start()
+
+    def _shard(self, update: Update) -> int:
+        if update.poll_answer:
+            # SimpleQueue пишет в канал сразу при put, поэтому опрос известен, как только воркер его отправил
+            while not self._poll_routes.empty():
+                poll_id, owner = self._poll_routes.get()
+                if len(self._poll_owners) >= MAX_POLL_ROUTES:
+                    del self._poll_owners[next(iter(self._poll_owners))]
+                self._poll_owners[poll_id] = owner
+            owner = self._poll_owners.get(update.poll_answer.poll_id)
+            if owner is not None:
+                return owner
+        return shard_for(update, self.workers)
+
+    async def _dispatch(self, update: Update) -> None:
+        index = self._shard(update)
+        data = update.to_dict()
+        try:
+            self._queues[index].put_nowait(data)
+        except queue.Full:
+            await asyncio.to_thread(self._queues[index].put, data)
+        self.dispatched[index] += 1
+
+    async def _poll(self, bot) -> None:
+        offset = None
+        try:
+            while True:
+                try:
+                    updates = await bot.get_updates(
+                        offset=offset, timeout=POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES
+                    )
+                except TimedOut:
+                    continue
+                except NetworkError as e:
+                    logger.warning(f"❗ Ошибка getUpdates: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                for update in updates:
+                    offset = update.update_id + 1
+                    await self._dispatch(update)
+                self._check_workers()
+        finally:
+            if offset is not None:
+                # Подтверждаем уже разданные обновления, чтобы не получить их повторно
+                await bot.get_updates(offset=offset, timeout=0)
+
+    async def run(self) -> None:
+        """Запускает воркеры и раздает им обновления до Ctrl+C или SIGTERM."""
+        for index in range(self.workers):
+            self._start_worker(index)
+        for _ in range(self.workers):
+            await asyncio.to_thread(self._ready.get)
+        logger.info(f"Запущено воркеров: {self.workers}")
+        health_port = health.get_health_port()
+        if health_port is not None:
+            await self._start_health(health_port)
+
+        builder = telegram_http.apply_http_settings(ApplicationBuilder().token(self.token).updater(None))
+        bot = builder.build().bot
+        poll_task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, poll_task.cancel)
+
+        try:
+            async with bot:
+                await self._poll(bot)
+        except asyncio.CancelledError:
+            logger.info("Остановка по сигналу")
+        finally:
+            self.stopping = True
+            for updates in self._queues:
+                updates.put(None)
+            # Воркеры завершают принятые обновления не дольше SHUTDOWN_TIMEOUT
+            for process in self._processes:
+                await asyncio.to_thread(process.join, lifecycle.get_shutdown_timeout() + 10)
+            if self.health is not None:
+                await self.health.stop()
+            logger.info(f"📊 Шардирование: обновлений по воркерам {self.dispatched}")
+
+
+def run(workers: int) -> None:
+    """
+    Запускает бота в многопроцессном режиме.
+
+    Args:
+        workers (int): Число воркеров (BOT_WORKERS)
+    """
+    asyncio.run(ShardedPoller(os.getenv("TELEGRAM_TOKEN"), workers).run())
@@ -0,0 +1,361 @@
+"""
+Бенчмарк распознавания речи на наборе клипов.
+
+Набор клипов - каталог с аудиофайлами и manifest.tsv, в котором каждая
+строка содержит имя файла и эталонный текст через табуляцию. Подойдут
+записи реальных голосовых сообщений; воспроизводимый набор собирается
+командой clips. Команды:
+
+clips - синтезирует фразы BENCH_PHRASES через espeak-ng, добавляет тишину
+до и после речи и кодирует ffmpeg в OGG/Opus 48 кГц, как голосовые
+сообщения Telegram, затем пишет manifest.tsv.
+
+    python -m services.speech_bench clips --out bench/clips
+
+stt - прогоняет каждый клип по пути бота (decode_to_pcm,
+vad.split_utterances, transcribe_utterances) для каждого бэкенда и
+печатает WER по набору, перцентили задержки от начала декодирования до
+текста и отношение задержки к длительности аудио (RTF). Для vosk нужна
+модель (VOSK_MODEL_PATH), для google - доступ к сети; недоступные
+бэкенды пропускаются.
+
+    python -m services.speech_bench stt --clips bench/clips --backend vosk google
+
+vad - для каждого клипа печатает длительность аудио, длительность фраз,
+которые services.vad оставляет для распознавания, и число фраз; в итоге -
+сколько секунд аудио не отправляется в STT. --noise-db подмешивает белый
+шум заданного уровня (dBFS), чтобы проверить набор с фоном записи.
+
+    python -m services.speech_bench vad --clips bench/clips --noise-db -45
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from services import vad
+from services.stt import (
+    GoogleSpeechBackend, SpeechNotRecognized, SpeechServiceError, VoskSpeechBackend,
+    decode_to_pcm, transcribe_utterances,
+)
+
+MANIFEST = "manifest.tsv"
+
+# Фразы воспроизводимого набора: запросы, которые бот получает голосом
+BENCH_PHRASES = [
+    "привет как дела",
+    "расскажи интересный факт о космосе",
+    "какая сегодня погода в москве",
+    "переведи на английский я люблю читать книги",
+    "сколько будет двадцать пять умножить на четыре",
+    "посоветуй фильм на вечер",
+    "объясни что такое машинное обучение простыми словами",
+    "напиши короткое стихотворение про осень",
+    "какие книги написал лев толстой",
+    "почему небо голубое",
+    "придумай название для кофейни",
+    "спасибо до свидания",
+]
+
+# Тишина до и после речи в секундах: пользователь начинает и заканчивает запись с паузой
+LEAD_SILENCE = 0.8
+TRAIL_SILENCE = 1.2
+
+
+def make_backend(name: str):
+    """
+    Создает бэкенд распознавания с настройками из окружения, как get_speech_backend.
+
+    Args:
+        name (str): google | vosk
+
+    Returns:
+        SpeechBackend: Новый экземпляр бэкенда
+
+    Raises:
+        ValueError: Если имя бэкенда неизвестно
+    """
+    if name == "google":
+        return GoogleSpeechBackend(os.getenv("STT_LANGUAGE", "ru-RU"))
+    if name == "vosk":
+        return VoskSpeechBackend(os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-ru"))
+    raise ValueError(f"Неизвестный бэкенд: {name}")
+
+
+def normalize_words(text: str) -> list:
+    """
+    Приводит текст к словам для сравнения: нижний регистр, ё как е, без пунктуации.
+
+    Args:
+        text (str): Текст
+
+    Returns:
+        list: Слова
+    """
+    return re.findall(r"\w+", text.lower().replace("ё", "е"))
+
+
+def word_errors(reference: list, hypothesis: list) -> int:
+    """
+    Считает число ошибок распознавания (замены, вставки и пропуски слов).
+
+    Args:
+        reference (list): Слова эталона
+        hypothesis (list): Распознанные слова
+
+    Returns:
+        int: Расстояние Левенштейна по словам
+    """
+    previous = list(range(len(hypothesis) + 1))
+    for index, ref_word in enumerate(reference, 1):
+        current = [index]
+        for hyp_index, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[hyp_index] + 1,
+                current[hyp_index - 1] + 1,
+                previous[hyp_index - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def read_manifest(clips_dir: str) -> list:
+    """
+    Читает manifest.tsv набора клипов.
+
+    Args:
+        clips_dir (str): Каталог набора
+
+    Returns:
+        list: [(путь к файлу, эталонный текст), ...]
+
+    Raises:
+        FileNotFoundError: Если manifest.tsv в каталоге нет
+    """
+    clips = []
+    with open(os.path.join(clips_dir, MANIFEST), encoding="utf-8") as manifest:
+        for line in manifest:
+            if line.strip() and not line.startswith("#"):
+                name, reference = line.rstrip("\n").split("\t", 1)
+                clips.append((os.path.join(clips_dir, name), reference))
+    return clips
+
+
+def make_clips(out_dir: str, voice: str = "ru", speed: int = 150) -> list:
+    """
+    Синтезирует воспроизводимый набор клипов через espeak-ng и ffmpeg.
+
+    Args:
+        out_dir (str): Каталог набора (создается при необходимости)
+        voice (str): Голос espeak-ng
+        speed (int): Скорость речи, слов в минуту
+
+    Returns:
+        list: [(путь к файлу, эталонный текст), ...]
+
+    Raises:
+        subprocess.CalledProcessError: Если espeak-ng или ffmpeg завершились с ошибкой
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    clips = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for index, phrase in enumerate(BENCH_PHRASES):
+            wav_path = os.path.join(tmp_dir, f"{index}.wav")
+            ogg_path = os.path.join(out_dir, f"clip_{index:02d}.ogg")
+            subprocess.run(["espeak-ng", "-v", voice, "-s", str(speed), "-w", wav_path, phrase], check=True)
+            subprocess.run([
+                "ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", wav_path,
+                "-af", f"adelay={int(LEAD_SILENCE * 1000)},apad=pad_dur={TRAIL_SILENCE}",
+                "-ac", "1", "-ar", "48000", "-c:a", "libopus", "-b:a", "32k", ogg_path,
+            ], check=True)
+            clips.append((ogg_path, phrase))
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as manifest:
+        manifest.write("# файл\tэталонный текст\n")
+        for path, reference in clips:
+            manifest.write(f"{os.path.basename(path)}\t{reference}\n")
+    return clips
+
+
+async def run_clip(backend, path: str) -> tuple:
+    """
+    Распознает один клип так же, как services.voice_recognition.recognize_voice.
+
+    Args:
+        backend (SpeechBackend): Бэкенд распознавания
+        path (str): Путь к аудиофайлу
+
+    Returns:
+        tuple: (распознанный текст, задержка в секундах, длительность аудио в секундах)
+
+    Raises:
+        AudioDecodeError: Если клип не удалось декодировать
+        SpeechServiceError: Если сервис распознавания недоступен
+    """
+    started = time.perf_counter()
+    pcm = b"".join([chunk async for chunk in decode_to_pcm(path)])
+    utterances = await asyncio.to_thread(vad.split_utterances, pcm)
+    try:
+        text = await transcribe_utterances(backend, utterances) if utterances else ""
+    except SpeechNotRecognized:
+        text = ""
+    return text, time.perf_counter() - started, vad.pcm_duration(pcm)
+
+
+def _percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+async def run_stt(clips: list, backend_names: list, verbose: bool = False) -> dict:
+    """
+    Измеряет WER и задержку бэкендов на наборе клипов.
+
+    Args:
+        clips (list): [(путь к файлу, эталонный текст), ...]
+        backend_names (list): Имена бэкендов
+        verbose (bool): Печатать результат каждого клипа
+
+    Returns:
+        dict: {бэкенд: {"wer", "p50", "p95", "rtf", "errors"}}; недоступные
+            бэкенды в результат не попадают
+    """
+    results = {}
+    for name in backend_names:
+        backend = make_backend(name)
+        if not backend.available():
+            print(f"{name}: недоступен (нет библиотеки или модели), пропущен")
+            continue
+        await asyncio.to_thread(backend.warm_up)
+
+        edits = words = errors = 0
+        latencies, audio = [], []
+        for path, reference in clips:
+            try:
+                text, latency, duration = await run_clip(backend, path)
+            except SpeechServiceError as e:
+                errors += 1
+                print(f"{name}: {os.path.basename(path)}: ошибка сервиса: {e}")
+                continue
+            reference_words = normalize_words(reference)
+            edits += word_errors(reference_words, normalize_words(text))
+            words += len(reference_words)
+            latencies.append(latency)
+            audio.append(duration)
+            if verbose:
+                print(f"{name}: {os.path.basename(path)}: {latency * 1000:.0f} мс: {text!r}")
+        if not latencies:
+            print(f"{name}: ни один клип не распознан")
+            continue
+        results[name] = {
+            "wer": edits / max(words, 1),
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "rtf": sum(latencies) / max(sum(audio), 1e-9),
+            "errors": errors,
+        }
+    return results
+
+
+def add_noise(pcm: bytes, noise_db: float, seed: int = 0) -> bytes:
+    """
+    Подмешивает к PCM белый шум, воспроизводимый для одного seed.
+
+    Args:
+        pcm (bytes): PCM 16 кГц, моно, 16 бит
+        noise_db (float): Уровень шума (RMS) в dBFS
+        seed (int): Начальное значение генератора шума
+
+    Returns:
+        bytes: PCM с шумом
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    noise = np.random.default_rng(seed).normal(0.0, 32768.0 * 10 ** (noise_db / 20), len(samples))
+    return np.clip(samples + noise, -32768, 32767).astype(np.int16).tobytes()
+
+
+async def run_vad(clips: list, noise_db: float = None, verbose: bool = False) -> dict:
+    """
+    Считает, сколько аудио VAD не отправляет в распознавание.
+
+    Args:
+        clips (list): [(путь к файлу, эталонный текст), ...]
+        noise_db (float): Уровень подмешиваемого шума в dBFS или None
+        verbose (bool): Печатать результат каждого клипа
+
+    Returns:
+        dict: {"audio", "speech"} - секунды аудио и оставленных фраз,
+            {"utterances", "empty"} - число фраз и клипов без речи
+
+    Raises:
+        AudioDecodeError: Если клип не удалось декодировать
+    """
+    totals = {"audio": 0.0, "speech": 0.0, "utterances": 0, "empty": 0}
+    for index, (path, _) in enumerate(clips):
+        pcm = b"".join([chunk async for chunk in decode_to_pcm(path)])
+        if noise_db is not None:
+            pcm = add_noise(pcm, noise_db, seed=index)
+        utterances = vad.split_utterances(pcm)
+        audio = vad.pcm_duration(pcm)
+        speech = sum(vad.pcm_duration(utterance) for utterance in utterances)
+        totals["audio"] += audio
+        totals["speech"] += speech
+        totals["utterances"] += len(utterances)
+        totals["empty"] += not utterances
+        if verbose:
+            print(f"{os.path.basename(path)}: аудио {audio:.2f} с, речь {speech:.2f} с, фраз {len(utterances)}")
+    return totals
+
+
+def main(argv=None) -> int:
+    """Точка входа CLI."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    clips_parser = commands.add_parser("clips", help="синтезировать воспроизводимый набор клипов")
+    clips_parser.add_argument("--out", required=True, help="каталог набора")
+    clips_parser.add_argument("--voice", default="ru", help="голос espeak-ng")
+    clips_parser.add_argument("--speed", type=int, default=150, help="скорость речи, слов в минуту")
+
+    stt_parser = commands.add_parser("stt", help="WER и задержка бэкендов распознавания")
+    stt_parser.add_argument("--clips", required=True, help="каталог набора с manifest.tsv")
+    stt_parser.add_argument("--backend", nargs="+", default=["vosk", "google"], choices=["vosk", "google"])
+    stt_parser.add_argument("--verbose", action="store_true", help="печатать результат каждого клипа")
+
+    vad_parser = commands.add_parser("vad", help="секунды аудио, которые VAD не отправляет в STT")
+    vad_parser.add_argument("--clips", required=True, help="каталог набора с manifest.tsv")
+    vad_parser.add_argument("--noise-db", type=float, default=None, help="подмешать белый шум, dBFS")
+    vad_parser.add_argument("--verbose", action="store_true", help="печатать результат каждого клипа")
+
+    args = parser.parse_args(argv)
+    if args.command == "clips":
+        clips = make_clips(args.out, args.voice, args.speed)
+        print(f"{len(clips)} клипов и {MANIFEST} записаны в {args.out}")
+        return 0
+
+    clips = read_manifest(args.clips)
+    if args.command == "vad":
+        totals = asyncio.run(run_vad(clips, args.noise_db, args.verbose))
+        saved = totals["audio"] - totals["speech"]
+        print(f"{len(clips)} клипов, аудио {totals['audio']:.1f} с, фраз {totals['utterances']}, "
+              f"без речи {totals['empty']}")
+        print(f"в STT {totals['speech']:.1f} с, сэкономлено {saved:.1f} с "
+              f"({saved / max(totals['audio'], 1e-9):.0%})")
+        return 0
+
+    results = asyncio.run(run_stt(clips, args.backend, args.verbose))
+    print(f"{len(clips)} клипов")
+    print(f"{'бэкенд':<8}{'WER':>8}{'p50, мс':>10}{'p95, мс':>10}{'RTF':>7}{'ошибок':>8}")
+    for name, result in results.items():
+        print(f"{name:<8}{result['wer']:>8.1%}{result['p50'] * 1000:>10.0f}{result['p95'] * 1000:>10.0f}"
+              f"{result['rtf']:>7.2f}{result['errors']:>8}")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
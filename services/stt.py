@@ -0,0 +1,269 @@
+"""
+Бэкенды распознавания речи (Speech-to-Text).
+
+Модуль предоставляет общий интерфейс распознавания и реализации:
+- google - speech_recognition + Google Web Speech API (сетевой, по умолчанию)
+- vosk - локальный офлайн движок Vosk на CPU, распознает поток по частям
+  без сборки всего аудио в один буфер
+
+Голосовое сообщение декодируется ffmpeg в поток PCM (16 кГц, моно, 16 бит),
+который передается бэкенду по частям. Фразы, выделенные services.vad,
+распознаются параллельно. Бэкенд выбирается для развертывания
+переменными окружения:
+- STT_BACKEND: google | vosk
+- STT_LANGUAGE: язык для Google (по умолчанию ru-RU)
+- VOSK_MODEL_PATH: путь к распакованной модели Vosk
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+# 0.25 секунды PCM на одну часть потока
+CHUNK_SIZE = SAMPLE_RATE * SAMPLE_WIDTH // 4
+
+
+class AudioDecodeError(Exception):
+    """Не удалось декодировать аудиофайл."""
+
+
+class SpeechNotRecognized(Exception):
+    """Речь в аудио не распознана."""
+
+
+class SpeechServiceError(Exception):
+    """Сервис распознавания недоступен или вернул ошибку."""
+
+
+async def decode_to_pcm(file_path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Декодирует аудиофайл в поток PCM с помощью ffmpeg.
+
+    Части отдаются по мере декодирования, поэтому распознавание может
+    начинаться до того, как весь файл будет обработан.
+
+    Args:
+        file_path (str): Путь к аудиофайлу (OGG/Opus из Telegram)
+        chunk_size (int): Размер части в байтах
+
+    Yields:
+        bytes: PCM 16 кГц, моно, 16 бит
+
+    Raises:
+        AudioDecodeError: Если ffmpeg не найден или завершился с ошибкой
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path,
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError as e:
+        raise AudioDecodeError("ffmpeg не найден") from e
+    try:
+        while True:
+            chunk = await process.stdout.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            raise AudioDecodeError(stderr.decode(errors="replace").strip())
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def iter_pcm(pcm: bytes, chunk_size: int = CHUNK_SIZE):
+    """
+    Отдает готовый буфер PCM частями в формате потока decode_to_pcm.
+
+    Args:
+        pcm (bytes): PCM 16 кГц, моно, 16 бит
+        chunk_size (int): Размер части в байтах
+
+    Yields:
+        bytes: Части буфера
+    """
+    for offset in range(0, len(pcm), chunk_size):
+        yield pcm[offset:offset + chunk_size]
+
+
+class SpeechBackend:
+    """
+    Базовый класс бэкенда распознавания речи.
+
+    Бэкенд создается один раз на процесс и переиспользуется для всех сообщений.
+    """
+
+    name = "base"
+
+    def warm_up(self) -> None:
+        """Загружает модели и библиотеки заранее. Вызывается в отдельном потоке."""
+
+    def available(self) -> bool:
+        """
+        Проверяет, может ли бэкенд распознавать речь.
+
+        Returns:
+            bool: True, если зависимости и модели доступны
+        """
+        return True
+
+    async def transcribe(self, chunks) -> str:
+        """
+        Распознает речь из потока PCM.
+
+        Args:
+            chunks: Асинхронный итератор частей PCM 16 кГц, моно, 16 бит
+
+        Returns:
+            str: Распознанный текст
+
+        Raises:
+            SpeechNotRecognized: Если речь не распознана
+            SpeechServiceError: Если сервис распознавания недоступен
+        """
+        raise NotImplementedError
+
+
+class GoogleSpeechBackend(SpeechBackend):
+    """Распознавание через Google Web Speech API (speech_recognition)."""
+
+    name = "google"
+
+    def __init__(self, language: str = "ru-RU"):
+        self.language = language
+
+    def warm_up(self) -> None:
+        import speech_recognition  # noqa: F401
+
+    def available(self) -> bool:
+        try:
+            import speech_recognition  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    async def transcribe(self, chunks) -> str:
+        import speech_recognition as sr
+
+        # Google принимает только аудио целиком, поэтому поток собирается в буфер
+        pcm = b"".join([chunk async for chunk in chunks])
+        audio_data = sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+        recognizer = sr.Recognizer()
+        try:
+            return await asyncio.to_thread(recognizer.recognize_google, audio_data, language=self.language)
+        except sr.UnknownValueError as e:
+            raise SpeechNotRecognized() from e
+        except sr.RequestError as e:
+            raise SpeechServiceError(str(e)) from e
+
+
+class VoskSpeechBackend(SpeechBackend):
+    """
+    Локальное офлайн распознавание через Vosk.
+
+    Модель загружается один раз на процесс. Каждая часть PCM передается
+    распознавателю сразу после декодирования, поэтому к концу декодирования
+    остается только получить финальный результат.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._model = None
+
+    def _load_model(self):
+        if self._model is None:
+            from vosk import Model, SetLogLevel
+
+            SetLogLevel(-1)
+            self._model = Model(self.model_path)
+            logger.info(f"Модель Vosk загружена: {self.model_path}")
+        return self._model
+
+    def warm_up(self) -> None:
+        self._load_model()
+
+    def available(self) -> bool:
+        try:
+            import vosk  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.isdir(self.model_path)
+
+    async def transcribe(self, chunks) -> str:
+        from vosk import KaldiRecognizer
+
+        model = self._model or await asyncio.to_thread(self._load_model)
+        recognizer = KaldiRecognizer(model, SAMPLE_RATE)
+        async for chunk in chunks:
+            await asyncio.to_thread(recognizer.AcceptWaveform, chunk)
+        text = json.loads(recognizer.FinalResult()).get("text", "").strip()
+        if not text:
+            raise SpeechNotRecognized()
+        return text
+
+
+async def transcribe_utterances(backend: SpeechBackend, utterances: list) -> str:
+    """
+    Распознает фразы одного сообщения параллельно и склеивает текст.
+
+    Args:
+        backend (SpeechBackend): Бэкенд распознавания
+        utterances (list): Фразы в виде буферов PCM в исходном порядке
+
+    Returns:
+        str: Текст распознанных фраз через пробел
+
+    Raises:
+        SpeechNotRecognized: Если не распознана ни одна фраза
+        SpeechServiceError: Если сервис распознавания недоступен
+    """
+    results = await asyncio.gather(
+        *(backend.transcribe(iter_pcm(utterance)) for utterance in utterances),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, SpeechNotRecognized):
+            raise result
+    texts = [result for result in results if isinstance(result, str) and result]
+    if not texts:
+        raise SpeechNotRecognized()
+    return " ".join(texts)
+
+
+_backend = None
+
+
+def get_speech_backend() -> SpeechBackend:
+    """
+    Возвращает бэкенд распознавания, выбранный в окружении.
+
+    Returns:
+        SpeechBackend: Общий для процесса экземпляр бэкенда
+
+    Raises:
+        ValueError: Если STT_BACKEND содержит неизвестное значение
+    """
+    global _backend
+    if _backend is None:
+        backend_name = os.getenv("STT_BACKEND", "google").lower()
+        if backend_name == "google":
+            _backend = GoogleSpeechBackend(os.getenv("STT_LANGUAGE", "ru-RU"))
+        elif backend_name == "vosk":
+            _backend = VoskSpeechBackend(os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-ru"))
+        else:
+            raise ValueError(f"Неизвестный STT_BACKEND: {backend_name}")
+        logger.info(f"Бэкенд распознавания речи: {_backend.name}")
+    return _backend
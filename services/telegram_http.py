@@ -0,0 +1,98 @@
+"""
+Настройки HTTP-клиента Telegram Bot API.
+
+python-telegram-bot держит два отдельных пула соединений httpx: один для
+long polling (getUpdates), другой для исходящих вызовов обработчиков, чтобы
+висящий getUpdates не занимал соединение, нужное для ответа пользователю.
+Модуль задает размеры и таймауты обоих пулов, версию HTTP и адрес Bot API
+из переменных окружения:
+- TG_CONNECTION_POOL_SIZE, TG_POOL_TIMEOUT - пул исходящих вызовов и время
+  ожидания свободного соединения
+- TG_CONNECT_TIMEOUT, TG_READ_TIMEOUT, TG_WRITE_TIMEOUT - таймауты запросов
+- TG_GET_UPDATES_POOL_SIZE, TG_GET_UPDATES_READ_TIMEOUT - пул long polling
+- TG_HTTP_VERSION - 1.1 или 2 (HTTP/2 мультиплексирует запросы в одном
+  соединении, нужен пакет h2: pip install "httpx[http2]")
+- TG_BASE_URL, TG_BASE_FILE_URL - свой Bot API сервер или заглушка для
+  нагрузочного теста (services.bot_api_loadtest)
+
+Влияние размера пула на хвост задержек измеряется командой
+python -m services.bot_api_loadtest pool.
+"""
+
+import importlib.util
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Значения по умолчанию; None - оставить значение python-telegram-bot
+HTTP_SETTINGS = {
+    "connection_pool_size": ("TG_CONNECTION_POOL_SIZE", int, 64),
+    "pool_timeout": ("TG_POOL_TIMEOUT", float, 5.0),
+    "connect_timeout": ("TG_CONNECT_TIMEOUT", float, 5.0),
+    "read_timeout": ("TG_READ_TIMEOUT", float, 10.0),
+    "write_timeout": ("TG_WRITE_TIMEOUT", float, 10.0),
+    "http_version": ("TG_HTTP_VERSION", str, "1.1"),
+    "get_updates_connection_pool_size": ("TG_GET_UPDATES_POOL_SIZE", int, 1),
+    "get_updates_read_timeout": ("TG_GET_UPDATES_READ_TIMEOUT", float, 30.0),
+    "get_updates_http_version": ("TG_HTTP_VERSION", str, "1.1"),
+    "base_url": ("TG_BASE_URL", str, None),
+    "base_file_url": ("TG_BASE_FILE_URL", str, None),
+}
+
+
+def http2_available() -> bool:
+    """
+    Проверяет, установлен ли пакет h2, нужный httpx для HTTP/2.
+
+    Returns:
+        bool: True, если HTTP/2 можно включить
+    """
+    return importlib.util.find_spec("h2") is not None
+
+
+def load_http_settings() -> dict:
+    """
+    Читает настройки HTTP-клиента из окружения.
+
+    Если запрошен HTTP/2, но пакет h2 не установлен, используется HTTP/1.1.
+
+    Returns:
+        dict: {имя метода ApplicationBuilder: значение}, без незаданных значений
+    """
+    settings = {}
+    for name, (variable, parse, default) in HTTP_SETTINGS.items():
+        raw = os.getenv(variable)
+        value = parse(raw) if raw else default
+        if value is not None:
+            settings[name] = value
+
+    for name in ("http_version", "get_updates_http_version"):
+        if settings[name] not in ("1.1", "2", "2.0"):
+            raise ValueError(f"TG_HTTP_VERSION должен быть 1.1 или 2, получено: {settings[name]}")
+        if settings[name] != "1.1" and not http2_available():
+            logger.warning("❗ HTTP/2 недоступен (не установлен h2), используется HTTP/1.1")
+            settings[name] = "1.1"
+    return settings
+
+
+def apply_http_settings(builder, settings: dict = None):
+    """
+    Применяет настройки HTTP-клиента к ApplicationBuilder.
+
+    Args:
+        builder (ApplicationBuilder): Строитель приложения telegram.ext
+        settings (dict, optional): Настройки; по умолчанию load_http_settings()
+
+    Returns:
+        ApplicationBuilder: Тот же строитель для цепочки вызовов
+    """
+    if settings is None:
+        settings = load_http_settings()
+    for name, value in settings.items():
+        builder = getattr(builder, name)(value)
+    logger.info(
+        f"HTTP Bot API: пул {settings['connection_pool_size']} (ожидание {settings['pool_timeout']} с), "
+        f"getUpdates {settings['get_updates_connection_pool_size']}, HTTP/{settings['http_version']}"
+    )
+    return builder
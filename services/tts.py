@@ -0,0 +1,288 @@
+"""
+Бэкенды синтеза речи (Text-to-Speech).
+
+Модуль предоставляет общий интерфейс синтеза и реализации:
+- gtts - Google Text-to-Speech (сетевой, по умолчанию)
+- piper - локальный офлайн движок Piper на CPU, модель голоса загружается
+  один раз на процесс
+
+Ответ синтезируется по предложениям: пока следующее предложение еще
+синтезируется, уже готовые части передаются в один процесс ffmpeg, который
+кодирует голосовое сообщение OGG/Opus. Для каждого ответа в лог пишутся
+время до первого аудио и коэффициент реального времени (RTF).
+
+Бэкенд выбирается для развертывания переменными окружения:
+- TTS_BACKEND: gtts | piper
+- TTS_LANGUAGE: язык для gTTS (по умолчанию ru)
+- PIPER_MODEL_PATH: путь к модели голоса Piper (.onnx)
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Граница предложения: знак конца предложения и пробел после него
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+# Битрейт MP3, который возвращает Google TTS, для оценки длительности аудио
+GTTS_BITRATE = 32000
+
+
+class SynthesisError(Exception):
+    """Не удалось синтезировать или закодировать голосовой ответ."""
+
+
+def split_sentences(text: str) -> list:
+    """
+    Разбивает текст на предложения для синтеза по частям.
+
+    Args:
+        text (str): Текст ответа
+
+    Returns:
+        list: Непустые предложения в исходном порядке
+    """
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+class TTSBackend:
+    """
+    Базовый класс бэкенда синтеза речи.
+
+    Бэкенд создается один раз на процесс и переиспользуется для всех ответов.
+    Все предложения одного ответа возвращаются в одном формате, описанном
+    input_args, поэтому их можно последовательно передавать одному ffmpeg.
+    """
+
+    name = "base"
+
+    def warm_up(self) -> None:
+        """Загружает модели и библиотеки заранее. Вызывается в отдельном потоке."""
+
+    def available(self) -> bool:
+        """
+        Проверяет, может ли бэкенд синтезировать речь.
+
+        Returns:
+            bool: True, если зависимости и модели доступны
+        """
+        return True
+
+    def input_args(self) -> list:
+        """
+        Возвращает аргументы ffmpeg, описывающие формат синтезированного аудио.
+
+        Returns:
+            list: Аргументы ffmpeg перед "-i -"
+        """
+        raise NotImplementedError
+
+    def synthesize(self, sentence: str) -> bytes:
+        """
+        Синтезирует одно предложение. Вызывается в отдельном потоке.
+
+        Args:
+            sentence (str): Предложение для озвучивания
+
+        Returns:
+            bytes: Аудио в формате input_args
+        """
+        raise NotImplementedError
+
+    def duration(self, audio: bytes) -> float:
+        """
+        Оценивает длительность синтезированного аудио.
+
+        Args:
+            audio (bytes): Результат synthesize
+
+        Returns:
+            float: Длительность в секундах
+        """
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """Синтез через Google Text-to-Speech (gTTS), каждое предложение - отдельный запрос."""
+
+    name = "gtts"
+
+    def __init__(self, language: str = "ru"):
+        self.language = language
+
+    def warm_up(self) -> None:
+        import gtts  # noqa: F401
+
+    def available(self) -> bool:
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def input_args(self) -> list:
+        # Кадры MP3 можно склеивать, поэтому ffmpeg читает их одним потоком
+        return ["-f", "mp3"]
+
+    def synthesize(self, sentence: str) -> bytes:
+        from io import BytesIO
+        from gtts import gTTS
+
+        buffer = BytesIO()
+        gTTS(text=sentence, lang=self.language).write_to_fp(buffer)
+        return buffer.getvalue()
+
+    def duration(self, audio: bytes) -> float:
+        return len(audio) * 8 / GTTS_BITRATE
+
+
+class PiperTTSBackend(TTSBackend):
+    """
+    Локальный офлайн синтез через Piper.
+
+    Модель голоса загружается один раз на процесс и возвращает PCM 16 бит
+    с частотой дискретизации из конфигурации голоса.
+    """
+
+    name = "piper"
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._voice = None
+
+    def _load_voice(self):
+        if self._voice is None:
+            from piper.voice import PiperVoice
+
+            self._voice = PiperVoice.load(self.model_path)
+            logger.info(f"Модель Piper загружена: {self.model_path}")
+        return self._voice
+
+    def warm_up(self) -> None:
+        self._load_voice()
+
+    def available(self) -> bool:
+        try:
+            import piper  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.isfile(self.model_path)
+
+    def input_args(self) -> list:
+        sample_rate = self._load_voice().config.sample_rate
+        return ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"]
+
+    def synthesize(self, sentence: str) -> bytes:
+        return b"".join(self._load_voice().synthesize_stream_raw(sentence))
+
+    def duration(self, audio: bytes) -> float:
+        return len(audio) / 2 / self._load_voice().config.sample_rate
+
+
+async def _render_sentences(backend: TTSBackend, sentences: list, queue: asyncio.Queue) -> None:
+    try:
+        for sentence in sentences:
+            started = time.perf_counter()
+            audio = await asyncio.to_thread(backend.synthesize, sentence)
+            await queue.put((audio, time.perf_counter() - started))
+    except Exception as e:
+        # Ошибка передается потребителю, чтобы он не ждал следующую часть вечно
+        await queue.put(e)
+        return
+    await queue.put(None)
+
+
+async def synthesize_voice(text: str, output_path: str) -> None:
+    """
+    Озвучивает текст и сохраняет голосовое сообщение OGG/Opus.
+
+    Предложения синтезируются по очереди в отдельном потоке, а готовые части
+    сразу передаются в ffmpeg, поэтому кодирование первого предложения идет
+    параллельно с синтезом следующих.
+
+    Args:
+        text (str): Текст ответа
+        output_path (str): Путь к итоговому файлу OGG
+
+    Raises:
+        SynthesisError: Если текст пуст, ffmpeg не найден или завершился с ошибкой
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        raise SynthesisError("пустой текст")
+
+    backend = get_tts_backend()
+    input_args = await asyncio.to_thread(backend.input_args)
+    started = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-nostdin", "-loglevel", "error", "-y", *input_args, "-i", "-",
+            "-ac", "1", "-c:a", "libopus", "-f", "ogg", output_path,
+            stdin=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError as e:
+        raise SynthesisError("ffmpeg не найден") from e
+
+    queue = asyncio.Queue()
+    renderer = asyncio.create_task(_render_sentences(backend, sentences, queue))
+    first_audio = None
+    synthesis_time = 0.0
+    audio_duration = 0.0
+    try:
+        while (item := await queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise SynthesisError(f"ошибка синтеза: {item}") from item
+            audio, elapsed = item
+            if first_audio is None:
+                first_audio = time.perf_counter() - started
+            synthesis_time += elapsed
+            audio_duration += backend.duration(audio)
+            process.stdin.write(audio)
+            await process.stdin.drain()
+        process.stdin.close()
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            raise SynthesisError(stderr.decode(errors="replace").strip())
+    except (BrokenPipeError, ConnectionResetError) as e:
+        raise SynthesisError(f"ffmpeg прервал кодирование: {e}") from e
+    finally:
+        renderer.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    rtf = synthesis_time / audio_duration if audio_duration else 0.0
+    logger.info(f"Голосовой ответ синтезирован ({backend.name}): {len(sentences)} предложений, "
+                f"первое аудио через {first_audio:.2f} с, всего {time.perf_counter() - started:.2f} с, "
+                f"RTF {rtf:.2f}")
+
+
+_backend = None
+
+
+def get_tts_backend() -> TTSBackend:
+    """
+    Возвращает бэкенд синтеза, выбранный в окружении.
+
+    Returns:
+        TTSBackend: Общий для процесса экземпляр бэкенда
+
+    Raises:
+        ValueError: Если TTS_BACKEND содержит неизвестное значение
+    """
+    global _backend
+    if _backend is None:
+        backend_name = os.getenv("TTS_BACKEND", "gtts").lower()
+        if backend_name == "gtts":
+            _backend = GTTSBackend(os.getenv("TTS_LANGUAGE", "ru"))
+        elif backend_name == "piper":
+            _backend = PiperTTSBackend(os.getenv("PIPER_MODEL_PATH", "models/ru_RU-irina-medium.onnx"))
+        else:
+            raise ValueError(f"Неизвестный TTS_BACKEND: {backend_name}")
+        logger.info(f"Бэкенд синтеза речи: {_backend.name}")
+    return _backend
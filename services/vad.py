@@ -0,0 +1,136 @@
+"""
+Детектор речевой активности (VAD) для голосовых сообщений.
+
+Энергетический детектор работает над буфером PCM (16 кГц, моно, 16 бит)
+целиком и векторизован через numpy:
+- буфер режется на кадры по FRAME_MS, для каждого кадра считается уровень в dBFS
+- порог речи вычисляется от уровня шума записи (нижний перцентиль кадров)
+- короткие паузы внутри фразы не разрывают ее, короткие всплески отбрасываются
+- тишина в начале и в конце обрезается, длинные сообщения делятся на фразы
+  по паузам, чтобы распознавать их параллельно
+
+Если речи не найдено, сообщение не отправляется в сервис распознавания.
+"""
+
+import numpy as np
+
+from services.stt import SAMPLE_RATE, SAMPLE_WIDTH
+
+FRAME_MS = 30
+FRAME_SIZE = SAMPLE_RATE * FRAME_MS // 1000
+
+# Абсолютный нижний порог речи и запас над уровнем шума записи
+MIN_SPEECH_DBFS = -45.0
+NOISE_MARGIN_DB = 12.0
+NOISE_PERCENTILE = 10
+
+# Пауза, которая не разрывает фразу, и минимальная длина фразы
+MAX_PAUSE_MS = 600
+MIN_SPEECH_MS = 200
+
+# Запас тишины вокруг фразы, чтобы не обрезать первые и последние звуки
+PADDING_MS = 150
+
+# Паузы, по которым длинное сообщение делится на фразы, и предел длины фразы
+SPLIT_PAUSE_MS = 900
+MAX_UTTERANCE_SECONDS = 15
+
+
+def pcm_duration(pcm: bytes) -> float:
+    """
+    Возвращает длительность буфера PCM.
+
+    Args:
+        pcm (bytes): PCM 16 кГц, моно, 16 бит
+
+    Returns:
+        float: Длительность в секундах
+    """
+    return len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+def frame_levels(samples: np.ndarray) -> np.ndarray:
+    """
+    Считает уровень каждого кадра в dBFS.
+
+    Args:
+        samples (np.ndarray): Отсчеты int16
+
+    Returns:
+        np.ndarray: Уровни кадров (неполный последний кадр отбрасывается)
+    """
+    frame_count = len(samples) // FRAME_SIZE
+    frames = samples[:frame_count * FRAME_SIZE].reshape(frame_count, FRAME_SIZE).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _runs(mask: np.ndarray) -> list:
+    # Границы непрерывных участков True: [(начало, конец), ...] в кадрах
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(pcm: bytes) -> list:
+    """
+    Находит участки речи в буфере PCM.
+
+    Args:
+        pcm (bytes): PCM 16 кГц, моно, 16 бит
+
+    Returns:
+        list: Участки речи [(начало, конец), ...] в кадрах, паузы короче
+            MAX_PAUSE_MS уже объединены, а фразы короче MIN_SPEECH_MS отброшены
+    """
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH], dtype=np.int16)
+    if len(samples) < FRAME_SIZE:
+        return []
+
+    levels = frame_levels(samples)
+    threshold = max(MIN_SPEECH_DBFS, np.percentile(levels, NOISE_PERCENTILE) + NOISE_MARGIN_DB)
+    speech = levels > threshold
+
+    # Короткие паузы внутри фразы считаются речью
+    max_pause = MAX_PAUSE_MS // FRAME_MS
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and end - start <= max_pause:
+            speech[start:end] = True
+
+    min_speech = MIN_SPEECH_MS // FRAME_MS
+    return [(int(start), int(end)) for start, end in _runs(speech) if end - start >= min_speech]
+
+
+def split_utterances(pcm: bytes) -> list:
+    """
+    Обрезает тишину и делит сообщение на фразы для распознавания.
+
+    Соседние участки речи склеиваются в одну фразу, пока пауза между ними
+    короче SPLIT_PAUSE_MS и фраза не длиннее MAX_UTTERANCE_SECONDS.
+
+    Args:
+        pcm (bytes): PCM 16 кГц, моно, 16 бит
+
+    Returns:
+        list: Фразы в виде буферов PCM в исходном порядке, пустой список,
+            если речи в сообщении нет
+    """
+    segments = detect_speech(pcm)
+    if not segments:
+        return []
+
+    split_pause = SPLIT_PAUSE_MS // FRAME_MS
+    max_frames = MAX_UTTERANCE_SECONDS * 1000 // FRAME_MS
+    utterances = [list(segments[0])]
+    for start, end in segments[1:]:
+        current = utterances[-1]
+        if start - current[1] < split_pause and end - current[0] <= max_frames:
+            current[1] = end
+        else:
+            utterances.append([start, end])
+
+    padding = PADDING_MS // FRAME_MS
+    frame_bytes = FRAME_SIZE * SAMPLE_WIDTH
+    return [
+        pcm[max(0, (start - padding) * frame_bytes):(end + padding) * frame_bytes]
+        for start, end in utterances
+    ]
@@ -0,0 +1,177 @@
+"""
+Очередь обработки голосовых сообщений.
+
+Каждое голосовое сообщение запускает цепочку скачивание -> декодирование ->
+распознавание -> ChatGPT -> синтез речи. Очередь ограничивает эту нагрузку:
+- сообщения длиннее VOICE_MAX_DURATION отклоняются до скачивания
+- у одного пользователя не больше VOICE_MAX_JOBS_PER_USER сообщений в работе
+- одновременно выполняется не больше VOICE_MAX_JOBS цепочек, остальные ждут
+  в порядке поступления, а пользователь видит свою позицию в очереди
+- задачи пользователя отменяются, когда он выходит из голосового чата
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceJobRejected(Exception):
+    """Голосовое сообщение не принято в очередь."""
+
+
+class VoiceJobQueue:
+    """
+    Очередь задач голосового чата с ограничением параллельности.
+
+    Задачи выполняются как фоновые задачи приложения, поэтому обработчик
+    сообщения возвращается сразу после постановки в очередь.
+    """
+
+    def __init__(self, max_jobs: int, max_jobs_per_user: int, max_duration: int):
+        self.max_jobs = max_jobs
+        self.max_jobs_per_user = max_jobs_per_user
+        self.max_duration = max_duration
+        self._running = 0
+        self._waiting = deque()
+        self._jobs = defaultdict(set)
+
+    @property
+    def pending(self) -> int:
+        """Число голосовых задач в работе и в ожидании по всем пользователям."""
+        return sum(len(jobs) for jobs in self._jobs.values())
+
+    def user_jobs(self, user_id: int) -> int:
+        """
+        Возвращает число задач пользователя в работе и в ожидании.
+
+        Args:
+            user_id (int): ID пользователя
+
+        Returns:
+            int: Число задач
+        """
+        return len(self._jobs.get(user_id, ()))
+
+    def check(self, user_id: int, duration: int) -> None:
+        """
+        Проверяет, можно ли принять голосовое сообщение, до его скачивания.
+
+        Args:
+            user_id (int): ID пользователя
+            duration (int): Длительность сообщения в секундах (voice.duration)
+
+        Raises:
+            VoiceJobRejected: С текстом для пользователя, если сообщение не принято
+        """
+        if duration > self.max_duration:
+            raise VoiceJobRejected(
+                f"⏱ Сообщение слишком длинное ({duration} с). "
+                f"Максимальная длительность - {self.max_duration} с."
+            )
+        if self.user_jobs(user_id) >= self.max_jobs_per_user:
+            raise VoiceJobRejected("⏳ Предыдущие сообщения еще обрабатываются. Дождитесь ответа.")
+
+    def submit(self, application, user_id: int, coroutine, update=None) -> int:
+        """
+        Ставит обработку сообщения в очередь.
+
+        Args:
+            application (Application): Приложение telegram.ext для запуска фоновой задачи
+            user_id (int): ID пользователя
+            coroutine: Корутина обработки сообщения
+            update (Update, optional): Обновление для обработчиков ошибок приложения
+
+        Returns:
+            int: Позиция в очереди (0 - обработка начинается сразу)
+        """
+        # Слот занимается сразу, чтобы позиция учитывала еще не запущенные задачи
+        if self._running < self.max_jobs and not self._waiting:
+            self._running += 1
+            waiter = None
+            position = 0
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting.append(waiter)
+            position = len(self._waiting)
+
+        task = application.create_task(self._run(coroutine, waiter), update=update)
+        jobs = self._jobs[user_id]
+        jobs.add(task)
+
+        def _done(finished):
+            # Выполняется и для задач, отмененных до первого шага
+            coroutine.close()
+            if waiter is None or (waiter.done() and not waiter.cancelled()):
+                self._release()
+            else:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                waiter.cancel()
+            jobs.discard(finished)
+            if not jobs:
+                self._jobs.pop(user_id, None)
+
+        task.add_done_callback(_done)
+        logger.info(f"Голосовая задача пользователя {user_id} в очереди: позиция {position}, "
+                    f"в работе {self._running}/{self.max_jobs}")
+        return position
+
+    def cancel_user(self, user_id: int) -> int:
+        """
+        Отменяет все задачи пользователя.
+
+        Args:
+            user_id (int): ID пользователя
+
+        Returns:
+            int: Число отмененных задач
+        """
+        jobs = list(self._jobs.get(user_id, ()))
+        for task in jobs:
+            task.cancel()
+        if jobs:
+            logger.info(f"Отменено голосовых задач пользователя {user_id}: {len(jobs)}")
+        return len(jobs)
+
+    @staticmethod
+    async def _run(coroutine, waiter):
+        if waiter is not None:
+            await waiter
+        return await coroutine
+
+    def _release(self) -> None:
+        # Освободившийся слот передается первой ожидающей задаче без уменьшения счетчика
+        while self._waiting:
+            waiter = self._waiting.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+
+_queue = None
+
+
+def get_voice_queue() -> VoiceJobQueue:
+    """
+    Возвращает очередь голосовых задач, настроенную из окружения.
+
+    Переменные окружения:
+    - VOICE_MAX_JOBS: одновременных цепочек на процесс (по умолчанию 4)
+    - VOICE_MAX_JOBS_PER_USER: сообщений одного пользователя в работе (по умолчанию 2)
+    - VOICE_MAX_DURATION: максимальная длительность сообщения в секундах (по умолчанию 60)
+
+    Returns:
+        VoiceJobQueue: Общая для процесса очередь
+    """
+    global _queue
+    if _queue is None:
+        _queue = VoiceJobQueue(
+            max_jobs=int(os.getenv("VOICE_MAX_JOBS", "4")),
+            max_jobs_per_user=int(os.getenv("VOICE_MAX_JOBS_PER_USER", "2")),
+            max_duration=int(os.getenv("VOICE_MAX_DURATION", "60")),
+        )
+    return _queue
@@ -2,46 +2,143 @@
 Сервис для распознавания и обработки голосовых сообщений.
 
 Этот модуль предоставляет функции для:
-- Распознавания речи из голосовых сообщений Telegram
-- Конвертации аудио форматов (OGG -> WAV -> MP3 -> OGG)
-- Генерации голосовых ответов с помощью Text-to-Speech
+- Распознавания речи из голосовых сообщений Telegram (бэкенды в services.stt)
+- Генерации голосовых ответов с помощью Text-to-Speech (бэкенды в services.tts)
 - Интеграции с ChatGPT для обработки распознанного текста
 
-Использует библиотеки:
-- speech_recognition для распознавания речи
-- gtts для синтеза речи
-- pydub для работы с аудиофайлами
+Декодирование и кодирование аудио выполняет ffmpeg.
 """
 
+import asyncio
 import os
 import logging
-import speech_recognition as sr
-from gtts import gTTS
-from pydub import AudioSegment
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import time
+from telegram import Update
 from telegram.ext import CallbackContext
+from data.menus import VOICE_KEYBOARD
 from handlers.voice_chat import VOICE_DIALOG
 from services.openai_client import get_chatgpt_response
+from services.stt import (
+    AudioDecodeError, SpeechNotRecognized, SpeechServiceError,
+    decode_to_pcm, get_speech_backend, transcribe_utterances,
+)
+from services import lifecycle, vad
+from services.reply_pipeline import ReplyTurn, delete_messages
+from services.tts import synthesize_voice
 
 logger = logging.getLogger(__name__)
 
-temp_files = []
+reply_markup = VOICE_KEYBOARD
 
-keyboard = [[InlineKeyboardButton("🏠 Вернуться в меню", callback_data="voice_stop")]]
 
-reply_markup = InlineKeyboardMarkup(keyboard)
+def remove_temp_files(*paths) -> None:
+    """
+    Удаляет временные аудиофайлы, пропуская отсутствующие.
+
+    Args:
+        *paths (str): Пути к файлам
+    """
+    for temp_file in paths:
+        if temp_file and os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+                logger.debug(f"Удален временный файл: {temp_file}")
+            except Exception as e:
+                logger.warning(f"Не удалось удалить файл {temp_file}: {e}")
+
+
+async def recognize_voice(voice, file_path: str) -> str:
+    """
+    Скачивает голосовое сообщение и распознает речь.
+
+    Args:
+        voice (Voice): Голосовое сообщение Telegram
+        file_path (str): Путь для сохранения OGG файла
+
+    Returns:
+        str: Распознанный текст
+
+    Raises:
+        AudioDecodeError: Если аудиофайл не удалось декодировать
+        SpeechNotRecognized: Если речь не найдена или не распознана
+        SpeechServiceError: Если сервис распознавания недоступен
+    """
+    file = await voice.get_file()
+    await file.download_to_drive(file_path)
+    logger.info(f"Голосовое сообщение сохранено: {file_path}")
+
+    # ffmpeg декодирует OGG в PCM, VAD обрезает тишину и делит сообщение на фразы
+    speech_backend = get_speech_backend()
+    started = time.perf_counter()
+    pcm = b"".join([chunk async for chunk in decode_to_pcm(file_path)])
+    utterances = await asyncio.to_thread(vad.split_utterances, pcm)
+    audio_seconds = vad.pcm_duration(pcm)
+    speech_seconds = sum(vad.pcm_duration(utterance) for utterance in utterances)
+    logger.info(f"VAD: {len(utterances)} фраз, речь {speech_seconds:.1f} с из {audio_seconds:.1f} с, "
+                f"STT сэкономлено {audio_seconds - speech_seconds:.1f} с")
+    if not utterances:
+        raise SpeechNotRecognized()
+
+    text = await transcribe_utterances(speech_backend, utterances)
+    logger.info(f"Распознанный текст ({speech_backend.name}, "
+                f"{time.perf_counter() - started:.2f} с): {text}")
+    return text
+
+
+async def send_voice_reply(update: Update, response_text: str, voice_response_file: str, started: float) -> None:
+    """
+    Синтезирует и отправляет голосовой ответ.
+
+    Выполняется в фоне параллельно с отправкой текстового ответа. Ошибки
+    синтеза только логируются: текст ответа пользователь уже получил.
+
+    Args:
+        update (Update): Объект обновления от Telegram с голосовым сообщением
+        response_text (str): Текст ответа для озвучивания
+        voice_response_file (str): Путь к файлу голосового ответа
+        started (float): Момент получения сообщения (time.perf_counter)
+    """
+    try:
+        await synthesize_voice(response_text, voice_response_file)
+        logger.info("Голосовой ответ готов")
+
+        with open(voice_response_file, 'rb') as voice_file:
+            await update.message.reply_voice(voice=voice_file)
+        logger.info(f"📊 voice: голосовой ответ отправлен через {(time.perf_counter() - started) * 1000:.0f} мс")
+    except Exception as e:
+        logger.error(f"Ошибка создания голосового ответа: {e}")
+
+
+async def _finish_in_background(voice_task, *paths) -> None:
+    # Временные файлы удаляются только после отправки голосового ответа
+    if voice_task is not None:
+        await asyncio.gather(voice_task, return_exceptions=True)
+    await asyncio.to_thread(remove_temp_files, *paths)
+
+
+async def _discard_placeholder(turn: ReplyTurn, placeholder_task) -> None:
+    # Заглушка отмененной задачи удаляется, когда ее отправка завершится
+    await asyncio.gather(placeholder_task, return_exceptions=True)
+    if turn.placeholder is not None:
+        await delete_messages(turn.context.bot, turn.chat_id, [turn.placeholder.message_id])
+
 
 async def handle_voice(update: Update, context: CallbackContext) -> int:
     """
     Обработчик голосовых сообщений с распознаванием речи и голосовым ответом.
 
-    Выполняет следующие операции:
-    1. Скачивает голосовое сообщение от пользователя
-    2. Конвертирует OGG в WAV для распознавания
-    3. Распознает речь с помощью Google Speech Recognition
-    4. Отправляет распознанный текст в ChatGPT
-    5. Генерирует голосовой ответ с помощью Google TTS
-    6. Отправляет голосовой ответ пользователю
+    Этапы выполняются как небольшой граф зависимостей:
+    1. Заглушка "Обрабатываю..." с индикатором набора отправляется параллельно
+       со скачиванием и распознаванием (recognize_voice: ffmpeg, VAD, STT)
+    2. Распознанный текст отправляется в ChatGPT
+    3. Как только ChatGPT ответил, заглушка превращается в текстовый ответ,
+       исходное сообщение удаляется, и одновременно синтезируется голосовой
+       ответ (services.tts)
+    4. Временные файлы (в каталоге services.lifecycle.audio_path) удаляются
+       в фоне после отправки голосового ответа
+
+    Выполняется как задача очереди services.voice_jobs. При отмене задачи
+    синтез прерывается, а неотвеченная заглушка удаляется.
 
     Args:
         update (Update): Объект обновления от Telegram с голосовым сообщением
@@ -50,97 +147,72 @@ async def handle_voice(update: Update, context: CallbackContext) -> int:
     Returns:
         int: VOICE_DIALOG для продолжения conversation handler
     """
-    file_path = None
-    wav_file = None
-    tts_file = None
-    voice_response_file = None
+    started = time.perf_counter()
+    message_id = update.message.message_id
+    # message_id уникален только в пределах чата
+    file_path = lifecycle.audio_path(f"voice_{update.effective_chat.id}_{message_id}.ogg")
+    voice_response_file = lifecycle.audio_path(f"response_{update.effective_chat.id}_{message_id}.ogg")
+    voice_task = None
+    answered = False
+    turn = ReplyTurn(update, context, "voice")
+    placeholder_task = asyncio.create_task(turn.start())
 
     try:
         logger.info(f"Получено голосовое сообщение от пользователя {update.effective_user.id}")
 
-        voice = update.message.voice
-        file = await voice.get_file()
-        file_path = f"voice_{update.message.message_id}.ogg"
-        await file.download_to_drive(file_path)
-        logger.info(f"Голосовое сообщение сохранено: {file_path}")
-
-        # Конвертируем ogg в wav для распознавания
         try:
-            audio = AudioSegment.from_ogg(file_path)
-            wav_file = f"voice_{update.message.message_id}.wav"
-            audio.export(wav_file, format="wav")
-            logger.info("Аудио конвертировано в WAV формат")
-        except Exception as e:
-            logger.error(f"Ошибка конвертации аудио: {e}")
-            await update.message.reply_text("Ошибка обработки аудиофайла.")
-            return -1
+            user_message = await recognize_voice(update.message.voice, file_path)
 
-        recognizer = sr.Recognizer()
-        try:
-            with sr.AudioFile(wav_file) as source:
-                audio_data = recognizer.record(source)
-                text = recognizer.recognize_google(audio_data, language="ru-RU")
-                logger.info(f"Распознанный текст: {text}")
-
-                user_message = text
-                await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-
-                context.user_data['voice_history'].append({"role": "user", "content": user_message})
-                logger.info(f"Сообщение пользователя {user_message}")
-                processing_msg = await update.message.reply_text("🤔 Обрабатываю ваш запрос... ⏳")
-                logger.info(f"История диалога: {context.user_data['voice_history']}")
-                response_text = await get_chatgpt_response(context.user_data['voice_history'])
-
-                logger.info(f"Получен ответ от ChatGPT: {response_text}")
-                context.user_data['voice_history'].append({"role": "assistant", "content": response_text})
-                await update.message.delete()
-                await processing_msg.delete()
-
-        except sr.UnknownValueError:
+            context.user_data['voice_history'].append({"role": "user", "content": user_message})
+            logger.info(f"История диалога: {context.user_data['voice_history']}")
+            response_text = await get_chatgpt_response(context.user_data['voice_history'])
+
+            logger.info(f"Получен ответ от ChatGPT: {response_text}")
+            context.user_data['voice_history'].append({"role": "assistant", "content": response_text})
+            turn.delete_later(message_id)
+
+        except AudioDecodeError as e:
+            logger.error(f"Ошибка конвертации аудио: {e}")
+            await placeholder_task
+            await turn.fail("Ошибка обработки аудиофайла.")
+            return VOICE_DIALOG
+        except SpeechNotRecognized:
             response_text = "Не удалось распознать голос. Попробуйте говорить четче."
             logger.warning("Голос не распознан")
-        except sr.RequestError as e:
+        except SpeechServiceError as e:
             response_text = "Ошибка сервиса распознавания. Попробуйте позже."
             logger.error(f"Ошибка сервиса распознавания: {e}")
 
-        # Создаем голосовой ответ
-        try:
-            tts = gTTS(text=response_text, lang='ru')
-            tts_file = f"response_{update.message.message_id}.mp3"
-            tts.save(tts_file)
-            logger.info("TTS аудио создано")
-
-            audio = AudioSegment.from_mp3(tts_file)
-            voice_response_file = f"response_{update.message.message_id}.ogg"
-            audio.export(voice_response_file, format="ogg", codec="libopus")
-            logger.info("Голосовой ответ готов")
-
-            with open(voice_response_file, 'rb') as voice_file:
-                await update.message.reply_voice(voice=voice_file)
-                logger.info("Голосовой ответ отправлен")
-
-            # Очищаем временные файлы
-            temp_files = [file_path, wav_file, tts_file, voice_response_file]
-            for temp_file in temp_files:
-                if temp_file and os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                        logger.debug(f"Удален временный файл: {temp_file}")
-                    except Exception as e:
-                        logger.warning(f"Не удалось удалить файл {temp_file}: {e}")
-            response_msg = await update.message.reply_text(
-                f"🤖 <b>ChatGPT отвечает:</b>\n\n{response_text}",
-                parse_mode='HTML',
-                reply_markup=reply_markup
-            )
-
-        except Exception as e:
-            logger.error(f"Ошибка создания голосового ответа: {e}")
-            await update.message.reply_text(response_text)
+        # Голосовой ответ синтезируется параллельно с отправкой текстового
+        voice_task = asyncio.create_task(send_voice_reply(update, response_text, voice_response_file, started))
+        await placeholder_task
+        await turn.finish(
+            f"🤖 <b>ChatGPT отвечает:</b>\n\n{response_text}",
+            parse_mode='HTML',
+            reply_markup=reply_markup
+        )
+        answered = True
+        logger.info(f"📊 voice: текстовый ответ отправлен через {(time.perf_counter() - started) * 1000:.0f} мс")
+
+        # Задача очереди голосового чата охватывает всю цепочку, включая голосовой ответ
+        await voice_task
+
+    except asyncio.CancelledError:
+        logger.info(f"Обработка голосового сообщения {message_id} отменена")
+        if voice_task is not None:
+            voice_task.cancel()
+        if not answered:
+            context.application.create_task(_discard_placeholder(turn, placeholder_task), update=update)
+        raise
 
     except Exception as e:
         logger.error(f"Общая ошибка обработки голоса: {e}", exc_info=True)
-        await update.message.reply_text("Произошла ошибка при обработке голосового сообщения.")
+        await asyncio.gather(placeholder_task, return_exceptions=True)
+        await turn.fail("Произошла ошибка при обработке голосового сообщения.")
 
     finally:
-        return VOICE_DIALOG
+        context.application.create_task(
+            _finish_in_background(voice_task, file_path, voice_response_file), update=update
+        )
+
+    return VOICE_DIALOG
@@ -0,0 +1,141 @@
+"""
+Общие фикстуры тестов.
+
+Приложение бота собирается так же, как в bot.py (build_application), но
+запросы Bot API уходят в StubBotRequest: он записывает вызовы и отвечает
+заготовленными результатами без сети. Базы хранилища контента и статистики
+квиза создаются во временном каталоге.
+
+Запуск: python -m pytest tests
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+_DATA_DIR = tempfile.mkdtemp(prefix="momotmr-tests-")
+os.environ.update({
+    "TELEGRAM_TOKEN": "123456:test",
+    "CHATGPT_TOKEN": "test",
+    "RATE_LIMITER": "0",
+    "SEMANTIC_CACHE": "0",
+    "CONTENT_DB_PATH": os.path.join(_DATA_DIR, "content.db"),
+    "QUIZ_STATS_DB_PATH": os.path.join(_DATA_DIR, "quiz_stats.db"),
+    "AUDIO_TMP_DIR": _DATA_DIR,
+})
+
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+from services.bot_api_loadtest import REPLY_METHODS, STUB_RESULTS  # noqa: E402
+
+CHAT_ID = 1001
+
+_update_ids = itertools.count(1)
+
+
+class StubBotRequest(BaseRequest):
+    """Запросы Bot API без сети: вызовы записываются в calls как (метод, параметры)."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls.append((name, params))
+        if name in REPLY_METHODS:
+            result = {"message_id": len(self.calls), "date": int(time.time()), "text": "stub",
+                      "chat": {"id": int(params.get("chat_id", CHAT_ID)), "type": "private"}}
+        else:
+            result = STUB_RESULTS.get(name, True)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def methods(self) -> list:
+        """Имена вызванных методов Bot API по порядку."""
+        return [name for name, _ in self.calls]
+
+
+def _message(chat_id: int, **fields) -> dict:
+    user = {"id": chat_id, "is_bot": False, "first_name": "Test"}
+    return {
+        "message_id": next(_update_ids), "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private", "first_name": "Test"}, "from": user, **fields,
+    }
+
+
+def command_update(command: str, chat_id: int = CHAT_ID) -> dict:
+    """Обновление с командой, например "/quiz"."""
+    return {"update_id": next(_update_ids), "message": _message(
+        chat_id, text=command, entities=[{"type": "bot_command", "offset": 0, "length": len(command)}]
+    )}
+
+
+def text_update(text: str, chat_id: int = CHAT_ID) -> dict:
+    """Обновление с текстовым сообщением."""
+    return {"update_id": next(_update_ids), "message": _message(chat_id, text=text)}
+
+
+def voice_update(duration: int = 2, chat_id: int = CHAT_ID) -> dict:
+    """Обновление с голосовым сообщением."""
+    voice = {"file_id": "voice", "file_unique_id": "voice", "duration": duration, "mime_type": "audio/ogg"}
+    return {"update_id": next(_update_ids), "message": _message(chat_id, voice=voice)}
+
+
+def callback_update(data: str, chat_id: int = CHAT_ID) -> dict:
+    """Обновление с нажатием inline-кнопки."""
+    user = {"id": chat_id, "is_bot": False, "first_name": "Test"}
+    return {"update_id": next(_update_ids), "callback_query": {
+        "id": str(next(_update_ids)), "from": user, "chat_instance": "test", "data": data,
+        "message": {**_message(chat_id, text="menu"), "from": {"id": 123456, "is_bot": True, "first_name": "Stub"}},
+    }}
+
+
+@pytest.fixture
+def bot_app(monkeypatch):
+    """
+    Приложение бота на заглушке Bot API.
+
+    Returns:
+        SimpleNamespace: application, request (StubBotRequest) и
+            send(update_dict) - обработать обновление и дождаться фоновых задач
+    """
+    monkeypatch.chdir(ROOT_DIR)
+    import bot
+
+    request = StubBotRequest()
+    monkeypatch.setattr(
+        bot.telegram_http, "apply_http_settings",
+        lambda builder, settings=None: builder.request(request).get_updates_request(StubBotRequest()),
+    )
+    application = bot.build_application(updater=False)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(application.initialize())
+    request.calls.clear()
+
+    def send(data: dict) -> None:
+        async def process():
+            await application.process_update(Update.de_json(data, application.bot))
+            await asyncio.sleep(0)
+
+        loop.run_until_complete(process())
+
+    yield SimpleNamespace(application=application, request=request, send=send, loop=loop)
+    loop.run_until_complete(application.shutdown())
+    loop.close()
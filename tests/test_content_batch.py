@@ -0,0 +1,67 @@
+"""Пакетная генерация: полный цикл submit/status/ingest на заглушке OpenAI."""
+
+import asyncio
+
+import pytest
+
+from data.quiz_topics import QUIZ_TOPICS
+from services import content_batch, content_store
+from services.content_store import KIND_FACT, KIND_QUIZ, ContentStore
+from services.openai_stub import OpenAIStub
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ContentStore(str(tmp_path / "content.db"))
+    monkeypatch.setattr(content_store, "_store", store)
+    return store
+
+
+def test_batch_cycle_against_stub(store, capsys):
+    facts, questions = 6, 2
+    total = facts + questions * len(QUIZ_TOPICS)
+    with OpenAIStub(fail_every=4) as stub:
+        assert content_batch.main(["--base-url", stub.base_url, "submit",
+                                   "--facts", str(facts), "--questions", str(questions)]) == 0
+        batch_id = capsys.readouterr().out.strip().splitlines()[-1]
+
+        assert content_batch.main(["--base-url", stub.base_url, "status", batch_id]) == 0
+        assert "completed=" in capsys.readouterr().out
+
+        assert content_batch.main(["--base-url", stub.base_url, "ingest", batch_id]) == 0
+
+    counts = store.counts()
+    ingested = sum(counts.values())
+    assert ingested == total - total // 4
+    assert counts[(KIND_FACT, "")] > 0
+    assert {topic for kind, topic in counts if kind == KIND_QUIZ} <= set(QUIZ_TOPICS)
+    assert store.draw_unseen(1, KIND_FACT).startswith("Факт заглушки")
+
+
+def test_ingest_skips_duplicates(store, capsys):
+    with OpenAIStub() as stub:
+        content_batch.main(["--base-url", stub.base_url, "submit", "--facts", "3", "--questions", "0"])
+        batch_id = capsys.readouterr().out.strip().splitlines()[-1]
+        content_batch.main(["--base-url", stub.base_url, "ingest", batch_id])
+        content_batch.main(["--base-url", stub.base_url, "ingest", batch_id])
+
+    assert store.counts() == {(KIND_FACT, ""): 3}
+
+
+def test_live_client_uses_stub(monkeypatch):
+    from services import openai_client
+
+    with OpenAIStub() as stub:
+        monkeypatch.setenv("OPENAI_BASE_URL", stub.base_url)
+        monkeypatch.setattr(openai_client, "client", None)
+
+        async def run():
+            try:
+                return await openai_client.generate_fact()
+            finally:
+                await openai_client.close_client()
+
+        fact = asyncio.run(run())
+
+    assert fact.startswith("Факт заглушки")
+    assert ("POST", "/v1/chat/completions") in stub.requests
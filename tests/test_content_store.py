@@ -0,0 +1,76 @@
+"""Хранилище контента: несколько писателей одной базы и дубликаты."""
+
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from services.content_store import KIND_FACT, KIND_QUIZ, SCHEMA_VERSION, ContentStore
+
+
+def _write_facts(path: str, prefix: str, count: int, ready, go) -> None:
+    store = ContentStore(path)
+    ready.release()
+    go.wait()
+    for number in range(count):
+        store.add(KIND_FACT, "", f"{prefix} {number}")
+
+
+def test_two_writers_keep_every_item(tmp_path):
+    path = str(tmp_path / "content.db")
+    first, second = ContentStore(path), ContentStore(path)
+
+    # Второй экземпляр открыт до записей первого: номера не должны совпасть
+    assert first.add(KIND_FACT, "", "факт первого") == 0
+    assert second.add(KIND_FACT, "", "факт второго") == 1
+    assert first.add_many(KIND_FACT, [("", "еще факт первого")]) == 1
+
+    assert first.counts() == second.counts() == {(KIND_FACT, ""): 3}
+    drawn = {second.draw_unseen(7, KIND_FACT) for _ in range(3)}
+    assert drawn == {"факт первого", "факт второго", "еще факт первого"}
+    assert second.draw_unseen(7, KIND_FACT) is None
+
+
+def test_writer_processes_keep_every_item(tmp_path):
+    path = str(tmp_path / "content.db")
+    ContentStore(path)
+    context = multiprocessing.get_context("spawn")
+    ready, go = context.Semaphore(0), context.Event()
+    writers = [
+        context.Process(target=_write_facts, args=(path, f"писатель {index}", 50, ready, go))
+        for index in range(3)
+    ]
+    for writer in writers:
+        writer.start()
+    # Все писатели открыли базу до первой записи
+    for _ in writers:
+        ready.acquire()
+    go.set()
+    for writer in writers:
+        writer.join(timeout=60)
+        assert writer.exitcode == 0
+
+    store = ContentStore(path)
+    assert store.counts() == {(KIND_FACT, ""): 150}
+    seqs = [row[0] for row in store._db.execute("SELECT seq FROM items ORDER BY seq")]
+    assert seqs == list(range(150))
+
+
+def test_duplicates_are_skipped_and_seq_conflicts_raise(tmp_path):
+    store = ContentStore(str(tmp_path / "content.db"))
+    assert store.add(KIND_QUIZ, "history", "Вопрос") == 0
+    assert store.add(KIND_QUIZ, "history", "  вопрос ") is None
+    assert store.add(KIND_QUIZ, "science", "Другой вопрос") == 0
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with store._db:
+            store._db.execute(
+                "INSERT INTO items (kind, topic, seq, body, hash, created) VALUES (?, ?, 0, 'x', 'x', 0) "
+                "ON CONFLICT (hash) DO NOTHING", (KIND_QUIZ, "history")
+            )
+
+
+def test_new_database_has_schema_version(tmp_path):
+    store = ContentStore(str(tmp_path / "content.db"))
+
+    assert store._db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION == 1
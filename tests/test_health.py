@@ -0,0 +1,52 @@
+"""Проверки состояния: ответы /healthz и таймаут чтения запроса."""
+
+import asyncio
+import json
+import time
+
+from services.health import HealthMonitor
+
+
+async def _request(port: int, data: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+def _with_monitor(scenario, **kwargs):
+    async def run():
+        monitor = HealthMonitor("127.0.0.1", 0, **kwargs)
+        await monitor.start()
+        port = monitor._server.sockets[0].getsockname()[1]
+        try:
+            return monitor, await scenario(port)
+        finally:
+            await monitor.stop()
+
+    return asyncio.run(run())
+
+
+def test_healthz_answers_ok():
+    _, response = _with_monitor(lambda port: _request(port, b"GET /healthz HTTP/1.1\r\nHost: x\r\n\r\n"))
+
+    head, body = response.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert json.loads(body)["status"] == "ok"
+
+
+def test_silent_client_is_disconnected():
+    async def scenario(port):
+        started = time.monotonic()
+        # Клиент открыл соединение и прислал только начало строки запроса
+        response = await asyncio.wait_for(_request(port, b"GET /hea"), 5)
+        return response, time.monotonic() - started
+
+    monitor, (response, elapsed) = _with_monitor(scenario, read_timeout=0.2)
+
+    assert response == b""
+    assert 0.15 <= elapsed < 2
+    assert monitor.stats["timeouts"] == 1
+    assert monitor.stats["probes"] == 0
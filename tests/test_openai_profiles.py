@@ -0,0 +1,80 @@
+"""Профили генерации OpenAI: single-flight только для детерминированных ответов."""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from services import openai_client
+
+CONCURRENT_CALLS = 5
+
+
+class StubCompletions:
+    """chat.completions клиента OpenAI: считает вызовы и отвечает с задержкой."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        number = self.calls
+        await asyncio.sleep(0.05)
+        message = SimpleNamespace(content=f"ответ {number}")
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, prompt_tokens_details=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    completions = StubCompletions()
+    monkeypatch.setattr(openai_client, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(openai_client, "_profiles", None)
+    monkeypatch.setattr(openai_client, "usage_stats", {})
+    return completions
+
+
+def _concurrent_answers(feature: str) -> list:
+    async def run():
+        return await asyncio.gather(*(
+            openai_client.get_personality_response("Переведи: кошка", "Ты переводчик.", feature=feature)
+            for _ in range(CONCURRENT_CALLS)
+        ))
+
+    return asyncio.run(run())
+
+
+def test_identical_translate_calls_share_one_request(completions):
+    answers = _concurrent_answers("translate")
+
+    assert completions.calls == 1
+    assert answers == ["ответ 1"] * CONCURRENT_CALLS
+    assert openai_client.usage_stats["translate"]["coalesced"] == CONCURRENT_CALLS - 1
+
+
+def test_identical_calls_without_single_flight_are_sent_separately(completions):
+    answers = _concurrent_answers("quiz")
+
+    assert completions.calls == CONCURRENT_CALLS
+    assert len(set(answers)) == CONCURRENT_CALLS
+    assert openai_client.usage_stats["quiz"]["coalesced"] == 0
+
+
+def test_single_flight_profiles_are_deterministic():
+    profiles = openai_client.load_profiles()
+
+    for feature, profile in profiles.items():
+        if profile["single_flight"]:
+            assert profile["temperature"] == 0, feature
+    assert profiles["translate"]["single_flight"]
+
+
+def test_single_flight_with_temperature_warns(monkeypatch, caplog):
+    monkeypatch.setenv("OPENAI_TRANSLATE_TEMPERATURE", "0.8")
+
+    with caplog.at_level(logging.WARNING, logger=openai_client.__name__):
+        profiles = openai_client.load_profiles()
+
+    assert profiles["translate"]["temperature"] == 0.8
+    assert any("translate" in record.getMessage() for record in caplog.records)
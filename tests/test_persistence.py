@@ -0,0 +1,107 @@
+"""Хранилище состояния: диалог на нескольких экземплярах бота и конфликты записи."""
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from conftest import CHAT_ID, command_update, text_update  # noqa: E402
+from services import persistence  # noqa: E402
+from services.persistence import MemoryBackend, RedisBackend, StatePersistence, merge_data  # noqa: E402
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def _persistence(server) -> StatePersistence:
+    return StatePersistence(RedisBackend(client=fakeredis.FakeAsyncRedis(server=server)))
+
+
+def test_conversation_continues_on_second_instance(bot_app, monkeypatch, redis_server):
+    import bot
+
+    answers = []
+
+    async def get_chatgpt_response(history):
+        answers.append(len(history))
+        return f"ответ {len(answers)}"
+
+    monkeypatch.setattr("handlers.chatgpt_interface.get_chatgpt_response", get_chatgpt_response)
+    monkeypatch.setattr(persistence, "get_persistence", lambda: _persistence(redis_server))
+    first, second = bot.build_application(updater=False), bot.build_application(updater=False)
+    # Запросы Bot API обоих экземпляров уходят в заглушку фикстуры bot_app
+    for application in (first, second):
+        bot_app.loop.run_until_complete(application.initialize())
+
+    def send(application, data):
+        bot_app.loop.run_until_complete(application.process_update(bot.Update.de_json(data, application.bot)))
+
+    # Диалог начат на первом экземпляре, сообщения приходят на второй и обратно
+    send(first, command_update("/gpt"))
+    send(second, text_update("привет"))
+    send(first, text_update("как дела?"))
+
+    assert answers == [1, 3]
+    history = first.user_data[CHAT_ID]["gpt_history"]
+    assert [message["content"] for message in history] == ["привет", "ответ 1", "как дела?", "ответ 2"]
+    assert second.persistence.stats["conflicts"] == first.persistence.stats["conflicts"] == 0
+
+    for application in (first, second):
+        bot_app.loop.run_until_complete(application.shutdown())
+
+
+def test_conflicting_writes_are_merged(redis_server):
+    first, second = _persistence(redis_server), _persistence(redis_server)
+
+    async def run():
+        await first.backend.write([("user:1", persistence.pickle.dumps({"topic": "history", "score": 1}), 0)])
+        for store in (first, second):
+            records = await store.backend.read(["user:1"])
+            version, data = records["user:1"]
+            store._remember("user:1", version, data)
+
+        # Оба экземпляра обработали обновления пользователя с одной и той же версией
+        await first.update_user_data(1, {"topic": "history", "score": 2})
+        assert await first.commit() == []
+        await second.update_user_data(1, {"topic": "history", "score": 1, "voice_history": ["привет"]})
+        assert await second.commit() == []
+        await second.update_conversation("gpt", (1, 1), 2)
+        assert await second.commit() == []
+        return await first.backend.read(["user:1"])
+
+    version, data = asyncio.run(run())["user:1"]
+
+    assert persistence.pickle.loads(data) == {"topic": "history", "score": 2, "voice_history": ["привет"]}
+    assert version == 3
+    assert second.stats["conflicts"] == second.stats["merged"] == 1
+
+
+def test_write_that_keeps_conflicting_is_returned():
+    class RacingBackend(MemoryBackend):
+        # Другой экземпляр меняет запись перед каждой нашей записью
+        async def write(self, writes):
+            for key, _, _ in writes:
+                version = self._records.get(key, (0, None))[0]
+                self._records[key] = (version + 1, persistence.pickle.dumps({"other": version}))
+            return await super().write(writes)
+
+    store = StatePersistence(RacingBackend())
+
+    async def run():
+        await store.update_user_data(1, {"score": 1})
+        return await store.commit()
+
+    assert asyncio.run(run()) == ["user:1"]
+    assert store.stats["conflicts"] == persistence.MAX_WRITE_ATTEMPTS
+    assert store.stats["lost"] == 1
+
+
+def test_merge_data_keeps_both_sides():
+    base = {"a": 1, "b": 2, "c": 3}
+    ours = {"a": 10, "c": 3, "d": 4}
+    theirs = {"a": 1, "b": 2, "c": 30, "e": 5}
+
+    assert merge_data(base, ours, theirs) == {"a": 10, "c": 30, "d": 4, "e": 5}
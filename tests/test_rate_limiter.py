@@ -0,0 +1,51 @@
+"""Ограничитель Bot API: удаления и индикаторы набора не занимают лимит сообщений чата."""
+
+import asyncio
+import time
+
+from services.rate_limiter import PriorityRateLimiter
+
+CHAT_ID = 5
+
+
+def _run(limiter: PriorityRateLimiter, calls: list) -> dict:
+    """Выполняет вызовы (endpoint) одновременно и возвращает {номер: (результат, задержка вызова)}."""
+    started = time.monotonic()
+    called = {}
+
+    async def request(index, endpoint):
+        async def callback():
+            called[index] = time.monotonic() - started
+            return index
+
+        result = await limiter.process_request(callback, (), {}, endpoint, {"chat_id": CHAT_ID}, None)
+        return index, result
+
+    async def run():
+        await limiter.initialize()
+        return await asyncio.gather(*(request(index, endpoint) for index, endpoint in enumerate(calls)))
+
+    return {index: (result, called.get(index)) for index, result in asyncio.run(run())}
+
+
+def test_low_priority_calls_do_not_delay_messages():
+    limiter = PriorityRateLimiter(chat_rate=1, chat_burst=1, low_rate=10, low_burst=1)
+
+    results = _run(limiter, ["deleteMessage", "deleteMessage", "deleteMessage", "sendMessage"])
+
+    # Сообщение не ждет удалений: у них своя корзина
+    assert results[3][1] < 0.05
+    # Удаления не пропускаются, а выполняются в темпе своей корзины
+    assert all(results[index][0] == index for index in range(3))
+    assert max(results[index][1] for index in range(3)) >= 0.15
+
+
+def test_typing_indicator_is_dropped_when_its_budget_is_empty():
+    limiter = PriorityRateLimiter(chat_rate=1, chat_burst=3, low_rate=0.1, low_burst=1)
+
+    results = _run(limiter, ["sendChatAction", "sendChatAction", "sendMessage"])
+
+    assert results[0] == (0, results[0][1])
+    assert results[1] == (True, None)
+    assert results[2][0] == 2 and results[2][1] < 0.05
+    assert limiter.stats["dropped"] == 1
@@ -0,0 +1,60 @@
+"""Маршрутизация: команды входа в диалоги и кнопки внутри диалогов."""
+
+import pytest
+
+from conftest import callback_update, command_update, text_update
+from data.callbacks import NS_QUIZ, NS_TALK, NS_TRANSLATE, QUIZ_TOPIC, TALK_SELECT, TRANSLATE_SELECT, arg_id, encode_callback
+from data.languages import LNG_TRANSLATE
+from data.personalities import PERSONALITIES
+from data.quiz_topics import QUIZ_TOPICS
+from handlers.routing import STALE_BUTTON_TEXT
+
+QUIZ_QUESTION = "Вопрос: Сколько будет 2 + 2?\nA) 3\nB) 4\nC) 5\nD) 6\nПравильный ответ: B"
+
+
+@pytest.fixture
+def quiz_question(monkeypatch):
+    async def get_personality_response(message, prompt, feature=None):
+        return QUIZ_QUESTION
+
+    monkeypatch.setattr("handlers.quiz.get_personality_response", get_personality_response)
+
+
+@pytest.mark.parametrize("command, button", [
+    ("/quiz", encode_callback(NS_QUIZ, QUIZ_TOPIC, arg_id(NS_QUIZ, next(iter(QUIZ_TOPICS))))),
+    ("/talk", encode_callback(NS_TALK, TALK_SELECT, arg_id(NS_TALK, next(iter(PERSONALITIES))))),
+    ("/personality", encode_callback(NS_TALK, TALK_SELECT, arg_id(NS_TALK, next(iter(PERSONALITIES))))),
+    ("/translate", encode_callback(NS_TRANSLATE, TRANSLATE_SELECT, arg_id(NS_TRANSLATE, next(iter(LNG_TRANSLATE))))),
+])
+def test_entry_command_enters_conversation(bot_app, quiz_question, command, button):
+    bot_app.send(command_update(command))
+    bot_app.request.calls.clear()
+
+    bot_app.send(callback_update(button))
+
+    methods = bot_app.request.methods()
+    assert "answerCallbackQuery" in methods
+    assert "editMessageText" in methods
+
+
+def test_quiz_answer_after_command(bot_app, quiz_question):
+    bot_app.send(command_update("/quiz"))
+    bot_app.send(callback_update(encode_callback(NS_QUIZ, QUIZ_TOPIC, 0)))
+    bot_app.request.calls.clear()
+
+    bot_app.send(text_update("B"))
+
+    texts = [params.get("text", "") for _, params in bot_app.request.calls]
+    assert any("Правильно" in text for text in texts), texts
+
+
+@pytest.mark.parametrize("data", [
+    encode_callback(NS_QUIZ, QUIZ_TOPIC, 0),  # кнопка диалога, в котором пользователь не находится
+    "quiz_topic_programming",  # callback_data до data.callbacks
+    encode_callback(NS_QUIZ, 99),  # неизвестное действие
+])
+def test_unrouted_button_is_answered(bot_app, quiz_question, data):
+    bot_app.send(callback_update(data, chat_id=2002))
+
+    assert bot_app.request.methods() == ["answerCallbackQuery"]
+    assert bot_app.request.calls[0][1]["text"] == STALE_BUTTON_TEXT
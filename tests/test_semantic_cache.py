@@ -0,0 +1,122 @@
+"""Семантический кэш: перефразировки совпадают, вопросы с другим смыслом - нет."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.semantic_cache import HashingEmbedder, SemanticCache, meaning_markers, same_meaning
+
+SYSTEM_PROMPT = "Ты полезный помощник."
+
+
+class StubEmbedder:
+    """Встраивание модели-перефразировщика: вопросы одной группы получают близкие векторы."""
+
+    name = "stub"
+
+    def __init__(self, groups: dict, dimensions: int = 16):
+        rng = np.random.default_rng(0)
+        self.vectors = {}
+        for texts in groups.values():
+            base = rng.normal(size=dimensions)
+            for text, similarity in texts.items():
+                # Вектор с заданной близостью к base
+                noise = rng.normal(size=dimensions)
+                noise -= (noise @ base) / (base @ base) * base
+                vector = similarity * base / np.linalg.norm(base)
+                vector += np.sqrt(1 - similarity ** 2) * noise / np.linalg.norm(noise)
+                self.vectors[text] = vector.astype(np.float32)
+
+    async def embed(self, text: str) -> np.ndarray:
+        return self.vectors[text]
+
+
+def _cached_answer(stored: str, asked: str, embedder=None):
+    cache = SemanticCache(embedder or HashingEmbedder(), threshold=0.92)
+
+    async def run():
+        cache.store(SYSTEM_PROMPT, stored, await cache.embed(stored), f"ответ: {stored}", latency=1.0)
+        return cache.lookup(SYSTEM_PROMPT, asked, await cache.embed(asked))
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("как приготовить пасту карбонара?", "как приготовить пасту карбонару?"),
+    ("какая столица Франции?", "какая столица у Франции"),
+    ("сколько планет в Солнечной системе", "сколько всего планет в солнечной системе?"),
+])
+def test_hashing_rewordings_hit(stored, asked):
+    assert _cached_answer(stored, asked) == f"ответ: {stored}"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("как приготовить пасту карбонара?", "как готовить карбонару"),
+    ("расскажи про кошек", "расскажи о кошках"),
+    ("кто такой Пушкин?", "расскажи о Пушкине"),
+    ("переведи на английский: у меня 2 кошки", "как по-английски сказать, что у меня 2 кошки"),
+])
+def test_paraphrases_with_other_words_hit(stored, asked):
+    # Слова различаются, но встраивание считает вопросы близкими - решает оно
+    embedder = StubEmbedder({"group": {stored: 1.0, asked: 0.95}})
+
+    assert _cached_answer(stored, asked, embedder) == f"ответ: {stored}"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("переведи на английский: я люблю кошек", "переведи на английский: я не люблю кошек"),
+    ("напиши рецепт торта на 12 человек", "напиши рецепт торта на 10 человек"),
+    ("расскажи про Пушкина", "расскажи про Лермонтова"),
+    ("I like cats", "I don't like cats"),
+])
+def test_close_embeddings_with_other_meaning_miss(stored, asked):
+    embedder = StubEmbedder({"group": {stored: 1.0, asked: 0.99}})
+
+    assert _cached_answer(stored, asked, embedder) is None
+
+
+def test_similarity_below_threshold_misses():
+    embedder = StubEmbedder({"group": {"как приготовить борщ": 1.0, "рецепт борща": 0.85}})
+
+    assert _cached_answer("как приготовить борщ", "рецепт борща", embedder) is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("переведи на английский: я люблю кошек", "переведи на английский: я не люблю кошек"),
+    ("напиши рецепт торта на 12 человек с шоколадом и вишней", "напиши рецепт торта на 10 человек с шоколадом и вишней"),
+    ("расскажи про историю создания автомобиля в 1886 году", "расскажи про историю создания автомобиля в 1885 году"),
+])
+def test_different_meaning_misses(stored, asked):
+    assert _cached_answer(stored, asked) is None
+
+
+@pytest.mark.parametrize("first, second", [
+    ("переведи на английский: я люблю кошек", "переведи на английский: я не люблю кошек"),
+    ("напиши рецепт торта на 12 человек с шоколадом и вишней", "напиши рецепт торта на 10 человек с шоколадом и вишней"),
+])
+def test_embedding_alone_scores_above_threshold(first, second):
+    # Без проверки смысловых меток эти вопросы получили бы чужой ответ
+    embedder = HashingEmbedder()
+
+    async def similarity():
+        return float(await embedder.embed(first) @ await embedder.embed(second))
+
+    assert asyncio.run(similarity()) >= 0.92
+
+
+def test_meaning_markers():
+    markers, names, _ = meaning_markers("Как дела у Пушкина? Пушкин молодец")
+    assert (markers, names) == (frozenset(), {"пушки"})
+    assert meaning_markers("I don't know")[0] == {"not"}
+    assert meaning_markers("торт на 012 человек без сахара")[0] == {"12", "без"}
+
+
+@pytest.mark.parametrize("first, second, same", [
+    ("кто такой Пушкин?", "кто такой пушкин", True),
+    ("расскажи о Пушкине", "расскажи про Лермонтова", False),
+    ("сколько будет 2+2", "сколько будет два плюс два", False),
+    ("расскажи про кошек", "расскажи о кошках", True),
+])
+def test_same_meaning(first, second, same):
+    assert same_meaning(meaning_markers(first), meaning_markers(second)) is same
@@ -0,0 +1,91 @@
+"""Многопроцессный режим: ответы на опросы квиза и настройки воркеров."""
+
+import asyncio
+import datetime
+import queue
+
+import pytest
+from telegram import Chat, Message, PollAnswer, Update, User
+
+from services import sharding
+
+GROUP_ID = -1001234567890
+
+
+def _user(user_id: int) -> User:
+    return User(id=user_id, is_bot=False, first_name=f"User {user_id}")
+
+
+def _group_message(update_id: int, user_id: int) -> Update:
+    message = Message(
+        message_id=update_id, date=datetime.datetime.now(), chat=Chat(id=GROUP_ID, type=Chat.SUPERGROUP),
+        from_user=_user(user_id), text="A",
+    )
+    return Update(update_id, message=message)
+
+
+def _poll_answer(update_id: int, poll_id: str, user_id: int) -> Update:
+    return Update(update_id, poll_answer=PollAnswer(poll_id=poll_id, user=_user(user_id), option_ids=[1]))
+
+
+@pytest.fixture
+def poller(monkeypatch):
+    # Два воркера без процессов: проверяется раздача обновлений по очередям
+    poller = sharding.ShardedPoller("123:test", workers=2)
+    group_worker = sharding.shard_for(_group_message(1, 1), 2)
+    # Пользователь, чей ID распределяется в другой воркер, чем группа
+    user_id = next(
+        user_id for user_id in range(1, 100) if sharding.shard_for(_poll_answer(1, "x", user_id), 2) != group_worker
+    )
+    monkeypatch.setattr(sharding, "_poll_routes", poller._poll_routes)
+    monkeypatch.setattr(sharding, "_worker_index", group_worker)
+    return poller, group_worker, user_id
+
+
+def _received(poller) -> dict:
+    received = {}
+    for index, updates in enumerate(poller._queues):
+        try:
+            while True:
+                data = updates.get(timeout=0.5)
+                received.setdefault(index, []).append(data["update_id"])
+        except queue.Empty:
+            pass
+    return received
+
+
+def test_group_poll_answer_reaches_the_worker_that_sent_the_poll(poller):
+    poller, group_worker, user_id = poller
+
+    async def run():
+        await poller._dispatch(_group_message(1, user_id))
+        # Воркер группы отправил опрос квиза
+        sharding.register_poll("poll-1")
+        await poller._dispatch(_poll_answer(2, "poll-1", user_id))
+
+    asyncio.run(run())
+
+    assert _received(poller) == {group_worker: [1, 2]}
+
+
+def test_unknown_poll_answer_goes_to_the_user_worker(poller):
+    poller, group_worker, user_id = poller
+
+    asyncio.run(poller._dispatch(_poll_answer(1, "poll-unknown", user_id)))
+
+    assert _received(poller) == {1 - group_worker: [1]}
+
+
+@pytest.mark.parametrize("value, expected", [("0", "5"), ("", "5"), (None, "5"), ("30", "30")])
+def test_worker_reloads_leaderboards_unless_a_period_is_set(monkeypatch, value, expected):
+    monkeypatch.delenv("HEALTH_PORT", raising=False)
+    monkeypatch.setenv("TG_GLOBAL_RATE", "30")
+    if value is None:
+        monkeypatch.delenv("LEADERBOARD_REFRESH", raising=False)
+    else:
+        monkeypatch.setenv("LEADERBOARD_REFRESH", value)
+
+    sharding._configure_worker(0, 2)
+
+    assert sharding.os.environ["LEADERBOARD_REFRESH"] == expected
+    assert sharding.os.environ["TG_GLOBAL_RATE"] == "15.0"
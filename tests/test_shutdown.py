@@ -0,0 +1,16 @@
+"""Остановка под нагрузкой: SIGTERM не теряет принятую работу и не оставляет файлов."""
+
+import pytest
+
+from services.bot_api_loadtest import run_shutdown
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sigterm_under_load_loses_nothing(workers):
+    # SIGTERM приходит, когда бот ответил на треть обновлений, а остальные в работе
+    result = run_shutdown(workers, updates=60, chats=20, delay=0.1, after=20, shutdown_timeout=10, timeout=60)
+
+    assert result["acked"] > 20
+    assert result["lost"] == 0
+    assert result["files_left"] == 0
+    assert result["exit_code"] == 0
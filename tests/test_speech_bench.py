@@ -0,0 +1,72 @@
+"""Бенчмарк распознавания: подсчет WER и прогон набора клипов по пути бота."""
+
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from services import speech_bench
+from services.stt import SpeechBackend
+
+CLIPS_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "speech")
+
+
+class EchoBackend(SpeechBackend):
+    """Возвращает заданный текст на каждую фразу."""
+
+    name = "echo"
+
+    def __init__(self, text: str):
+        self.text = text
+
+    async def transcribe(self, chunks) -> str:
+        async for _ in chunks:
+            pass
+        return self.text
+
+
+@pytest.mark.parametrize("reference, hypothesis, errors", [
+    ("привет как дела", "привет как дела", 0),
+    ("привет как дела", "Привет, как дела?", 0),
+    ("почему небо голубое", "почему небо", 1),
+    ("спасибо до свидания", "спасибо да свидания вам", 2),
+    ("ещё раз", "еще раз", 0),
+])
+def test_word_errors(reference, hypothesis, errors):
+    words = speech_bench.normalize_words
+    assert speech_bench.word_errors(words(reference), words(hypothesis)) == errors
+
+
+def test_manifest_matches_bench_phrases():
+    clips = speech_bench.read_manifest(CLIPS_DIR)
+
+    assert [reference for _, reference in clips] == speech_bench.BENCH_PHRASES
+    assert all(os.path.exists(path) for path, _ in clips)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="нужен ffmpeg")
+def test_clip_runs_through_bot_path(monkeypatch):
+    path, reference = speech_bench.read_manifest(CLIPS_DIR)[0]
+    monkeypatch.setattr(speech_bench, "make_backend", lambda name: EchoBackend(reference))
+
+    results = asyncio.run(speech_bench.run_stt([(path, reference)], ["echo"]))
+
+    assert results["echo"]["wer"] == 0
+    assert results["echo"]["errors"] == 0
+    assert results["echo"]["p50"] > 0
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="нужен ffmpeg")
+@pytest.mark.parametrize("noise_db", [None, -45])
+def test_vad_trims_silence_around_speech(noise_db):
+    clips = speech_bench.read_manifest(CLIPS_DIR)
+
+    totals = asyncio.run(speech_bench.run_vad(clips, noise_db))
+
+    silence = (speech_bench.LEAD_SILENCE + speech_bench.TRAIL_SILENCE) * len(clips)
+    assert totals["empty"] == 0
+    assert totals["utterances"] == len(clips)
+    # Речь не обрезается: остается не меньше синтезированной, тишина по краям почти вся отброшена
+    assert totals["speech"] >= totals["audio"] - silence
+    assert totals["audio"] - totals["speech"] > 0.7 * silence
@@ -0,0 +1,37 @@
+"""Время старта: импорт bot.py без тяжелых подсистем и в пределах бюджета."""
+
+import os
+import subprocess
+import sys
+
+from conftest import ROOT_DIR
+
+# Подсистемы, которые загружаются лениво после старта (bot.warm_up_subsystems)
+LAZY_PACKAGES = ("openai", "speech_recognition", "gtts")
+
+# Бюджет времени импорта bot.py в микросекундах (как IMPORT_BUDGET_US в Makefile)
+IMPORT_BUDGET_US = int(os.getenv("IMPORT_BUDGET_US", "800000"))
+
+
+def _import_times() -> dict:
+    # Строки -X importtime: "import time: self | cumulative | module"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        cwd=ROOT_DIR, env=os.environ.copy(), capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_bot_import_skips_lazy_packages_and_fits_budget():
+    times = _import_times()
+
+    loaded = sorted(module for module in times if module.split(".")[0] in LAZY_PACKAGES)
+    assert loaded == []
+    assert 0 < times["bot"] <= IMPORT_BUDGET_US
@@ -0,0 +1,46 @@
+"""Голосовой чат: выход по /start завершает диалог и отменяет задачи."""
+
+import asyncio
+
+import pytest
+
+from conftest import CHAT_ID, command_update, voice_update
+from services.voice_jobs import get_voice_queue
+
+
+@pytest.fixture
+def slow_voice(monkeypatch):
+    """Подменяет обработку голосового сообщения зависающей задачей и возвращает ее журнал."""
+    log = {"started": 0, "cancelled": 0}
+
+    async def handle_voice(update, context):
+        log["started"] += 1
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            log["cancelled"] += 1
+            raise
+
+    monkeypatch.setattr("services.voice_recognition.handle_voice", handle_voice)
+    return log
+
+
+def test_start_ends_voice_dialog_and_cancels_jobs(bot_app, slow_voice):
+    queue = get_voice_queue()
+    bot_app.send(command_update("/voice"))
+    bot_app.application.user_data[CHAT_ID]["voice_history"] = ["привет"]
+    bot_app.send(voice_update())
+    assert slow_voice["started"] == 1
+    assert queue.user_jobs(CHAT_ID) == 1
+
+    bot_app.send(command_update("/start"))
+    bot_app.loop.run_until_complete(asyncio.sleep(0.01))
+
+    assert slow_voice["cancelled"] == 1
+    assert queue.user_jobs(CHAT_ID) == 0
+    assert "voice_history" not in bot_app.application.user_data[CHAT_ID]
+
+    # Диалог завершен: новое голосовое сообщение не ставится в очередь
+    bot_app.send(voice_update())
+    assert slow_voice["started"] == 1
+    assert queue.user_jobs(CHAT_ID) == 0
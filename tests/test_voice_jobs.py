@@ -0,0 +1,117 @@
+"""Очередь голосовых задач: ограничения длительности, на пользователя и общее."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import command_update, voice_update
+from services.voice_jobs import VoiceJobQueue, VoiceJobRejected
+
+APPLICATION = SimpleNamespace(create_task=lambda coroutine, update=None: asyncio.ensure_future(coroutine))
+
+
+class Jobs:
+    """Задачи, которые выполняются, пока тест их не завершит."""
+
+    def __init__(self):
+        self.started = []
+        self._finish = {}
+
+    async def job(self, name: str):
+        self.started.append(name)
+        self._finish[name] = asyncio.get_running_loop().create_future()
+        await self._finish[name]
+
+    def finish(self, name: str) -> None:
+        self._finish[name].set_result(None)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_long_voice_is_rejected_before_download(bot_app):
+    bot_app.send(command_update("/voice"))
+    bot_app.request.calls.clear()
+
+    bot_app.send(voice_update(duration=61))
+
+    assert "getFile" not in bot_app.request.methods()
+    texts = [params.get("text", "") for method, params in bot_app.request.calls if method == "sendMessage"]
+    assert any("слишком длинное" in text for text in texts)
+
+
+def test_user_limit_counts_running_and_waiting_jobs():
+    queue = VoiceJobQueue(max_jobs=1, max_jobs_per_user=2, max_duration=60)
+    jobs = Jobs()
+
+    async def run():
+        queue.check(1, 10)
+        queue.submit(APPLICATION, 1, jobs.job("first"))
+        queue.check(1, 10)
+        queue.submit(APPLICATION, 1, jobs.job("second"))
+        await _settle()
+        with pytest.raises(VoiceJobRejected):
+            queue.check(1, 10)
+        # Лимит на пользователя не мешает другим пользователям
+        queue.check(2, 10)
+
+        jobs.finish("first")
+        await _settle()
+        queue.check(1, 10)
+        jobs.finish("second")
+        await _settle()
+
+    asyncio.run(run())
+    assert queue.pending == 0
+
+
+def test_waiting_jobs_get_positions_and_run_in_order():
+    queue = VoiceJobQueue(max_jobs=2, max_jobs_per_user=10, max_duration=60)
+    jobs = Jobs()
+
+    async def run():
+        positions = [queue.submit(APPLICATION, user_id, jobs.job(f"job {user_id}")) for user_id in range(5)]
+        await _settle()
+        assert positions == [0, 0, 1, 2, 3]
+        assert jobs.started == ["job 0", "job 1"]
+
+        jobs.finish("job 1")
+        await _settle()
+        assert jobs.started == ["job 0", "job 1", "job 2"]
+        # Новая задача встает в конец очереди
+        assert queue.submit(APPLICATION, 9, jobs.job("job 9")) == 3
+
+        for name in ("job 0", "job 2", "job 3", "job 4", "job 9"):
+            await _settle()
+            jobs.finish(name)
+        await _settle()
+
+    asyncio.run(run())
+    assert queue.pending == 0 and queue._running == 0
+
+
+def test_cancelled_jobs_pass_their_slot_on():
+    queue = VoiceJobQueue(max_jobs=1, max_jobs_per_user=10, max_duration=60)
+    jobs = Jobs()
+
+    async def run():
+        queue.submit(APPLICATION, 1, jobs.job("running"))
+        queue.submit(APPLICATION, 2, jobs.job("waiting"))
+        queue.submit(APPLICATION, 3, jobs.job("next"))
+        await _settle()
+
+        # Отмена ожидающей задачи не занимает слот, отмена выполняющейся - освобождает его
+        assert queue.cancel_user(2) == 1
+        assert queue.cancel_user(1) == 1
+        await _settle()
+        assert jobs.started == ["running", "next"]
+        assert queue._running == 1
+
+        jobs.finish("next")
+        await _settle()
+
+    asyncio.run(run())
+    assert queue.pending == 0 and queue._running == 0